@@ -10,3 +10,6 @@ bash benchmark_queries_uniform_large.sh
 bash benchmark_degenerate.sh
 bash benchmark_degenerate_noisy.sh
 bash benchmark_mst.sh
+bash benchmark_cache.sh
+bash benchmark_latency.sh
+bash benchmark_memory.sh
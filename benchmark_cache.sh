@@ -0,0 +1,25 @@
+#!/bin/bash
+
+DATA_FILE=cache.jsonl
+DRAWING_FILE=cache.pdf
+
+if [ "$1" != "--only-plot" ]; then
+	SEED=0
+
+	mkdir -p results
+	rm -f results/$DATA_FILE
+
+	for g in 1 2 5 10 20 50 100 200 500 1000
+	do
+		echo "Benchmark locality with $g groups"...
+		for _ in {1..5}
+		do
+			./stt-benchmarks/target/release/bench_cache -s $SEED -g $g -n 100 -q 100 --json link-cut greedy-splay stable-greedy-splay two-pass-splay stable-two-pass-splay local-two-pass-splay local-stable-two-pass-splay move-to-root stable-move-to-root one-cut >> results/$DATA_FILE
+		done
+	done
+
+	# Keep the results of all runs in the result store, the data file only has the latest
+	python3 show_benchmarks/result_store.py ingest results/results.db results/$DATA_FILE
+fi
+
+python3 show_benchmarks/visualize.py --input-file results/$DATA_FILE --profile cache --output-file results/$DRAWING_FILE
@@ -0,0 +1,22 @@
+#!/bin/bash
+
+DATA_FILE=latency.jsonl
+DRAWING_FILE=latency.pdf
+
+if [ "$1" != "--only-plot" ]; then
+	mkdir -p results
+	rm -f results/$DATA_FILE
+
+	n=10000
+	q=$((20*n))
+	echo "Benchmark query latencies with $n vertices"...
+	for _ in {1..5}
+	do
+		./stt-benchmarks/target/release/bench_queries -n $n -q $q --latency --json link-cut greedy-splay stable-greedy-splay two-pass-splay stable-two-pass-splay local-two-pass-splay local-stable-two-pass-splay move-to-root stable-move-to-root one-cut >> results/$DATA_FILE
+	done
+
+	# Keep the results of all runs in the result store, the data file only has the latest
+	python3 show_benchmarks/result_store.py ingest results/results.db results/$DATA_FILE --benchmark latency
+fi
+
+python3 show_benchmarks/visualize.py --input-file results/$DATA_FILE --profile latency-percentiles --output-file results/$DRAWING_FILE
@@ -0,0 +1,25 @@
+#!/bin/bash
+
+IMPLS="link-cut greedy-splay stable-greedy-splay two-pass-splay stable-two-pass-splay local-two-pass-splay local-stable-two-pass-splay move-to-root stable-move-to-root one-cut"
+
+for w in empty group monoid
+do
+	DATA_FILE=memory_$w.jsonl
+	DRAWING_FILE=memory_$w.pdf
+
+	if [ "$1" != "--only-plot" ]; then
+		mkdir -p results
+		rm -f results/$DATA_FILE
+
+		# Memory usage is deterministic, so a single run suffices
+		for n in 1000 10000 100000 1000000
+		do
+			echo "Benchmark memory usage with $n vertices and $w weights"...
+			./stt-benchmarks/target/release/bench_memory -n $n -w $w --json $IMPLS >> results/$DATA_FILE
+		done
+
+		python3 show_benchmarks/result_store.py ingest results/results.db results/$DATA_FILE --benchmark memory
+	fi
+
+	python3 show_benchmarks/visualize.py --input-file results/$DATA_FILE --profile memory --output-file results/$DRAWING_FILE
+done
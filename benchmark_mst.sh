@@ -12,6 +12,9 @@ if [ "$1" != "--only-plot" ]; then
 		echo "Benchmark MST with $n vertices"...
 		./stt-benchmarks/target/release/bench_mst -t 5 -n $n --json link-cut greedy-splay stable-greedy-splay two-pass-splay stable-two-pass-splay local-two-pass-splay local-stable-two-pass-splay move-to-root stable-move-to-root one-cut >> results/$DATA_FILE
 	done
+
+	# Keep the results of all runs in the result store, the data file only has the latest
+	python3 show_benchmarks/result_store.py ingest results/results.db results/$DATA_FILE
 fi
 
 python3 show_benchmarks/visualize.py --input-file results/$DATA_FILE --profile mst-vertices --output-file results/$DRAWING_FILE
@@ -16,6 +16,9 @@ if [ "$1" != "--only-plot" ]; then
 			./stt-benchmarks/target/release/bench_queries -n $n -q $q --json link-cut greedy-splay stable-greedy-splay two-pass-splay stable-two-pass-splay local-two-pass-splay local-stable-two-pass-splay move-to-root stable-move-to-root one-cut >> results/$DATA_FILE
 		done
 	done
+
+	# Keep the results of all runs in the result store, the data file only has the latest
+	python3 show_benchmarks/result_store.py ingest results/results.db results/$DATA_FILE
 fi
 
 python3 show_benchmarks/visualize.py --input-file results/$DATA_FILE --profile queries-uniform --output-file results/$DRAWING_FILE
@@ -0,0 +1,5 @@
+#!/bin/bash
+
+# Render all figures into the results directory in a single Python process. Figures whose results
+# did not change since the last run are skipped; pass --force to render them anyway.
+python3 show_benchmarks/visualize.py --batch show_benchmarks/figures.manifest --cache --jobs 4 "$@"
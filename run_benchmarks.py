@@ -0,0 +1,389 @@
+"""Run benchmark sweeps described by JSON spec files (see the sweeps directory) in parallel.
+
+A spec looks like
+
+	{
+		"binary" : "bench_queries",
+		"output" : "results/queries_uniform.jsonl",
+		"repetitions" : 5,
+		"grid" : { "num-vertices" : [500, 1000, 1500, 2000] },
+		"derived" : { "num-queries" : "20 * num_vertices" },
+		"implementations" : ["link-cut", "greedy-splay"]
+	}
+
+Every combination of the values in "grid" is run "repetitions" times, passing each parameter as
+`--<name> <value>`. "derived" parameters are arithmetic expressions of the grid parameters (with
+dashes replaced by underscores), and "flags" are passed to every run as they are. Each run is one invocation of the binary with `--json` and all
+implementations, whose output is appended to "output" as soon as it finishes.
+
+With --target-ci, the repetitions are adaptive instead: each combination is run until the confidence
+interval of the median time of every implementation is narrower than the target, or until the time
+budget of the combination runs out. Its results are then written at once, and each record gets the
+number of samples and the achieved relative CI of its implementation."""
+
+from typing import *
+
+import argparse
+import ast
+import collections
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import math
+import operator
+import os
+import queue
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "show_benchmarks" ) )
+import visualize
+
+
+DEFAULT_BIN_DIR = os.path.join( "stt-benchmarks", "target", "release" )
+
+TIME_KEY = "time_ns"
+
+
+class Job( NamedTuple ) :
+	"""One invocation of a benchmark binary."""
+	spec_file : str
+	output : str
+	command : List[str]
+	key : str # Identifies the parameters, repetition and binary, see `job_key`
+
+
+class Adaptive( NamedTuple ) :
+	"""When to stop repeating a parameter combination."""
+	target : float # Relative half-width of the CI of the median, e.g. 0.02 for ±2%
+	confidence : float
+	min_runs : int
+	max_runs : int
+	budget : float # Seconds per combination
+
+
+### Specs
+
+_OPERATORS = {
+	ast.Add : operator.add,
+	ast.Sub : operator.sub,
+	ast.Mult : operator.mul,
+	ast.FloorDiv : operator.floordiv,
+	ast.Pow : operator.pow
+}
+
+def evaluate( expression : str, variables : Dict[str, Any] ) -> int :
+	"""Evaluate an integer expression like "20 * num_vertices". Only +, -, *, //, ** and the
+	given variables are allowed."""
+	def ev( node ) :
+		if isinstance( node, ast.Expression ) :
+			return ev( node.body )
+		if isinstance( node, ast.Constant ) and isinstance( node.value, int ) :
+			return node.value
+		if isinstance( node, ast.Name ) and node.id in variables :
+			return variables[node.id]
+		if isinstance( node, ast.BinOp ) and type( node.op ) in _OPERATORS :
+			return _OPERATORS[type( node.op )]( ev( node.left ), ev( node.right ) )
+		raise ValueError( f"Invalid expression '{expression}'" )
+	return ev( ast.parse( expression, mode = "eval" ) )
+
+def read_spec( spec_file : str ) -> Dict[str, Any] :
+	with open( spec_file, "r" ) as fp :
+		spec = json.load( fp )
+	for key in ( "binary", "output" ) :
+		if key not in spec :
+			raise ValueError( f"{spec_file}: Missing '{key}'" )
+	unknown = spec.keys() - {"binary", "output", "repetitions", "grid", "derived", "flags", "implementations"}
+	if unknown :
+		raise ValueError( f"{spec_file}: Unknown keys {', '.join( sorted( unknown ) )}" )
+	return spec
+
+def grid_points( spec : Dict[str, Any] ) -> Iterator[Dict[str, Any]] :
+	"""All parameter combinations of the spec, including derived parameters."""
+	grid = spec.get( "grid", {} )
+	for values in itertools.product( *grid.values() ) :
+		params = dict( zip( grid.keys(), values ) )
+		variables = {k.replace( "-", "_" ) : v for k, v in params.items()}
+		for name, expression in spec.get( "derived", {} ).items() :
+			params[name] = evaluate( expression, variables )
+		yield params
+
+def file_hash( path : str ) -> str :
+	h = hashlib.sha256()
+	with open( path, "rb" ) as fp :
+		for chunk in iter( lambda : fp.read( 1 << 20 ), b"" ) :
+			h.update( chunk )
+	return h.hexdigest()
+
+def job_key( binary_hash : str, command : List[str], repetition : Optional[int] ) -> str :
+	"""Identifies a run by the binary's contents, its arguments and the repetition (None for all
+	adaptive repetitions)."""
+	return hashlib.sha256( json.dumps( [binary_hash, command[1:], repetition] ).encode() ).hexdigest()
+
+def make_jobs( spec_file : str, bin_dir : str, adaptive : bool = False ) -> List[Job] :
+	"""One job per parameter combination and repetition, or only per combination if `adaptive`."""
+	spec = read_spec( spec_file )
+	binary = os.path.join( bin_dir, spec["binary"] )
+	if not os.path.isfile( binary ) :
+		raise FileNotFoundError( f"{binary} not found. Build the benchmarks with build_bench.sh first" )
+	binary_hash = file_hash( binary )
+
+	jobs = []
+	for params in grid_points( spec ) :
+		command = [binary]
+		for name, value in params.items() :
+			command += [f"--{name}", str( value )]
+		command += [*spec.get( "flags", [] ), "--json", *spec.get( "implementations", [] )]
+		if adaptive :
+			jobs.append( Job( spec_file, spec["output"], command, job_key( binary_hash, command, None ) ) )
+			continue
+		for repetition in range( spec.get( "repetitions", 1 ) ) :
+			jobs.append( Job( spec_file, spec["output"], command, job_key( binary_hash, command, repetition ) ) )
+	return jobs
+
+
+### Running
+
+def parse_cpus( cpus : str ) -> List[int] :
+	"""Parse a CPU list like taskset's, e.g. "2-5,8"."""
+	result = []
+	for part in cpus.split( "," ) :
+		lo, _, hi = part.partition( "-" )
+		result += range( int( lo ), int( hi or lo ) + 1 )
+	return result
+
+def done_file( output : str ) -> str :
+	"""Keys of the jobs whose results are in `output`, one per line."""
+	return output + ".done"
+
+def read_done( output : str ) -> Set[str] :
+	if not os.path.exists( output ) :
+		return set()
+	try :
+		with open( done_file( output ), "r" ) as fp :
+			return {line.strip() for line in fp if line.strip()}
+	except FileNotFoundError :
+		return set()
+
+def run_job( job : Job, cpus : Optional["queue.Queue[int]"] ) -> Tuple[Job, subprocess.CompletedProcess, float, str] :
+	"""Run the job, pinned to a free CPU from `cpus` if given. Also returns the run time and a note
+	for the progress output."""
+	cpu = cpus.get() if cpus is not None else None
+	try :
+		# Pin with taskset rather than a preexec_fn, which is not safe in the worker threads
+		command = ( ["taskset", "-c", str( cpu )] if cpu is not None else [] ) + job.command
+		start = time.monotonic()
+		try :
+			result = subprocess.run( command, stdout = subprocess.PIPE, stderr = subprocess.PIPE, text = True )
+		except ( OSError, subprocess.SubprocessError ) as e :
+			result = subprocess.CompletedProcess( command, -1, "", f"{e}\n" )
+		return job, result, time.monotonic() - start, ""
+	finally :
+		if cpu is not None :
+			cpus.put( cpu )
+
+
+### Adaptive repetition
+
+def median_ci( values : Sequence[float], confidence : float ) -> Optional[Tuple[float, float]] :
+	"""Distribution-free confidence interval of the median: the k-th smallest and k-th largest
+	value for the largest k such that the interval covers the median with the given confidence.
+	None if there are too few values for any such k, e.g. fewer than 6 for 95%."""
+	n = len( values )
+	alpha = ( 1 - confidence ) / 2
+	# The number of values below the median is Binomial(n, 1/2) distributed
+	k = 0
+	tail = 0.0
+	while k < n // 2 :
+		tail += math.comb( n, k ) / 2 ** n
+		if tail > alpha :
+			break
+		k += 1
+	if k == 0 :
+		return None
+	ordered = sorted( values )
+	return ordered[k - 1], ordered[n - k]
+
+def relative_ci( values : Sequence[float], confidence : float ) -> float :
+	"""Half-width of `median_ci` relative to the median (the larger side), inf if undefined."""
+	ci = median_ci( values, confidence )
+	median = statistics.median( values ) if values else 0
+	if ci is None or median <= 0 :
+		return math.inf
+	return max( median - ci[0], ci[1] - median ) / median
+
+def record_group( record : Dict[str, Any] ) -> str :
+	"""Records with the same implementation and parameters, apart from the measurements."""
+	return json.dumps( {k : v for k, v in record.items() if k not in visualize.MEASUREMENTS}, sort_keys = True )
+
+def run_adaptive( job : Job, cpus : Optional["queue.Queue[int]"], adaptive : Adaptive ) \
+		-> Tuple[Job, subprocess.CompletedProcess, float, str] :
+	"""Repeat the job until the relative CI of the median time of every implementation (and other
+	parameters reported by the benchmark) is below the target, or the runs or time budget are used
+	up. Each record of the combined output gets "samples" and, if defined, "median_ci"."""
+	start = time.monotonic()
+	records = []
+	times = collections.defaultdict( list )
+	runs = 0
+	worst = math.inf
+	while True :
+		_, result, _, _ = run_job( job, cpus )
+		if result.returncode != 0 :
+			return job, result, time.monotonic() - start, f"run {runs + 1}"
+		runs += 1
+		for line in result.stdout.splitlines() :
+			if line.strip() :
+				record = json.loads( line )
+				records.append( record )
+				times[record_group( record )].append( record[TIME_KEY] )
+		cis = {group : relative_ci( values, adaptive.confidence ) for group, values in times.items()}
+		worst = max( cis.values(), default = math.inf )
+		if runs >= adaptive.min_runs and worst <= adaptive.target :
+			break
+		if runs >= adaptive.max_runs or time.monotonic() - start >= adaptive.budget :
+			break
+
+	for record in records :
+		group = record_group( record )
+		record["samples"] = len( times[group] )
+		if math.isfinite( cis[group] ) :
+			record["median_ci"] = round( cis[group], 6 )
+	stdout = "".join( json.dumps( record ) + "\n" for record in records )
+	status = "" if worst <= adaptive.target else ", not converged"
+	note = f"{runs} runs, median CI ±{worst:.1%}{status}" if math.isfinite( worst ) else f"{runs} runs, CI undefined{status}"
+	return job, subprocess.CompletedProcess( job.command, 0, stdout, "" ), time.monotonic() - start, note
+
+def open_store( path : str ) -> "result_store.ResultStore" :
+	import result_store
+	return result_store.ResultStore( path )
+
+def run_jobs( jobs : List[Job], num_workers : int, cpus : Optional[List[int]], adaptive : Optional[Adaptive] = None,
+		store : Optional["result_store.ResultStore"] = None ) -> int :
+	"""Run the jobs in a pool of `num_workers` threads, each waiting for one benchmark process, and
+	append the output of each job to its results file as soon as it finishes. If a result store is
+	given, the output is also added to it, as one run per sweep. Returns the number of failed
+	jobs."""
+	cpu_queue = None
+	if cpus is not None :
+		cpu_queue = queue.Queue()
+		for cpu in cpus :
+			cpu_queue.put( cpu )
+
+	failed = 0
+	run_ids = {} # Store run of each sweep
+	with concurrent.futures.ThreadPoolExecutor( max_workers = num_workers ) as pool :
+		if adaptive is None :
+			futures = [pool.submit( run_job, job, cpu_queue ) for job in jobs]
+		else :
+			futures = [pool.submit( run_adaptive, job, cpu_queue, adaptive ) for job in jobs]
+		for i, future in enumerate( concurrent.futures.as_completed( futures ), 1 ) :
+			job, result, seconds, note = future.result()
+			args = " ".join( job.command[1:] )
+			if result.returncode != 0 :
+				failed += 1
+				note_str = f" in {note}" if note else ""
+				print( f"[{i}/{len( jobs )}] FAILED ({result.returncode}){note_str}: {os.path.basename( job.command[0] )} {args}" )
+				sys.stderr.write( result.stderr )
+				continue
+			# Only this thread writes, so output of different runs never interleaves
+			with open( job.output, "a" ) as fp :
+				fp.write( result.stdout )
+			with open( done_file( job.output ), "a" ) as fp :
+				fp.write( job.key + "\n" )
+			if store is not None :
+				import result_store
+				binary = job.command[0]
+				benchmark = result_store.benchmark_of( binary ) or os.path.basename( binary )
+				if "--latency" in job.command :
+					benchmark = "latency"
+				sweep = result_store.sweep_of( job.output )
+				if sweep not in run_ids :
+					run_ids[sweep] = store.add_run( result_store.current_run( benchmark, f"run_benchmarks.py {job.spec_file}", sweep ) )
+				records = [r for line in result.stdout.splitlines() if line.strip() for r in visualize.load_benchmarks( line )]
+				store.add_records( run_ids[sweep], benchmark, records )
+			note_str = f", {note}" if note else ""
+			print( f"[{i}/{len( jobs )}] {os.path.basename( job.command[0] )} {args} ({seconds:.1f}s{note_str})" )
+	return failed
+
+
+def main() :
+	parser = argparse.ArgumentParser( description = "Run stt benchmark sweeps in parallel." )
+	parser.add_argument( "specs", nargs = "+", help = "Sweep spec files (JSON)" )
+	parser.add_argument( "-j", "--jobs", type = int, default = None,
+			help = "Number of benchmarks to run at once (default: number of --cpus, or 1)" )
+	parser.add_argument( "--cpus", default = None,
+			help = "Pin each running benchmark to its own CPU from this list, e.g. 2-7 or 2,4,6. Preferably isolated cores" )
+	parser.add_argument( "--resume", action = "store_true",
+			help = "Keep existing results and skip runs that are already in them (same binary, parameters and repetition). "
+				"Otherwise the results files are overwritten" )
+	parser.add_argument( "--bin-dir", default = DEFAULT_BIN_DIR, help = f"Where the benchmark binaries are (default: {DEFAULT_BIN_DIR})" )
+	parser.add_argument( "--dry-run", action = "store_true", help = "Only print the commands that would be run" )
+	parser.add_argument( "--store", metavar = "DB", default = None,
+			help = "Also add the results to this SQLite result store (see show_benchmarks/result_store.py), which keeps the results of all sweeps" )
+	parser.add_argument( "--target-ci", type = float, default = None,
+			help = "Repeat each parameter combination until the confidence interval of the median time of every implementation "
+				"is within this fraction of the median (e.g. 0.02 for ±2%%), instead of the fixed number of repetitions in the spec" )
+	parser.add_argument( "--confidence", type = float, default = 0.95, help = "Confidence level for --target-ci (default: 0.95)" )
+	parser.add_argument( "--min-runs", type = int, default = 3, help = "Minimum number of runs with --target-ci (default: 3)" )
+	parser.add_argument( "--max-runs", type = int, default = 100, help = "Maximum number of runs with --target-ci (default: 100)" )
+	parser.add_argument( "--budget", type = float, default = 600,
+			help = "Maximum number of seconds to spend on one parameter combination with --target-ci (default: 600)" )
+	args = parser.parse_args()
+
+	adaptive = None
+	if args.target_ci is not None :
+		if args.target_ci <= 0 or not 0 < args.confidence < 1 :
+			parser.error( "--target-ci must be positive and --confidence between 0 and 1" )
+		if not 1 <= args.min_runs <= args.max_runs :
+			parser.error( "Need 1 <= --min-runs <= --max-runs" )
+		adaptive = Adaptive( args.target_ci, args.confidence, args.min_runs, args.max_runs, args.budget )
+
+	cpus = parse_cpus( args.cpus ) if args.cpus else None
+	if cpus is not None :
+		if not hasattr( os, "sched_getaffinity" ) or shutil.which( "taskset" ) is None :
+			parser.error( "--cpus needs the taskset command, which is not available" )
+		unavailable = set( cpus ) - os.sched_getaffinity( 0 )
+		if unavailable :
+			parser.error( f"CPUs {', '.join( map( str, sorted( unavailable ) ) )} are not available" )
+	num_workers = args.jobs or ( len( cpus ) if cpus else 1 )
+	if cpus is not None and num_workers > len( cpus ) :
+		parser.error( "--jobs must not exceed the number of --cpus" )
+
+	jobs = [job for spec_file in args.specs for job in make_jobs( spec_file, args.bin_dir, adaptive is not None )]
+	outputs = list( dict.fromkeys( job.output for job in jobs ) )
+
+	if args.resume :
+		done = {output : read_done( output ) for output in outputs}
+		todo = [job for job in jobs if job.key not in done[job.output]]
+		print( f"Skipping {len( jobs ) - len( todo )} of {len( jobs )} runs with existing results" )
+		jobs = todo
+
+	if args.dry_run :
+		for job in jobs :
+			print( " ".join( job.command ), ">>", job.output )
+		return
+
+	for output in outputs :
+		os.makedirs( os.path.dirname( output ) or ".", exist_ok = True )
+		if not args.resume :
+			for f in ( output, done_file( output ) ) :
+				if os.path.exists( f ) :
+					os.remove( f )
+
+	store = open_store( args.store ) if args.store else None
+	try :
+		failed = run_jobs( jobs, num_workers, cpus, adaptive, store )
+	finally :
+		if store is not None :
+			store.close()
+	if failed > 0 :
+		print( f"WARNING: {failed} run(s) failed" )
+		sys.exit( 1 )
+	print( "Done." )
+
+if __name__ == "__main__" :
+	main()
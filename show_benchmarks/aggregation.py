@@ -0,0 +1,217 @@
+from typing import *
+
+from dataclasses import dataclass
+
+import numpy as np
+
+import visualize
+from result_cache import ResultTable
+
+
+@dataclass
+class GroupStats :
+	"""Statistics of the y values of each (implementation, x) group, as parallel arrays.
+
+	Groups are ordered by implementation (in order of first occurrence), then by x."""
+	names : List[str]
+	xs : np.ndarray
+	counts : np.ndarray
+	means : np.ndarray
+	stdevs : np.ndarray # NaN for groups with fewer than two values
+	mins : np.ndarray
+	medians : np.ndarray
+	mads : np.ndarray # Median absolute deviations, unscaled
+	trimmed_means : np.ndarray # See `visualize.TRIM_FRACTION`
+	trimmed_stdevs : np.ndarray # NaN for groups with fewer than two values after trimming
+	outliers : np.ndarray # Number of outliers, see `visualize.robust_stats`
+	drifts : np.ndarray # Kendall correlation of the values with their order, NaN for single values
+	drift_ps : np.ndarray # P-values of the drifts, see `visualize.order_trend`
+	quantiles : Dict[float, np.ndarray]
+
+	def impls( self ) -> List[str] :
+		return list( dict.fromkeys( self.names ) )
+
+	def impl_slice( self, name : str ) -> slice :
+		"""The groups belonging to the given implementation."""
+		idx = [i for i, n in enumerate( self.names ) if n == name]
+		return slice( idx[0], idx[-1] + 1 )
+
+
+def filter_names( table : ResultTable, include_func : Callable[[str], bool] ) -> ResultTable :
+	"""Only keep rows whose implementation name passes `include_func`."""
+	allowed = [i for i, name in enumerate( table.dictionaries["name"] ) if include_func( name )]
+	return table.select( np.isin( table["name"], allowed ) )
+
+
+def representative_records( table : ResultTable ) -> List[visualize.JsonObj] :
+	"""One benchmark per configuration (see `visualize.config_key`), for validators and titles."""
+	keys = [k for k in table.columns if k not in visualize.MEASUREMENT_KEYS]
+	if len( table ) == 0 :
+		return []
+	if keys :
+		configs = np.stack( [np.asarray( table[k], dtype = np.float64 ) for k in keys], axis = 1 )
+		_, first = np.unique( configs, axis = 0, return_index = True )
+		first.sort()
+	else :
+		first = np.array( [0] )
+	return list( table.select( first ).records() )
+
+
+def _group_quantile( sorted_ys : np.ndarray, starts : np.ndarray, counts : np.ndarray, q : float ) -> np.ndarray :
+	"""Quantile of each group in `sorted_ys`, where each group is sorted. Interpolates linearly
+	between the closest ranks, like numpy's default method."""
+	pos = starts + q * ( counts - 1 )
+	lo = np.floor( pos ).astype( np.int64 )
+	hi = np.ceil( pos ).astype( np.int64 )
+	return sorted_ys[lo] + ( sorted_ys[hi] - sorted_ys[lo] ) * ( pos - lo )
+
+
+def _grouped( table : ResultTable, x_profile, y_profile ) \
+		-> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray] :
+	"""Group the y values by implementation (in order of first occurrence) and x. Within each group,
+	the values keep their order in the table.
+
+	Returns the implementation names and x values of the groups, the start index and size of each
+	group, and the grouped y values."""
+	names = table["name"]
+	xs = np.asarray( x_profile.index( table ) )
+	ys = np.asarray( y_profile.value( table ), dtype = np.float64 )
+
+	valid = ~( np.isnan( xs.astype( np.float64 ) ) | np.isnan( ys ) ) & ( names >= 0 )
+	if not valid.all() :
+		print( f"WARNING: Ignoring {np.count_nonzero( ~valid )} benchmarks without x or y value" )
+		names, xs, ys = names[valid], xs[valid], ys[valid]
+	if len( ys ) == 0 :
+		empty = np.array( [], dtype = np.int64 )
+		return [], xs, empty, empty, ys
+
+	# Rank implementations by first occurrence, so the result doesn't depend on name codes
+	codes, first = np.unique( names, return_index = True )
+	rank = np.empty( codes.max() + 1, dtype = np.int64 )
+	rank[codes[np.argsort( first )]] = np.arange( len( codes ) )
+	impl_rank = rank[names]
+
+	order = np.lexsort( ( xs, impl_rank ) ) # Stable, so keeps the order within groups
+	impl_rank, xs, ys = impl_rank[order], xs[order], ys[order]
+
+	new_group = np.ones( len( ys ), dtype = bool )
+	new_group[1:] = ( impl_rank[1:] != impl_rank[:-1] ) | ( xs[1:] != xs[:-1] )
+	starts = np.flatnonzero( new_group )
+	counts = np.diff( np.append( starts, len( ys ) ) )
+
+	code_by_rank = codes[np.argsort( first )]
+	group_names = table.decode( "name", code_by_rank[impl_rank[starts]] )
+	return group_names, xs[starts], starts, counts, ys
+
+
+def _group_drift( file_ys : np.ndarray, ys : np.ndarray, group_ids : np.ndarray, positions : np.ndarray,
+		counts : np.ndarray ) -> Tuple[np.ndarray, np.ndarray] :
+	"""Kendall correlation of the values of each group with their position in the group and its
+	p-value, like `visualize.order_trend`. `file_ys` are in their original order within groups, `ys`
+	sorted within groups."""
+	count_reps = np.repeat( counts, counts )
+	s = np.zeros( len( counts ), dtype = np.float64 )
+	later = np.flatnonzero( positions + 1 < count_reps ) # Values with a later value at distance d in the group
+	d = 1
+	while len( later ) > 0 :
+		signs = np.sign( file_ys[later + d] - file_ys[later] )
+		s += np.bincount( group_ids[later], weights = signs, minlength = len( counts ) )
+		d += 1
+		later = later[positions[later] + d < count_reps[later]]
+
+	new_run = np.ones( len( ys ), dtype = bool )
+	new_run[1:] = ( ys[1:] != ys[:-1] ) | ( group_ids[1:] != group_ids[:-1] )
+	run_starts = np.flatnonzero( new_run )
+	run_lengths = np.diff( np.append( run_starts, len( ys ) ) )
+	tied = np.bincount( group_ids[run_starts], weights = run_lengths * ( run_lengths - 1 ) / 2, minlength = len( counts ) )
+	pairs = counts * ( counts - 1 ) / 2
+	with np.errstate( divide = "ignore", invalid = "ignore" ) :
+		drifts = np.where( pairs > tied, s / np.sqrt( pairs * ( pairs - tied ) ), 0.0 )
+	p_values = np.array( [visualize.drift_p_value( n, x ) for n, x in zip( counts.tolist(), s.tolist() )] )
+	valid = counts >= 2
+	return np.where( valid, drifts, np.nan ), np.where( valid, p_values, np.nan )
+
+
+def aggregate( table : ResultTable, x_profile, y_profile, quantiles : Sequence[float] = () ) -> GroupStats :
+	"""Group the benchmarks by implementation and x value and compute statistics of the y values.
+
+	`x_profile.index` and `y_profile.value` are evaluated on whole columns at once."""
+	names, xs, starts, counts, file_ys = _grouped( table, x_profile, y_profile )
+	if len( file_ys ) == 0 :
+		empty = np.array( [], dtype = np.float64 )
+		return GroupStats( [], xs, counts, *( [empty] * 10 ), {q : empty for q in quantiles} )
+
+	group_ids = np.repeat( np.arange( len( starts ) ), counts )
+	order = np.lexsort( ( file_ys, group_ids ) )
+	ys = file_ys[order]
+	positions = np.arange( len( ys ) ) - np.repeat( starts, counts ) # Within the group
+
+	means = np.add.reduceat( ys, starts ) / counts
+	sq_dev = np.add.reduceat( ( ys - np.repeat( means, counts ) ) ** 2, starts )
+	with np.errstate( divide = "ignore", invalid = "ignore" ) :
+		stdevs = np.where( counts >= 2, np.sqrt( sq_dev / ( counts - 1 ) ), np.nan )
+	medians = _group_quantile( ys, starts, counts, 0.5 )
+
+	median_reps = np.repeat( medians, counts )
+	abs_devs = np.abs( ys - median_reps )
+	mads = _group_quantile( abs_devs[np.lexsort( ( abs_devs, group_ids ) )], starts, counts, 0.5 )
+	mad_reps = np.repeat( mads, counts )
+	with np.errstate( divide = "ignore", invalid = "ignore" ) :
+		is_outlier = ( mad_reps > 0 ) & ( 0.6745 * abs_devs / mad_reps > visualize.OUTLIER_THRESHOLD ) \
+			& ( abs_devs > visualize.OUTLIER_MIN_DEVIATION * np.abs( median_reps ) )
+
+	trim = ( visualize.TRIM_FRACTION * counts ).astype( np.int64 )
+	trimmed_counts = counts - 2 * trim
+	kept = ( positions >= np.repeat( trim, counts ) ) & ( positions < np.repeat( counts - trim, counts ) )
+	trimmed_means = np.add.reduceat( np.where( kept, ys, 0.0 ), starts ) / trimmed_counts
+	trimmed_sq_dev = np.add.reduceat( np.where( kept, ( ys - np.repeat( trimmed_means, counts ) ) ** 2, 0.0 ), starts )
+	with np.errstate( divide = "ignore", invalid = "ignore" ) :
+		trimmed_stdevs = np.where( trimmed_counts >= 2, np.sqrt( trimmed_sq_dev / ( trimmed_counts - 1 ) ), np.nan )
+	drifts, drift_ps = _group_drift( file_ys, ys, group_ids, positions, counts )
+
+	return GroupStats(
+		names = names,
+		xs = xs,
+		counts = counts,
+		means = means,
+		stdevs = stdevs,
+		mins = ys[starts], # Each group is sorted by y
+		medians = medians,
+		mads = mads,
+		trimmed_means = trimmed_means,
+		trimmed_stdevs = trimmed_stdevs,
+		outliers = np.add.reduceat( is_outlier.astype( np.int64 ), starts ),
+		drifts = drifts,
+		drift_ps = drift_ps,
+		quantiles = {q : _group_quantile( ys, starts, counts, q ) for q in quantiles}
+	)
+
+
+def group_values( table : ResultTable, x_profile, y_profile ) -> Dict[Tuple[str, Any], np.ndarray] :
+	"""The y values of each (implementation, x) group, in the order of the table."""
+	names, xs, starts, counts, ys = _grouped( table, x_profile, y_profile )
+	return {(name, x) : ys[start:start + count]
+			for name, x, start, count in zip( names, xs.tolist(), starts.tolist(), counts.tolist() )}
+
+
+def _optional( values : np.ndarray ) -> List[Optional[float]] :
+	return [None if v != v else v for v in values.tolist()]
+
+def point_stats( stats : GroupStats, estimator : str = "mean" ) -> Dict[str, List[visualize.PointStats]] :
+	"""Convert the statistics into per-implementation lists, as used by `visualize.LoadedResults`,
+	with robust statistics for the given estimator (see `visualize.robust_stats`)."""
+	if estimator == "median" :
+		centers, spreads = stats.medians, visualize.MAD_TO_STDEV * stats.mads
+	elif estimator == "trimmed-mean" :
+		centers, spreads = stats.trimmed_means, stats.trimmed_stdevs
+	else :
+		centers, spreads = stats.means, stats.stdevs
+
+	result = {}
+	for name in stats.impls() :
+		s = stats.impl_slice( name )
+		robust = [visualize.RobustStats( *r ) for r in zip( centers[s].tolist(), _optional( spreads[s] ),
+				stats.outliers[s].tolist(), _optional( stats.drifts[s] ), _optional( stats.drift_ps[s] ) )]
+		result[name] = [visualize.PointStats( *p ) for p in zip( stats.xs[s].tolist(), stats.counts[s].tolist(),
+				stats.means[s].tolist(), _optional( stats.stdevs[s] ), stats.mins[s].tolist(), robust )]
+	return result
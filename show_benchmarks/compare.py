@@ -0,0 +1,163 @@
+from typing import *
+
+import argparse
+import sys
+
+import numpy as np
+
+import aggregation
+import result_cache
+import visualize
+
+
+class Comparison( NamedTuple ) :
+	"""Comparison of one implementation at one x value. The speedup is the ratio of baseline to
+	candidate mean, so values above 1 mean the candidate is faster."""
+	name : str
+	x : Any
+	baseline_count : int
+	candidate_count : int
+	baseline_mean : float
+	candidate_mean : float
+	speedup : float
+	ci_low : float
+	ci_high : float
+	regression : bool
+
+
+# Maximum number of indices drawn at once by bootstrap_means, to bound its memory use (8 bytes each)
+BOOTSTRAP_CHUNK_SIZE = 1 << 20
+
+def bootstrap_means( values : np.ndarray, resamples : int, rng : np.random.Generator ) -> np.ndarray :
+	"""Means of `resamples` bootstrap samples of `values`, drawn in chunks of at most
+	`BOOTSTRAP_CHUNK_SIZE` indices."""
+	means = np.empty( resamples )
+	rows = max( 1, BOOTSTRAP_CHUNK_SIZE // max( 1, len( values ) ) )
+	for start in range( 0, resamples, rows ) :
+		stop = min( start + rows, resamples )
+		idx = rng.integers( 0, len( values ), size = ( stop - start, len( values ) ) )
+		means[start:stop] = values[idx].mean( axis = 1 )
+	return means
+
+
+def compare( baseline : Dict[Tuple[str, Any], np.ndarray], candidate : Dict[Tuple[str, Any], np.ndarray],
+		threshold : float, confidence : float = 0.95, resamples : int = 10000, seed : Optional[int] = 0 ) -> List[Comparison] :
+	"""Compare the groups present in both `baseline` and `candidate`.
+
+	A point is a regression if, with the given confidence, the candidate is more than `threshold`
+	(as a fraction) slower than the baseline, i.e. the upper bound of the speedup is below
+	1 / (1 + threshold)."""
+	rng = np.random.default_rng( seed )
+	alpha = ( 1 - confidence ) / 2
+	result = []
+	for key in baseline :
+		if key not in candidate :
+			continue
+		b, c = baseline[key], candidate[key]
+		speedups = bootstrap_means( b, resamples, rng ) / bootstrap_means( c, resamples, rng )
+		ci_low, ci_high = np.quantile( speedups, [alpha, 1 - alpha] ).tolist()
+		speedup = float( b.mean() / c.mean() )
+		result.append( Comparison( *key, len( b ), len( c ), float( b.mean() ), float( c.mean() ), speedup,
+				ci_low, ci_high, ci_high < 1 / ( 1 + threshold ) ) )
+	return result
+
+
+def load_values( input_files : List[str], profile : str, exclude : Sequence[str], cache : bool, cache_dir : Optional[str] ) \
+		-> Tuple[Dict[Tuple[str, Any], np.ndarray], List[visualize.JsonObj]] :
+	"""The y values of each (implementation, x) group for the given profile, and the benchmarks
+	used for validation and the title."""
+	x_profile, y_profile, title_profile, include_func, *validators = visualize.PROFILES[profile]
+	if cache :
+		table = result_cache.load_table( input_files, cache_dir )
+	else :
+		table = result_cache.ResultTable.concat( [result_cache.parse_jsonl( f ) for f in input_files] )
+	table = aggregation.filter_names( table, lambda name : include_func( name ) and name not in exclude )
+	benchmarks = aggregation.representative_records( table )
+	for validator in validators :
+		validator( benchmarks )
+	return aggregation.group_values( table, x_profile, y_profile ), benchmarks
+
+
+def print_comparisons( comparisons : List[Comparison], x_label : str, confidence : float ) :
+	ci = f"{confidence:.0%} CI"
+	print( f"{'implementation':>16} {x_label:>10} {'baseline':>12} {'candidate':>12} {'speedup':>8} {ci:>17}" )
+	for c in comparisons :
+		flag = "  REGRESSION" if c.regression else ""
+		print( f"{c.name:>16} {c.x:>10} {c.baseline_mean:12.4g} {c.candidate_mean:12.4g} {c.speedup:8.3f}"
+				f"  [{c.ci_low:6.3f}, {c.ci_high:6.3f}]{flag}" )
+
+
+def draw_speedups( comparisons : List[Comparison], x_profile, title : str, output_file : Optional[str] ) :
+	"""Plot the speedup of each implementation with its confidence interval."""
+	plt = visualize._pyplot()
+	if output_file and visualize.OUTPUT_FOR_PAPER :
+		plt.figure( figsize = (4.5, 4) )
+
+	for name in dict.fromkeys( c.name for c in comparisons ) :
+		points = sorted( ( c for c in comparisons if c.name == name ), key = lambda c : c.x )
+		xs = [c.x for c in points]
+		ys = [c.speedup for c in points]
+		yerr = [[c.speedup - c.ci_low for c in points], [c.ci_high - c.speedup for c in points]]
+		plt.errorbar( xs, ys, yerr = yerr, capsize = 2, label = name, color = visualize.ALGORITHM_COLORS.get( name ) )
+	plt.axhline( 1, color = "gray", linestyle = "--", linewidth = 1 )
+
+	plt.title( title )
+	plt.xlabel( x_profile.label )
+	plt.ylabel( "Speedup (baseline / candidate)" )
+	if x_profile.log_scale :
+		plt.xscale( "log" )
+	plt.legend()
+
+	if output_file is None :
+		print( "Showing plot..." )
+		plt.show()
+	else :
+		print( f"Saving plot to {output_file}..." )
+		plt.savefig( output_file )
+		plt.close()
+
+
+def main() :
+	parser = argparse.ArgumentParser( description = "Compare two sets of stt benchmark results. Exits with status 1 if there are regressions." )
+	parser.add_argument( "baseline", help = "Results of the baseline (JSONL)" )
+	parser.add_argument( "candidate", help = "Results of the candidate (JSONL)" )
+	parser.add_argument( "--profile", choices = visualize.PROFILES.keys(), required = True )
+	parser.add_argument( "--exclude", nargs = "+", help = "Implementations to exclude" )
+	parser.add_argument( "--threshold", type = float, default = 0.05,
+			help = "Flag points where the candidate is slower than the baseline by more than this fraction (default: 0.05)" )
+	parser.add_argument( "--confidence", type = float, default = 0.95, help = "Confidence level of the intervals (default: 0.95)" )
+	parser.add_argument( "--resamples", type = int, default = 10000, help = "Number of bootstrap resamples (default: 10000)" )
+	parser.add_argument( "--seed", type = int, default = 0, help = "Seed of the bootstrap" )
+	parser.add_argument( "--plot", action = "store_true", help = "Plot the speedups per implementation" )
+	parser.add_argument( "--output-file", help = "Save the plot to this file instead of showing it. Implies --plot" )
+	parser.add_argument( "--cache", action = "store_true", help = "Read the input files through the columnar cache" )
+	parser.add_argument( "--cache-dir", default = None, help = "Where to store the cache. Defaults to a .cache directory next to each input file" )
+	args = parser.parse_args()
+
+	exclude = args.exclude or ()
+	x_profile, _, title_profile, *_ = visualize.PROFILES[args.profile]
+	baseline, benchmarks = load_values( [args.baseline], args.profile, exclude, args.cache, args.cache_dir )
+	candidate, _ = load_values( [args.candidate], args.profile, exclude, args.cache, args.cache_dir )
+
+	for key in baseline.keys() - candidate.keys() :
+		print( f"WARNING: {key[0]} at {x_profile.label} = {key[1]} only in baseline" )
+	for key in candidate.keys() - baseline.keys() :
+		print( f"WARNING: {key[0]} at {x_profile.label} = {key[1]} only in candidate" )
+
+	comparisons = compare( baseline, candidate, args.threshold, args.confidence, args.resamples, args.seed )
+	if len( comparisons ) == 0 :
+		print( "No common benchmarks found" )
+		sys.exit( 1 )
+	print_comparisons( comparisons, x_profile.label, args.confidence )
+
+	if args.plot or args.output_file :
+		title = title_profile if isinstance( title_profile, str ) else title_profile.title( benchmarks )
+		draw_speedups( comparisons, x_profile, title, args.output_file )
+
+	regressions = [c for c in comparisons if c.regression]
+	if regressions :
+		print( f"{len( regressions )} of {len( comparisons )} points regressed by more than {args.threshold:.0%}" )
+		sys.exit( 1 )
+
+if __name__ == "__main__" :
+	main()
@@ -0,0 +1,287 @@
+from typing import *
+
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import visualize
+
+
+# Bump this whenever the on-disk layout changes, so old caches are rebuilt.
+CACHE_VERSION = 1
+
+META_FILE = "meta.json"
+
+# Column kinds. Integer columns with missing values are stored as float64 with NaN.
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_BOOL = "bool"
+KIND_STR = "str"
+
+MISSING_CODE = -1
+
+
+class ResultTable :
+	"""Benchmark results stored column-wise.
+
+	Numeric columns are NumPy arrays with one entry per benchmark; missing values are NaN. String
+	columns (like `name`) are dictionary-encoded: the column holds int32 codes into a list of
+	distinct values, with -1 for missing values. Indexing a table with a column name returns the
+	raw column, so profile functions like `YMicrosPerQuery.value` work on whole tables."""
+
+	def __init__( self, columns : Dict[str, np.ndarray], kinds : Dict[str, str], dictionaries : Dict[str, List[str]] ) :
+		self.columns = columns
+		self.kinds = kinds
+		self.dictionaries = dictionaries
+
+	def __len__( self ) -> int :
+		return len( next( iter( self.columns.values() ) ) ) if self.columns else 0
+
+	def __getitem__( self, key : str ) -> np.ndarray :
+		return self.columns[key]
+
+	def __contains__( self, key : str ) -> bool :
+		return key in self.columns
+
+	def decode( self, key : str, codes : np.ndarray ) -> List[Optional[str]] :
+		"""Translate codes of the dictionary-encoded column `key` back into strings."""
+		values = self.dictionaries[key]
+		return [values[c] if c != MISSING_CODE else None for c in codes.tolist()]
+
+	def code( self, key : str, value : str ) -> int :
+		"""The code of `value` in the dictionary-encoded column `key`, or -1 if it doesn't occur."""
+		try :
+			return self.dictionaries[key].index( value )
+		except ValueError :
+			return MISSING_CODE
+
+	def select( self, mask : np.ndarray ) -> "ResultTable" :
+		"""A new table containing only the rows where `mask` is true."""
+		return ResultTable( {k : col[mask] for k, col in self.columns.items()}, self.kinds, self.dictionaries )
+
+	def records( self ) -> Iterator[visualize.JsonObj] :
+		"""Reconstruct the benchmarks as dicts, as returned by `visualize.load_benchmarks`."""
+		converted = {}
+		for key, col in self.columns.items() :
+			kind = self.kinds[key]
+			if kind == KIND_STR :
+				converted[key] = self.decode( key, col )
+			else :
+				values = col.tolist()
+				if kind == KIND_INT :
+					converted[key] = [None if v != v else int( v ) for v in values]
+				elif kind == KIND_BOOL :
+					converted[key] = [None if v != v else bool( v ) for v in values]
+				else :
+					converted[key] = [None if v != v else v for v in values]
+		keys = list( converted )
+		for row in zip( *converted.values() ) :
+			yield {k : v for k, v in zip( keys, row ) if v is not None}
+
+	@staticmethod
+	def concat( tables : Sequence["ResultTable"] ) -> "ResultTable" :
+		"""Concatenate tables, e.g. from multiple input files. Columns missing in some of the tables
+		are filled with missing values."""
+		if len( tables ) == 1 :
+			return tables[0]
+
+		kinds = {}
+		for table in tables :
+			for key, kind in table.kinds.items() :
+				kinds[key] = _merge_kinds( kinds.get( key ), kind )
+
+		dictionaries = {key : sorted( {v for t in tables for v in t.dictionaries.get( key, () )} )
+				for key, kind in kinds.items() if kind == KIND_STR}
+
+		columns = {}
+		for key, kind in kinds.items() :
+			parts = []
+			for table in tables :
+				if key not in table.columns :
+					parts.append( np.full( len( table ), MISSING_CODE if kind == KIND_STR else np.nan,
+							dtype = np.int32 if kind == KIND_STR else np.float64 ) )
+				elif kind == KIND_STR :
+					lookup = np.array( [dictionaries[key].index( v ) for v in table.dictionaries[key]] + [MISSING_CODE],
+							dtype = np.int32 )
+					parts.append( lookup[table.columns[key]] ) # MISSING_CODE indexes the last entry
+				else :
+					parts.append( table.columns[key] )
+			columns[key] = np.concatenate( parts )
+		return ResultTable( columns, kinds, dictionaries )
+
+
+def _merge_kinds( a : Optional[str], b : str ) -> str :
+	if a is None or a == b :
+		return b
+	if KIND_STR in ( a, b ) :
+		raise ValueError( f"Column has incompatible types {a} and {b}" )
+	return KIND_FLOAT
+
+
+def _value_kind( value : Any ) -> Optional[str] :
+	if isinstance( value, bool ) :
+		return KIND_BOOL
+	if isinstance( value, int ) :
+		return KIND_INT
+	if isinstance( value, float ) :
+		return KIND_FLOAT
+	if isinstance( value, str ) :
+		return KIND_STR
+	return None
+
+
+def parse_jsonl( input_file : str ) -> ResultTable :
+	"""Parse a JSONL results file into a table. Non-scalar values are dropped."""
+	values = collections.defaultdict( list )
+	kinds = {}
+	skipped = set()
+	num_rows = 0
+	with open( input_file, "r" ) as fp :
+		for line in fp :
+			if not line.strip() :
+				continue
+			for b in visualize.load_benchmarks( line ) :
+				for key, value in b.items() :
+					kind = _value_kind( value )
+					if kind is None :
+						skipped.add( key )
+						continue
+					kinds[key] = _merge_kinds( kinds.get( key ), kind )
+					column = values[key]
+					column.extend( [None] * ( num_rows - len( column ) ) )
+					column.append( value )
+				num_rows += 1
+
+	if skipped :
+		print( f"WARNING: Ignoring non-scalar fields in {input_file}: {', '.join( sorted( skipped ) )}" )
+
+	columns = {}
+	dictionaries = {}
+	for key, column in values.items() :
+		column.extend( [None] * ( num_rows - len( column ) ) )
+		kind = kinds[key]
+		if kind == KIND_STR :
+			dictionaries[key] = sorted( {v for v in column if v is not None} )
+			index = {v : i for i, v in enumerate( dictionaries[key] )}
+			columns[key] = np.array( [index[v] if v is not None else MISSING_CODE for v in column], dtype = np.int32 )
+		elif kind == KIND_INT and None not in column :
+			columns[key] = np.array( column, dtype = np.int64 )
+		else :
+			columns[key] = np.array( [np.nan if v is None else v for v in column], dtype = np.float64 )
+	return ResultTable( columns, kinds, dictionaries )
+
+
+### Cache files
+
+def default_cache_dir( input_file : str ) -> str :
+	return os.path.join( os.path.dirname( os.path.abspath( input_file ) ), ".cache" )
+
+def cache_path( input_file : str, cache_dir : Optional[str] = None ) -> str :
+	"""The directory holding the cached columns of `input_file`. In a shared `cache_dir`, the name
+	includes a hash of the absolute path, so that files with the same name do not collide."""
+	if cache_dir is None :
+		return os.path.join( default_cache_dir( input_file ), os.path.basename( input_file ) )
+	path_hash = hashlib.sha1( os.path.abspath( input_file ).encode() ).hexdigest()[:16]
+	return os.path.join( cache_dir, f"{os.path.basename( input_file )}-{path_hash}" )
+
+def _source_signature( input_file : str ) -> Dict[str, int] :
+	st = os.stat( input_file )
+	return {"size" : st.st_size, "mtime_ns" : st.st_mtime_ns}
+
+def _read_meta( path : str ) -> Optional[Dict[str, Any]] :
+	try :
+		with open( os.path.join( path, META_FILE ), "r" ) as fp :
+			return json.load( fp )
+	except ( OSError, ValueError ) :
+		return None
+
+def is_cache_valid( input_file : str, cache_dir : Optional[str] = None ) -> bool :
+	meta = _read_meta( cache_path( input_file, cache_dir ) )
+	return meta is not None and meta.get( "version" ) == CACHE_VERSION \
+		and meta.get( "source" ) == _source_signature( input_file )
+
+def write_cache( input_file : str, cache_dir : Optional[str] = None ) -> str :
+	"""Parse `input_file` and (re)write its cache. Returns the cache directory."""
+	signature = _source_signature( input_file )
+	table = parse_jsonl( input_file )
+	path = cache_path( input_file, cache_dir )
+	os.makedirs( path, exist_ok = True )
+
+	# Invalidate first, so a crash in between never leaves a stale cache marked as valid.
+	meta_file = os.path.join( path, META_FILE )
+	if os.path.exists( meta_file ) :
+		os.remove( meta_file )
+
+	files = {}
+	for i, ( key, col ) in enumerate( table.columns.items() ) :
+		files[key] = f"col{i}.npy" # Column names need not be valid file names
+		np.save( os.path.join( path, files[key] ), col, allow_pickle = False )
+
+	meta = {
+		"version" : CACHE_VERSION,
+		"source" : signature,
+		"num_rows" : len( table ),
+		"files" : files,
+		"kinds" : table.kinds,
+		"dictionaries" : table.dictionaries
+	}
+	tmp_file = meta_file + ".tmp"
+	with open( tmp_file, "w" ) as fp :
+		json.dump( meta, fp )
+	os.replace( tmp_file, meta_file )
+	return path
+
+def read_cache( input_file : str, cache_dir : Optional[str] = None ) -> ResultTable :
+	"""Load the cached columns of `input_file` as read-only memory maps."""
+	path = cache_path( input_file, cache_dir )
+	meta = _read_meta( path )
+	assert meta is not None, f"No cache for {input_file}"
+	columns = {}
+	for key, file in meta["files"].items() :
+		if meta["num_rows"] == 0 :
+			columns[key] = np.load( os.path.join( path, file ) ) # Cannot memory-map empty files
+		else :
+			columns[key] = np.load( os.path.join( path, file ), mmap_mode = "r" )
+	return ResultTable( columns, meta["kinds"], meta["dictionaries"] )
+
+
+def load_tables( input_files : Sequence[str], cache_dir : Optional[str] = None, max_workers : Optional[int] = None ) \
+		-> List[ResultTable] :
+	"""Load the given results files through the cache, rebuilding stale caches as needed.
+
+	Stale caches of several files are rebuilt in parallel in a process pool."""
+	stale = [f for f in dict.fromkeys( input_files ) if not is_cache_valid( f, cache_dir )]
+	if len( stale ) == 1 or max_workers == 1 :
+		for f in stale :
+			print( f"Building cache for {f}..." )
+			write_cache( f, cache_dir )
+	elif stale :
+		print( f"Building caches for {len( stale )} files..." )
+		with concurrent.futures.ProcessPoolExecutor( max_workers = max_workers ) as pool :
+			for _ in pool.map( write_cache, stale, [cache_dir] * len( stale ) ) :
+				pass
+	return [read_cache( f, cache_dir ) for f in input_files]
+
+def load_table( input_files : Sequence[str], cache_dir : Optional[str] = None, max_workers : Optional[int] = None ) \
+		-> ResultTable :
+	"""Like `load_tables`, but concatenates the results into a single table."""
+	return ResultTable.concat( load_tables( input_files, cache_dir, max_workers ) )
+
+
+def main() :
+	import argparse
+	parser = argparse.ArgumentParser( description = "Build or refresh the columnar cache of stt benchmark results." )
+	parser.add_argument( "input_files", nargs = "+" )
+	parser.add_argument( "--cache-dir", default = None, help = "Where to store the cache. Defaults to a .cache directory next to each input file" )
+	parser.add_argument( "-j", "--jobs", type = int, default = None, help = "Number of parsing processes" )
+	args = parser.parse_args()
+
+	for f, table in zip( args.input_files, load_tables( args.input_files, args.cache_dir, args.jobs ) ) :
+		print( f"{f}: {len( table )} results, columns {', '.join( table.columns )}" )
+
+if __name__ == "__main__" :
+	main()
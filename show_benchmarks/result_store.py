@@ -0,0 +1,294 @@
+"""Append-only store of benchmark results in an SQLite database.
+
+Each ingestion of benchmark output is recorded as a run with its metadata (benchmark type, sweep,
+git commit, host, CPU model and timestamp). The sweep names the set of parameters, e.g.
+"queries_uniform" and "queries_uniform_large" are both sweeps of the "queries" benchmark. Results are never updated or deleted, so the history of
+all runs is kept. Results are indexed by (benchmark, name, num_vertices), so the results of one
+benchmark and set of implementations can be queried without scanning the whole history."""
+
+from typing import *
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+
+import visualize
+
+
+# Benchmark types, i.e. the names of the bench_* binaries without prefix, and "latency" for
+# bench_queries --latency
+BENCHMARKS = ( "cache", "degenerate", "latency", "memory", "mst", "queries" )
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+	id INTEGER PRIMARY KEY,
+	benchmark TEXT NOT NULL,
+	git_commit TEXT,
+	host TEXT,
+	cpu_model TEXT,
+	timestamp TEXT NOT NULL, -- ISO 8601, UTC
+	source TEXT, -- Input file or command
+	sweep TEXT -- E.g. "queries_uniform", see `sweep_of`
+);
+CREATE TABLE IF NOT EXISTS results (
+	id INTEGER PRIMARY KEY,
+	run_id INTEGER NOT NULL REFERENCES runs ( id ),
+	benchmark TEXT NOT NULL,
+	name TEXT NOT NULL,
+	num_vertices INTEGER,
+	record TEXT NOT NULL -- The benchmark's JSON output
+);
+CREATE INDEX IF NOT EXISTS results_benchmark_name_vertices ON results ( benchmark, name, num_vertices );
+CREATE INDEX IF NOT EXISTS results_run ON results ( run_id );
+CREATE INDEX IF NOT EXISTS runs_commit ON runs ( git_commit );
+CREATE TRIGGER IF NOT EXISTS runs_no_update BEFORE UPDATE ON runs BEGIN SELECT RAISE( ABORT, 'runs are append-only' ); END;
+CREATE TRIGGER IF NOT EXISTS runs_no_delete BEFORE DELETE ON runs BEGIN SELECT RAISE( ABORT, 'runs are append-only' ); END;
+CREATE TRIGGER IF NOT EXISTS results_no_update BEFORE UPDATE ON results BEGIN SELECT RAISE( ABORT, 'results are append-only' ); END;
+CREATE TRIGGER IF NOT EXISTS results_no_delete BEFORE DELETE ON results BEGIN SELECT RAISE( ABORT, 'results are append-only' ); END;
+"""
+
+
+class RunInfo( NamedTuple ) :
+	"""Metadata of one ingestion of benchmark output."""
+	benchmark : str
+	git_commit : Optional[str]
+	host : Optional[str]
+	cpu_model : Optional[str]
+	timestamp : str
+	source : Optional[str] = None
+	sweep : Optional[str] = None
+
+
+### Run metadata
+
+def git_commit( path : Optional[str] = None ) -> Optional[str] :
+	"""The commit checked out at `path` (by default, this repository), with "-dirty" appended if
+	there are uncommitted changes."""
+	path = path or os.path.dirname( os.path.abspath( __file__ ) )
+	try :
+		commit = subprocess.run( ["git", "rev-parse", "HEAD"], cwd = path, capture_output = True, text = True, check = True ).stdout.strip()
+		dirty = subprocess.run( ["git", "diff", "--quiet", "HEAD"], cwd = path, capture_output = True ).returncode != 0
+	except ( OSError, subprocess.CalledProcessError ) :
+		return None
+	return commit + "-dirty" if dirty else commit
+
+def cpu_model() -> Optional[str] :
+	try :
+		with open( "/proc/cpuinfo", "r" ) as fp :
+			for line in fp :
+				key, _, value = line.partition( ":" )
+				if key.strip() == "model name" :
+					return value.strip()
+	except OSError :
+		pass
+	return platform.processor() or None
+
+def current_run( benchmark : str, source : Optional[str] = None, sweep : Optional[str] = None ) -> RunInfo :
+	"""Metadata of a run of the given benchmark on this machine, now."""
+	timestamp = datetime.datetime.now( datetime.timezone.utc ).isoformat( timespec = "seconds" )
+	return RunInfo( benchmark, git_commit(), socket.gethostname(), cpu_model(), timestamp, source, sweep )
+
+def benchmark_of( path : str ) -> Optional[str] :
+	"""The benchmark type of a results file or binary, guessed from its name, e.g. "mst" for
+	results/mst.jsonl, "latency" for results/latency.jsonl or "queries" for bench_queries."""
+	base = os.path.basename( path )
+	if base.startswith( "bench_" ) :
+		base = base[len( "bench_" ):]
+	return next( ( b for b in BENCHMARKS if base.startswith( b ) ), None )
+
+def sweep_of( path : str ) -> Optional[str] :
+	"""The sweep of a results file or sweep spec, i.e. its name without extension, e.g.
+	"queries_uniform_large" for results/queries_uniform_large.jsonl. None for stdin."""
+	if path == "-" :
+		return None
+	return os.path.splitext( os.path.basename( path ) )[0]
+
+
+### Store
+
+class ResultStore :
+	def __init__( self, path : str ) :
+		self.connection = sqlite3.connect( path )
+		self.connection.executescript( SCHEMA )
+		# Stores created before sweeps were recorded; their runs have no sweep
+		if "sweep" not in [row[1] for row in self.connection.execute( "PRAGMA table_info( runs )" )] :
+			with self.connection :
+				self.connection.execute( "ALTER TABLE runs ADD COLUMN sweep TEXT" )
+
+	def close( self ) :
+		self.connection.close()
+
+	def __enter__( self ) -> "ResultStore" :
+		return self
+
+	def __exit__( self, *exc_info ) :
+		self.close()
+
+	def add_run( self, run : RunInfo ) -> int :
+		with self.connection :
+			cursor = self.connection.execute(
+				"INSERT INTO runs ( benchmark, git_commit, host, cpu_model, timestamp, source, sweep ) VALUES ( ?, ?, ?, ?, ?, ?, ? )", run )
+		return cursor.lastrowid
+
+	def add_records( self, run_id : int, benchmark : str, records : Iterable[visualize.JsonObj] ) -> int :
+		"""Add the records of a run in one transaction. Returns the number of records added."""
+		rows = [( run_id, benchmark, r["name"], r.get( "num_vertices" ), json.dumps( r ) ) for r in records]
+		with self.connection :
+			self.connection.executemany(
+				"INSERT INTO results ( run_id, benchmark, name, num_vertices, record ) VALUES ( ?, ?, ?, ?, ? )", rows )
+		return len( rows )
+
+	def ingest( self, run : RunInfo, lines : Iterable[str] ) -> int :
+		"""Add a run and its results, given as lines of benchmark output."""
+		records = [b for line in lines if line.strip() for b in visualize.load_benchmarks( line )]
+		return self.add_records( self.add_run( run ), run.benchmark, records )
+
+	def names( self, benchmark : str ) -> List[str] :
+		"""The implementations with results for the benchmark."""
+		cursor = self.connection.execute( "SELECT DISTINCT name FROM results WHERE benchmark = ?", ( benchmark, ) )
+		return [name for name, in cursor]
+
+	def latest_run( self, benchmark : str, sweep : Optional[str] = None, host : Optional[str] = None ) -> Optional[RunInfo] :
+		"""The most recent run of the benchmark, of the given sweep and host if not None."""
+		sql = "SELECT benchmark, git_commit, host, cpu_model, timestamp, source, sweep FROM runs WHERE benchmark = ?"
+		params : List[Any] = [benchmark]
+		if sweep is not None :
+			sql += " AND sweep = ?"
+			params.append( sweep )
+		if host is not None :
+			sql += " AND host = ?"
+			params.append( host )
+		row = self.connection.execute( sql + " ORDER BY id DESC LIMIT 1", params ).fetchone()
+		return RunInfo( *row ) if row is not None else None
+
+	def query( self, benchmark : str, names : Sequence[str], filters : Optional[Dict[str, Any]] = None,
+			commit : Optional[str] = None, host : Optional[str] = None, since : Optional[str] = None,
+			sweep : Optional[str] = None, exact_commit : bool = False ) -> List[visualize.JsonObj] :
+		"""The results of the given benchmark and implementations.
+
+		`filters` restricts fields of the results to the given values, `commit` the runs to commits
+		starting with the given prefix (or equal to it, if `exact_commit`), `host` to the given host,
+		`since` to timestamps at or after the given ISO 8601 date or time and `sweep` to the given
+		sweep."""
+		if len( names ) == 0 :
+			return []
+		sql = f"SELECT results.record FROM results JOIN runs ON runs.id = results.run_id " \
+			f"WHERE results.benchmark = ? AND results.name IN ( {', '.join( '?' * len( names ) )} )"
+		params : List[Any] = [benchmark, *names]
+		if sweep is not None :
+			sql += " AND runs.sweep = ?"
+			params.append( sweep )
+		for key, value in ( filters or {} ).items() :
+			if key == "num_vertices" :
+				sql += " AND results.num_vertices = ?"
+			else :
+				sql += " AND json_extract( results.record, ? ) = ?"
+				params.append( f"$.{key}" )
+			params.append( value )
+		if commit is not None :
+			sql += " AND runs.git_commit = ?" if exact_commit else " AND runs.git_commit LIKE ? || '%'"
+			params.append( commit )
+		if host is not None :
+			sql += " AND runs.host = ?"
+			params.append( host )
+		if since is not None :
+			sql += " AND runs.timestamp >= ?"
+			params.append( since )
+		return [json.loads( record ) for record, in self.connection.execute( sql + " ORDER BY results.id", params )]
+
+	def runs( self ) -> List[Tuple[RunInfo, int, int]] :
+		"""All runs with their ids and numbers of results, oldest first."""
+		cursor = self.connection.execute(
+			"SELECT runs.id, benchmark, git_commit, host, cpu_model, timestamp, source, sweep, "
+			"( SELECT COUNT(*) FROM results WHERE results.run_id = runs.id ) FROM runs ORDER BY runs.id" )
+		return [( RunInfo( *row[1:8] ), row[0], row[8] ) for row in cursor]
+
+
+class StoreQuery( NamedTuple ) :
+	"""Which results of a store to plot, see `ResultStore.query`.
+
+	Only one sweep is used: `sweep`, or else the default sweep of the profile, or else the sweep of
+	the latest run of the benchmark. Unless `all_runs` or `commit` or `since` is given, only the
+	runs of the commit and host of the latest run of the sweep are used, so that results of
+	different versions are not mixed."""
+	path : str
+	filters : Dict[str, Any] = {}
+	commit : Optional[str] = None
+	host : Optional[str] = None
+	since : Optional[str] = None
+	sweep : Optional[str] = None
+	all_runs : bool = False
+
+	def records( self, benchmark : str, default_sweep : Optional[str], include_func : Callable[[str], bool] ) -> List[visualize.JsonObj] :
+		"""The matching results of the benchmark for the implementations accepted by `include_func`."""
+		with ResultStore( self.path ) as store :
+			sweep = self.sweep or default_sweep
+			if sweep is None :
+				latest = store.latest_run( benchmark, None, self.host )
+				if latest is None :
+					return []
+				sweep = latest.sweep
+				print( f"Using the results of sweep {sweep}" )
+			commit, host, exact_commit = self.commit, self.host, False
+			if not ( self.all_runs or self.commit or self.since ) :
+				latest = store.latest_run( benchmark, sweep, self.host )
+				if latest is None :
+					return []
+				commit, host, exact_commit = latest.git_commit, latest.host, True
+				print( f"Using the results of commit {commit or '?'} on {host or '?'} (latest run of {sweep})" )
+			names = [name for name in store.names( benchmark ) if include_func( name )]
+			return store.query( benchmark, names, self.filters, commit, host, self.since, sweep, exact_commit )
+
+
+def parse_filter( text : str ) -> Tuple[str, Any] :
+	"""Parse a filter like "std_dev=0". Values are parsed as JSON, or taken as strings otherwise."""
+	key, sep, value = text.partition( "=" )
+	if not sep or not key :
+		raise argparse.ArgumentTypeError( f"Invalid filter '{text}', expected KEY=VALUE" )
+	try :
+		return key, json.loads( value )
+	except ValueError :
+		return key, value
+
+
+def main() :
+	parser = argparse.ArgumentParser( description = "Append-only SQLite store of stt benchmark results." )
+	subparsers = parser.add_subparsers( dest = "command", required = True )
+	ingest_parser = subparsers.add_parser( "ingest", help = "Add benchmark output (JSONL) to the store as one run per file" )
+	ingest_parser.add_argument( "store", help = "The SQLite database. Created if it does not exist" )
+	ingest_parser.add_argument( "input_files", nargs = "+", help = "Results files, or - for stdin" )
+	ingest_parser.add_argument( "--benchmark", choices = BENCHMARKS, default = None,
+			help = "The benchmark that produced the results. Guessed from the file names if omitted" )
+	ingest_parser.add_argument( "--sweep", default = None,
+			help = "The sweep, e.g. queries_uniform_large. Defaults to the file names without extension" )
+	runs_parser = subparsers.add_parser( "runs", help = "List the runs in the store" )
+	runs_parser.add_argument( "store", help = "The SQLite database" )
+	args = parser.parse_args()
+
+	if args.command == "ingest" :
+		with ResultStore( args.store ) as store :
+			for input_file in args.input_files :
+				benchmark = args.benchmark or benchmark_of( input_file )
+				if benchmark is None :
+					parser.error( f"Cannot guess the benchmark of {input_file}, use --benchmark" )
+				run = current_run( benchmark, input_file, args.sweep or sweep_of( input_file ) )
+				if input_file == "-" :
+					count = store.ingest( run, sys.stdin )
+				else :
+					with open( input_file, "r" ) as fp :
+						count = store.ingest( run, fp )
+				print( f"Added {count} {benchmark} results from {input_file}" )
+	elif args.command == "runs" :
+		with ResultStore( args.store ) as store :
+			for run, run_id, count in store.runs() :
+				print( f"{run_id:>5} {run.timestamp} {run.benchmark:<10} {run.sweep or '?':<22} {count:>7} results  {run.git_commit or '?'}  "
+						f"{run.host or '?'} ({run.cpu_model or '?'})  {run.source or ''}".rstrip() )
+
+if __name__ == "__main__" :
+	main()
@@ -0,0 +1,68 @@
+from typing import *
+
+import math
+
+
+# Candidate scaling laws y = c·f(n). Logarithms are base 2.
+MODELS : Dict[str, Callable[[float], float]] = {
+	"c" : lambda n : 1.0,
+	"c·log n" : lambda n : math.log2( n ),
+	"c·log² n" : lambda n : math.log2( n ) ** 2,
+	"c·n" : lambda n : n
+}
+
+
+class Fit( NamedTuple ) :
+	"""A scaling law fitted to the points of one implementation."""
+	model : str
+	c : float
+	xs : List[float]
+	residuals : List[float] # Relative residuals (y - fitted y) / y of each point
+
+	@property
+	def rms( self ) -> float :
+		"""Root mean square of the relative residuals."""
+		return math.sqrt( sum( r * r for r in self.residuals ) / len( self.residuals ) )
+
+	def predict( self, n : float ) -> float :
+		return self.c * MODELS[self.model]( n )
+
+
+def fit_model( model : str, xs : Sequence[float], ys : Sequence[float] ) -> Optional[Fit] :
+	"""Least-squares fit of y = c·f(n) for the given model. Minimizes the relative rather than the
+	absolute residuals, so small n count as much as large n. Returns None if the model is zero at
+	every point."""
+	f = MODELS[model]
+	fs = [f( x ) for x in xs]
+	denom = sum( ( fx / y ) ** 2 for fx, y in zip( fs, ys ) )
+	if denom == 0 :
+		return None
+	c = sum( fx / y for fx, y in zip( fs, ys ) ) / denom
+	return Fit( model, c, list( xs ), [( y - c * fx ) / y for fx, y in zip( fs, ys )] )
+
+
+def fit_models( xs : Sequence[float], ys : Sequence[float] ) -> List[Fit] :
+	"""Fit all models to the points with positive x and y, best (lowest RMS residual) first."""
+	points = [( x, y ) for x, y in zip( xs, ys ) if x > 0 and y > 0]
+	if len( points ) < 2 :
+		return []
+	xs, ys = zip( *points )
+	fits = [fit_model( model, xs, ys ) for model in MODELS]
+	return sorted( ( f for f in fits if f is not None ), key = lambda f : f.rms )
+
+
+def print_fits( fits : Dict[str, List[Fit]], x_label : str, y_label : str, extrapolate_to : Optional[float] = None ) :
+	"""Print the best fit of each implementation with its residuals, the RMS residuals of the other
+	models, and optionally the extrapolated value."""
+	print( f"Scaling laws for {y_label} (RMS of relative residuals, logarithms base 2):" )
+	for name, impl_fits in fits.items() :
+		if not impl_fits :
+			print( f"{name:>20}: too few points" )
+			continue
+		best, *others = impl_fits
+		other_str = ", ".join( f"{f.model} {f.rms:.1%}" for f in others )
+		print( f"{name:>20}: {best.model} with c = {best.c:.4g}, rms {best.rms:.1%} (others: {other_str})" )
+		residual_str = ", ".join( f"{x:g}: {r:+.1%}" for x, r in zip( best.xs, best.residuals ) )
+		print( f"{'':>20}  residuals at {x_label} = {residual_str}" )
+		if extrapolate_to is not None :
+			print( f"{'':>20}  at {x_label} = {extrapolate_to:g}: {best.predict( extrapolate_to ):.4g} {y_label}" )
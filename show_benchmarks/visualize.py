@@ -3,9 +3,16 @@ from typing import *
 from dataclasses import dataclass
 
 import collections
+import concurrent.futures
+import functools
+import hashlib
+import itertools
 import json
+import math
+import os
 import statistics
 import sys
+import time
 
 try :
 	import argparse
@@ -13,15 +20,38 @@ except ImportError :
 	sys.stderr.write( "argparse not installed!\n" )
 	sys.exit( 2 )
 
-try :
-	import matplotlib.pyplot as plt
-except ImportError :
-	sys.stderr.write( "matplotlib not installed!\n" )
-	sys.exit( 3 )
+import scaling
+
+
+def _pyplot( backend : Optional[str] = None ) :
+	"""Import matplotlib.pyplot on first use, so modes that don't draw start fast and work
+	without matplotlib."""
+	try :
+		import matplotlib
+		if backend is not None :
+			matplotlib.use( backend )
+		import matplotlib.pyplot as plt
+	except ImportError :
+		sys.stderr.write( "matplotlib not installed!\n" )
+		sys.exit( 3 )
+	return plt
 
 
 JsonObj = Dict[str, Any]
 
+# Hardware performance counters recorded by the benchmarks with --counters
+COUNTERS = ( "cycles", "instructions", "l1d_misses", "llc_misses", "branch_misses" )
+
+# Measured values, which differ between runs of the same benchmark configuration. Also used by
+# run_benchmarks.py to group repeated runs. "results" holds the measurements of benchmarks with
+# several results per run, before they are split up by `load_benchmarks`.
+MEASUREMENTS = ( "time_ns", "samples", "median_ci", "results",
+		"ns_per_tick", "histograms", "latency_ns", "link_ns", "cut_ns", "path_weight_ns",
+		"heap_bytes", "allocated_bytes", "peak_allocated_bytes", "peak_rss_bytes", "native_time_ns" ) + COUNTERS
+
+# Keys that differ between repetitions of the same benchmark configuration
+MEASUREMENT_KEYS = ( "name", "seed" ) + MEASUREMENTS
+
 
 def load_benchmarks( line : str ) -> Iterator[JsonObj] :
 	obj = json.loads( line )
@@ -33,6 +63,18 @@ def load_benchmarks( line : str ) -> Iterator[JsonObj] :
 	else :
 		yield obj
 
+def iter_benchmarks( input_file : str, include_func : Callable[[str], bool] ) -> Iterator[JsonObj] :
+	"""Lazily yield the benchmarks in the given file whose name passes `include_func`."""
+	with open( input_file, "r" ) as fp :
+		for line in fp :
+			for b in load_benchmarks( line ) :
+				if include_func( b["name"] ) :
+					yield b
+
+def config_key( benchmark : JsonObj ) -> Tuple :
+	"""The benchmark configuration, i.e., everything except the measurement itself."""
+	return tuple( sorted( (k, v) for k, v in benchmark.items() if k not in MEASUREMENT_KEYS ) )
+
 
 ### Benchmark helper functions
 
@@ -54,12 +96,12 @@ def validate_queries_quadratic( benchmarks : List[JsonObj] ) :
 def validate_vertices_constant( benchmarks : List[JsonObj] ) :
 	ns = {benchmark["num_vertices"] for benchmark in benchmarks}
 	if len( ns ) > 1 :
-		print( f"WARNING: Multiple vertex counts: {', '.join( sorted( ns ) )}")
+		print( f"WARNING: Multiple vertex counts: {', '.join( map( str, sorted( ns ) ) )}")
 
 def validate_edge_factor_constant( benchmarks : List[JsonObj] ) :
 	fs = {edge_factor( benchmark ) for benchmark in benchmarks}
 	if len( fs ) > 1 :
-		print( f"WARNING: Multiple edge factors: {', '.join( sorted( fs ) )}")
+		print( f"WARNING: Multiple edge factors: {', '.join( map( str, sorted( fs ) ) )}")
 
 def validate_edge_factor_int( benchmarks : List[JsonObj] ) :
 	for benchmark in benchmarks :
@@ -90,9 +132,20 @@ XNumGroups = XSimple( "#groups", "num_groups" )
 def XNumVerts( log_scale : bool = False ) -> XSimple :
 	return XSimple( "n", "num_vertices", log_scale )
 
+class XPercentile :
+	"""Latency percentiles of `bench_queries --latency`, drawn evenly spaced with these labels."""
+	label = "percentile"
+	log_scale = False
+	ticks = { 50.0 : "p50", 99.0 : "p99", 99.9 : "p99.9", 100.0 : "max" }
+	
+	@staticmethod
+	def index( benchmark : JsonObj ) -> float :
+		return benchmark["percentile"]
+
 
 class YMicrosPerQuery :
 	label = "µs/query"
+	per = ( "num_queries", "query" )
 	
 	@staticmethod
 	def value( benchmark : JsonObj ) -> float :
@@ -100,6 +153,7 @@ class YMicrosPerQuery :
 
 class YMicrosPerEdge :
 	label = "µs/edge"
+	per = ( "num_edges", "edge" )
 	
 	@staticmethod
 	def value( benchmark : JsonObj ) -> float :
@@ -107,18 +161,60 @@ class YMicrosPerEdge :
 
 class YMicrosPerVertex :
 	label = "µs/vertex"
+	per = ( "num_vertices", "vertex" )
 	
 	@staticmethod
 	def value( benchmark : JsonObj ) -> float :
 		return benchmark["time_ns"] / 1_000 / benchmark["num_vertices"]
 
+class YLatencyMicros :
+	label = "µs"
+	log_scale = True
+	
+	@staticmethod
+	def value( benchmark : JsonObj ) -> float :
+		return benchmark["latency_ns"] / 1_000
+
+class YBytesPerVertex :
+	label = "bytes/vertex"
+	
+	@staticmethod
+	def value( benchmark : JsonObj ) -> float :
+		return benchmark["heap_bytes"] / benchmark["num_vertices"]
+
 class YMillis :
 	label = "ms"
+	per = None
 	
 	@staticmethod
 	def value( benchmark : JsonObj ) -> float :
 		return benchmark["time_ns"] / 1_000_000
 
+class MissingCountersError( ValueError ) :
+	"""Raised by `YCounter` for results recorded without hardware counters."""
+
+@dataclass
+class YCounter :
+	"""A hardware performance counter recorded with `--counters`, per query/edge/vertex as given
+	by `per` (the key to divide by and its name), or in total if `per` is None."""
+	counter : str
+	per : Optional[Tuple[str, str]]
+	
+	@property
+	def label( self ) -> str :
+		name = self.counter.replace( "_", " " )
+		return f"{name}/{self.per[1]}" if self.per is not None else name
+	
+	def value( self, benchmark : JsonObj ) -> float :
+		counts = benchmark[self.counter] if self.counter in benchmark else None
+		# A column of a `result_cache.ResultTable` is NaN for benchmarks without the counter
+		if counts is None or ( getattr( counts, "ndim", 0 ) > 0 and ( counts != counts ).any() ) :
+			raise MissingCountersError( f"Some results have no {self.counter.replace( '_', ' ' )}: "
+					"they were recorded without --counters, or the CPU cannot count it" )
+		if self.per is None :
+			return counts
+		return counts / benchmark[self.per[0]]
+
 class TitleFixedVal :
 	def __init__( self, tpl : str, val_func : Callable[[JsonObj], Any], val_name_plural : str ) :
 		self._tpl = tpl
@@ -129,7 +225,7 @@ class TitleFixedVal :
 		assert len( benchmarks ) > 0
 		vals = {self._val_func( benchmark ) for benchmark in benchmarks}
 		if len( vals ) > 1 :
-			print( f"WARNING: Multiple {self._val_name_plural}: {', '.join( sorted( vals ) )}")
+			print( f"WARNING: Multiple {self._val_name_plural}: {', '.join( map( str, sorted( vals ) ) )}")
 			return self._tpl.format( "?" )
 		else :
 			v = next( iter( vals ) )
@@ -148,26 +244,238 @@ def TitleFixedQueryFactor( tpl : str ) -> TitleFixedVal :
 
 def TitleFixedGroupSizesAndQueries( tpl : str ) -> TitleFixedVal :
 	return TitleFixedVal( tpl, lambda b : ( b["group_size"], b["queries_per_group"] ), "group sizes/queries" )
+
+# Crate features that change the node representation, by their names in the results
+NODE_FEATURES = ( ( "space_efficient_nodes", "space efficient nodes" ), ( "compact_node_idx", "compact node indices" ) )
+
+def TitleFixedWeightType( tpl : str ) -> TitleFixedVal :
+	return TitleFixedVal( tpl, lambda b : ( b["weight"], "".join( f", {name}" for key, name in NODE_FEATURES if b.get( key ) ) ),
+			"weight types/node representations" )
 	
 
-def plot_data( name : str, benchmark : Dict[int, List[int]], verbose : bool ) -> Tuple[List[float], List[float], List[float]] :
+### Robust statistics
+
+ESTIMATORS = ( "mean", "median", "trimmed-mean" )
+
+TRIM_FRACTION = 0.2 # Fraction of values cut from each end for the trimmed mean
+MAD_TO_STDEV = 1.4826 # Scales the MAD to estimate the standard deviation of normally distributed values
+OUTLIER_THRESHOLD = 3.5 # Modified z-score above which a value is an outlier (Iglewicz and Hoaglin)
+OUTLIER_MIN_DEVIATION = 0.05 # Relative to the median. Tightly clustered repetitions would otherwise flag mere noise
+DRIFT_ALPHA = 0.01 # Significance level of the trend test, i.e. the fraction of steady points flagged as drifting
+DRIFT_EXACT_MAX_COUNT = 50 # Above this, the p-value of the trend test uses the normal approximation
+
+class RobustStats( NamedTuple ) :
+	"""Statistics of one point that need all of its values, in the order they were measured."""
+	center : float # Value of the chosen estimator
+	spread : Optional[float] # Standard deviation, scaled MAD or standard deviation of the trimmed values
+	outliers : int
+	drift : Optional[float] # Kendall correlation of the values with their order, see `order_trend`
+	drift_p : Optional[float] # Its two-sided p-value
+	
+	@property
+	def drifting( self ) -> bool :
+		return self.drift_p is not None and self.drift_p < DRIFT_ALPHA
+	
+	def flags( self ) -> List[str] :
+		flags = []
+		if self.outliers > 0 :
+			flags.append( f"{self.outliers} outlier{'s' if self.outliers > 1 else ''}" )
+		if self.drifting :
+			flags.append( f"drift {self.drift:+.2f}" )
+		return flags
+
+@functools.lru_cache( maxsize = None )
+def _inversion_cdf( n : int ) -> List[float] :
+	"""Probability that a random permutation of n elements has at most k inversions, for each k."""
+	dist = [1.0]
+	for m in range( 2, n + 1 ) :
+		# The m-th element adds 0 to m - 1 inversions, each equally likely
+		cumulative = list( itertools.accumulate( dist ) )
+		dist = [( cumulative[min( k, len( dist ) - 1 )] - ( cumulative[k - m] if k >= m else 0.0 ) ) / m
+				for k in range( len( dist ) + m - 1 )]
+	return list( itertools.accumulate( dist ) )
+
+def drift_p_value( n : int, s : float ) -> float :
+	"""Two-sided p-value of Kendall's S (concordant minus discordant pairs of values and positions)
+	of n values without trend. Exact for up to `DRIFT_EXACT_MAX_COUNT` values, assuming no ties,
+	which is conservative since ties only shrink S."""
+	pairs = n * ( n - 1 ) // 2
+	if n < 2 :
+		return 1.0
+	if n <= DRIFT_EXACT_MAX_COUNT :
+		return min( 1.0, 2 * _inversion_cdf( n )[math.floor( ( pairs - abs( s ) ) / 2 )] )
+	stdev = math.sqrt( n * ( n - 1 ) * ( 2 * n + 5 ) / 18 )
+	return min( 1.0, math.erfc( max( abs( s ) - 1, 0.0 ) / stdev / math.sqrt( 2 ) ) )
+
+def order_trend( values : Sequence[float] ) -> Tuple[float, float] :
+	"""Kendall rank correlation (tau-b) of the values with their position, and its p-value. Values
+	that steadily increase (e.g. times of a machine that heats up) give 1, steadily decreasing values
+	give -1. Few values can't tell a trend from noise, so only a small p-value means drift."""
+	n = len( values )
+	s = sum( ( values[j] > values[i] ) - ( values[j] < values[i] ) for i in range( n ) for j in range( i + 1, n ) )
+	pairs = n * ( n - 1 ) // 2
+	tied = sum( c * ( c - 1 ) // 2 for c in collections.Counter( values ).values() )
+	tau = s / math.sqrt( pairs * ( pairs - tied ) ) if pairs > tied else 0.0
+	return tau, drift_p_value( n, s )
+
+def robust_stats( values : Sequence[float], estimator : str = "mean" ) -> RobustStats :
+	"""Compute the given estimator and flag outliers and drift. `values` must be in the order they
+	were measured, i.e. file order."""
+	median = statistics.median( values )
+	mad = statistics.median( abs( v - median ) for v in values )
+	if estimator == "median" :
+		center, spread = median, MAD_TO_STDEV * mad
+	elif estimator == "trimmed-mean" :
+		k = int( TRIM_FRACTION * len( values ) )
+		trimmed = sorted( values )[k:len( values ) - k]
+		center, spread = statistics.mean( trimmed ), statistics.stdev( trimmed ) if len( trimmed ) >= 2 else None
+	else :
+		center, spread = statistics.mean( values ), statistics.stdev( values ) if len( values ) >= 2 else None
+	
+	outliers = 0
+	if mad > 0 :
+		outliers = sum( 1 for v in values if 0.6745 * abs( v - median ) / mad > OUTLIER_THRESHOLD
+				and abs( v - median ) > OUTLIER_MIN_DEVIATION * abs( median ) )
+	drift, drift_p = order_trend( values ) if len( values ) >= 2 else ( None, None )
+	return RobustStats( center, spread, outliers, drift, drift_p )
+
+
+class PointStats( NamedTuple ) :
+	"""Statistics of the y values of one implementation at one x value."""
+	x : Any
+	count : int
+	mean : float
+	stdev : Optional[float] # None if there are fewer than two values
+	min : float
+	robust : Optional[RobustStats] = None # Not available when streaming
+	
+	@staticmethod
+	def of( x : Any, values : List[float], estimator : str = "mean" ) -> "PointStats" :
+		"""Statistics of `values`, which must be in file order."""
+		return PointStats( x, len( values ), statistics.mean( values ),
+			statistics.stdev( values ) if len( values ) >= 2 else None, min( values ),
+			robust_stats( values, estimator ) )
+	
+	@property
+	def center( self ) -> float :
+		return self.robust.center if self.robust is not None else self.mean
+	
+	@property
+	def spread( self ) -> Optional[float] :
+		return self.robust.spread if self.robust is not None else self.stdev
+
+
+class RunningStats :
+	"""Count, mean, sum of squared deviations and minimum of a sequence of values, updated one
+	value at a time (Welford's algorithm)."""
+	__slots__ = ( "count", "mean", "m2", "min" )
+	
+	def __init__( self ) :
+		self.count = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+		self.min = math.inf
+	
+	def add( self, value : float ) :
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.m2 += delta * ( value - self.mean )
+		self.min = min( self.min, value )
+	
+	def stdev( self ) -> Optional[float] :
+		if self.count < 2 :
+			return None
+		return math.sqrt( self.m2 / ( self.count - 1 ) )
+	
+	def point( self, x : Any ) -> PointStats :
+		return PointStats( x, self.count, self.mean, self.stdev(), self.min )
+
+
+class StreamingAggregate :
+	"""Running statistics per implementation and x value, to which benchmarks can be added at any
+	time.
+	
+	Also keeps one representative benchmark per configuration (see `config_key`), which is enough
+	for validators and titles. Memory usage thus only depends on the number of plotted points."""
+	
+	def __init__( self, x_profile, y_profile ) :
+		self.x_profile = x_profile
+		self.y_profile = y_profile
+		self.stats = collections.defaultdict( lambda : collections.defaultdict( RunningStats ) )
+		self.configs = {}
+		self.count = 0
+	
+	def add( self, benchmark : JsonObj ) :
+		self.stats[benchmark["name"]][self.x_profile.index( benchmark )].add( self.y_profile.value( benchmark ) )
+		self.configs.setdefault( config_key( benchmark ), benchmark )
+		self.count += 1
+	
+	def points( self ) -> Dict[str, List[PointStats]] :
+		return {name : [stats.point( x ) for x, stats in sorted( b.items() )] for name, b in self.stats.items()}
+	
+	def benchmarks( self ) -> List[JsonObj] :
+		return list( self.configs.values() )
+
+def aggregate_streaming( benchmarks : Iterable[JsonObj], x_profile, y_profile ) \
+		-> Tuple[Dict[str, Dict[Any, RunningStats]], List[JsonObj]] :
+	"""Fold the benchmarks into running statistics per implementation and x value, see
+	`StreamingAggregate`."""
+	aggregate = StreamingAggregate( x_profile, y_profile )
+	for benchmark in benchmarks :
+		aggregate.add( benchmark )
+	return {k : dict( val ) for k, val in aggregate.stats.items()}, aggregate.benchmarks()
+
+
+def _plot_points( name : str, points : Iterable[Tuple[Any, float, Optional[float]]], verbose : bool,
+		flags : Optional[Iterable[List[str]]] = None ) -> Tuple[List[float], List[float], List[float]] :
 	xs = []
 	ys = []
 	stdevs = []
-	for x in sorted( benchmark ) :
-		results = benchmark[x]
-		mean_us = statistics.mean( results )
-		if len( results ) >= 2 :
-			stdev_us = statistics.stdev( results )
-		else :
-			stdev_us = None
+	for ( x, mean_us, stdev_us ), point_flags in zip( points, flags or itertools.repeat( [] ) ) :
 		xs.append( x )
 		ys.append( mean_us )
 		stdevs.append( stdev_us )
 		if verbose :
-			print( f"{name:>16}, {x:7}: {mean_us:5.3}±{stdev_us:4.3}ms")
+			suffix = f" [{', '.join( point_flags )}]" if point_flags else ""
+			print( f"{name:>16}, {x:7}: {mean_us:5.3}±{stdev_us:4.3}ms{suffix}")
 	return xs, ys, stdevs
 
+def plot_points( points : Dict[str, List[PointStats]], verbose : bool ) \
+		-> List[Tuple[str, List[float], List[float], List[float], List[PointStats]]] :
+	"""The curves to draw with `draw_plot`, sorted by their last value."""
+	impls_with_plots = [
+		(name, *_plot_points( name, ( (p.x, p.center, p.spread) for p in stats ), verbose,
+			( p.robust.flags() if p.robust is not None else [] for p in stats ) ), stats)
+		for name, stats in points.items()
+	]
+	impls_with_plots.sort( key = lambda t : t[2][-1], reverse = True ) # Sort by last value
+	return impls_with_plots
+
+def print_summary( title : str, x_label : str, y_label : str, points : Dict[str, List[PointStats]], estimator : str = "mean" ) :
+	"""Print a table of the statistics of each implementation."""
+	def fmt( v : Optional[float] ) -> str :
+		return f"{v:12.4g}" if v is not None else f"{'-':>12}"
+	
+	print( f"{title} [{y_label}]" )
+	for name, stats in points.items() :
+		robust = all( p.robust is not None for p in stats )
+		print()
+		print( name )
+		header = f"{x_label:>10} {'count':>6} {'mean':>12} {'stdev':>12} {'min':>12}"
+		if robust and estimator != "mean" :
+			header += f" {estimator:>12} {'spread':>12}"
+		if robust :
+			header += " flags"
+		print( header )
+		for p in stats :
+			line = f"{p.x:>10} {p.count:>6} {p.mean:12.4g} {fmt( p.stdev )} {p.min:12.4g}"
+			if robust and estimator != "mean" :
+				line += f" {fmt( p.center )} {fmt( p.spread )}"
+			if robust :
+				line += " " + ", ".join( p.robust.flags() )
+			print( line.rstrip() )
+
 PROFILES = {
 	"mst-edge-factor" : ( XEdgeFactor, YMicrosPerEdge,
 			TitleFixedVertices( "Minimum Spanning forest (n = {})" ), lambda _ : True,
@@ -180,9 +488,50 @@ PROFILES = {
 	"queries-uniform" : ( XNumVerts( log_scale = False ),
 			YMicrosPerQuery, TitleFixedQueryFactor( "Uniform random queries (q/n = {})" ), lambda _ : True ),
 	"cache" : ( XNumGroups, YMicrosPerQuery,
-			TitleFixedGroupSizesAndQueries( "Cache (n/group = {}, q/group = {})" ), lambda _ : True )
+			TitleFixedGroupSizesAndQueries( "Cache (n/group = {}, q/group = {})" ), lambda _ : True ),
+	"latency-percentiles" : ( XPercentile, YLatencyMicros, TitleFixedVertices( "Query latency (n = {})" ), lambda _ : True,
+			validate_vertices_constant ),
+	"memory" : ( XNumVerts( log_scale = True ), YBytesPerVertex, TitleFixedWeightType( "Memory ({} weights{})" ), lambda _ : True )
+}
+
+# The benchmark (see `result_store.BENCHMARKS`) whose results each profile shows
+PROFILE_BENCHMARKS = {
+	"mst-edge-factor" : "mst",
+	"mst-vertices" : "mst",
+	"degenerate" : "degenerate",
+	"degenerate-noisy" : "degenerate",
+	"queries-uniform" : "queries",
+	"cache" : "cache",
+	"latency-percentiles" : "latency",
+	"memory" : "memory"
+}
+
+# The sweep (see `result_store.sweep_of`) whose results each profile shows by default. Profiles
+# without one show the sweep of the latest run of their benchmark.
+PROFILE_SWEEPS = {
+	"mst-edge-factor" : "mst",
+	"mst-vertices" : "mst",
+	"degenerate" : "degenerate",
+	"degenerate-noisy" : "degenerate_noisy",
+	"queries-uniform" : "queries_uniform",
+	"cache" : "cache",
+	"latency-percentiles" : "latency"
 }
 
+def _add_counter_profiles() :
+	"""For every profile of a time, add a profile of each counter with the same axes, title and
+	validators, e.g. "mst-vertices-llc-misses" for the LLC misses per edge."""
+	for profile, ( x_profile, y_profile, *rest ) in list( PROFILES.items() ) :
+		if hasattr( y_profile, "per" ) :
+			for counter in COUNTERS :
+				name = f"{profile}-{counter.replace( '_', '-' )}"
+				PROFILES[name] = ( x_profile, YCounter( counter, y_profile.per ), *rest )
+				PROFILE_BENCHMARKS[name] = PROFILE_BENCHMARKS[profile]
+				if profile in PROFILE_SWEEPS :
+					PROFILE_SWEEPS[name] = PROFILE_SWEEPS[profile]
+
+_add_counter_profiles()
+
 ALGORITHM_COLORS = {
 	"Petgraph" : "black",
 	"Kruskal (petgraph)" : "black",
@@ -198,63 +547,166 @@ ALGORITHM_COLORS = {
 	"1-cut" : "tab:gray"
 }
 
-def main() :
-	parser = argparse.ArgumentParser( description = "Parse stt benchmark results." )
-	parser.add_argument( "--input-file", required = True )
-	parser.add_argument( "--profile", choices = sorted( PROFILES.keys() ), required = True )
-	parser.add_argument( "--output-file", help = "Where to write the resulting image. If omitted, shows the image instead", default = None )
-	parser.add_argument( "--exclude", nargs="*", choices = sorted( ALGORITHM_COLORS.keys() ), help ="Exclude the specified algorithm(s)" )
-	parser.add_argument( "-v", "--verbose", help = "Print results to stdout" )
-	args = parser.parse_args()
-	
-	OUTPUT_FOR_PAPER = True # Whether to produce plots for the paper, or larger plots to be read separately
-	
-	print( f"Drawing plot from {args.input_file} with profile {args.profile}..." )
-	
-	try :
-		x_profile, y_profile, title_profile, include_func, *validators = PROFILES[args.profile]
-	except KeyError :
-		print( f"ERROR: Unknown profile '{args.profile}'" )
-		sys.exit( -1 )
+OUTPUT_FOR_PAPER = True # Whether to produce plots for the paper, or larger plots to be read separately
+
+
+# Profiles of the time per query/edge/vertex over n, whose growth the scaling laws (see `scaling`) model
+FIT_PROFILES = ( "queries-uniform", "mst-vertices", "degenerate" )
+
+def is_fittable( profile : str ) -> bool :
+	"""Whether scaling laws can be fitted to the profile, see `FIT_PROFILES`."""
+	return profile in FIT_PROFILES
+
+def fit_scaling( points : Dict[str, List[PointStats]] ) -> Dict[str, List["scaling.Fit"]] :
+	"""Fit the scaling laws of `scaling.MODELS` to the curve of each implementation, best first."""
+	return {name : scaling.fit_models( [p.x for p in stats], [p.center for p in stats] ) for name, stats in points.items()}
+
+
+class LoadedResults :
+	"""Benchmark results of one or more input files, loaded once and shared by several figures, or
+	queried from a result store for each profile."""
 	
-	with open( args.input_file, "r" ) as fp :
-		benchmarks = [
-			b for line in fp for b in load_benchmarks( line )
-			if include_func( b["name"] ) and b["name"] not in ( args.exclude or () )
-		]
+	def __init__( self, input_files : List[str], cache : bool = False, cache_dir : Optional[str] = None, streaming : bool = False,
+			store : Optional["result_store.StoreQuery"] = None ) :
+		self.input_files = input_files
+		self.streaming = streaming
+		self.store = store
+		self.table = None # Set if reading through the cache
+		self.benchmarks = None # Set if neither reading through the cache nor streaming nor querying a store
+		if store is not None :
+			pass
+		elif cache :
+			try :
+				import result_cache
+			except ImportError :
+				print( "WARNING: numpy not installed, not using the cache" )
+				cache = False
+		if cache :
+			self.table = result_cache.load_table( input_files, cache_dir )
+		elif not streaming :
+			self.benchmarks = [b for input_file in input_files for b in iter_benchmarks( input_file, lambda _ : True )]
 	
-	if len( benchmarks ) == 0 :
-		print( "No valid benchmarks found" )
-		return
+	def point_stats( self, profile : str, exclude : Sequence[str] = (), estimator : str = "mean" ) \
+			-> Optional[Tuple[Dict[str, List[PointStats]], List[JsonObj]]] :
+		"""Compute the statistics of each implementation at each x value for the given profile.
+		
+		Returns the statistics (sorted by x) together with the benchmarks used for validation and the
+		title, or None if there are no matching benchmarks. Robust statistics (see `robust_stats`) are
+		computed unless streaming."""
+		if self.streaming and estimator != "mean" :
+			raise ValueError( f"The {estimator} estimator needs all values and is not available when streaming" )
+		x_profile, y_profile, title_profile, include_func, *validators = PROFILES[profile]
+		include = lambda name : include_func( name ) and name not in exclude
+		
+		if self.table is not None :
+			import aggregation
+			table = aggregation.filter_names( self.table, include )
+			benchmarks = aggregation.representative_records( table )
+		elif self.streaming :
+			benchmark_iter = ( b for input_file in self.input_files for b in iter_benchmarks( input_file, include ) )
+			stats_map, benchmarks = aggregate_streaming( benchmark_iter, x_profile, y_profile )
+		elif self.store is not None :
+			benchmarks = self.store.records( PROFILE_BENCHMARKS[profile], PROFILE_SWEEPS.get( profile ), include )
+		else :
+			benchmarks = [b for b in self.benchmarks if include( b["name"] )]
+		
+		if len( benchmarks ) == 0 :
+			print( "No valid benchmarks found" )
+			return None
+		
+		for validator in validators :
+			validator( benchmarks )
+		
+		if self.table is not None :
+			points = aggregation.point_stats( aggregation.aggregate( table, x_profile, y_profile ), estimator )
+		elif self.streaming :
+			points = {name : [stats.point( x ) for x, stats in sorted( b.items() )] for name, b in stats_map.items()}
+		else :
+			benchmark_map = collections.defaultdict( lambda : collections.defaultdict( lambda : [] ) )
+			for benchmark in benchmarks :
+				x = x_profile.index( benchmark )
+				benchmark_map[benchmark["name"]][x].append( y_profile.value( benchmark ) )
+			points = {name : [PointStats.of( x, ys, estimator ) for x, ys in sorted( b.items() )] for name, b in benchmark_map.items()}
+		return points, benchmarks
 	
-	for validator in validators :
-		validator( benchmarks )
+	def aggregate( self, profile : str, exclude : Sequence[str] = (), verbose : bool = False, estimator : str = "mean" ) \
+			-> Optional[Tuple[List[Tuple[str, List[float], List[float], List[float], List[PointStats]]], List[JsonObj]]] :
+		"""Compute the plotted points of each implementation for the given profile, using the given
+		estimator for the y values and their spread.
+		
+		Returns the points together with the benchmarks used for validation and the title, or None if
+		there are no matching benchmarks."""
+		result = self.point_stats( profile, exclude, estimator )
+		if result is None :
+			return None
+		points, benchmarks = result
+		return plot_points( points, verbose ), benchmarks
 	
-	benchmark_map = collections.defaultdict( lambda : collections.defaultdict( lambda : [] ) )
-	for benchmark in benchmarks :
-		x = x_profile.index( benchmark )
-		benchmark_map[benchmark["name"]][x].append( y_profile.value( benchmark ) )
-	benchmark_map = {k : dict( val ) for k, val in benchmark_map.items()}
+	def summarize( self, profile : str, exclude : Sequence[str] = (), estimator : str = "mean", fit : bool = False,
+			extrapolate_to : Optional[float] = None ) -> bool :
+		"""Print the statistics for the given profile as a table, optionally followed by the fitted
+		scaling laws. Returns whether there were any matching benchmarks."""
+		result = self.point_stats( profile, exclude, estimator )
+		if result is None :
+			return False
+		points, benchmarks = result
+		x_profile, y_profile, title_profile, *_ = PROFILES[profile]
+		title = title_profile if isinstance( title_profile, str ) else title_profile.title( benchmarks )
+		print_summary( title, x_profile.label, y_profile.label, points, estimator )
+		if fit :
+			print()
+			scaling.print_fits( fit_scaling( points ), x_profile.label, y_profile.label, extrapolate_to )
+		return True
+
+
+def draw_plot( profile : str, impls_with_plots : List[Tuple[str, List[float], List[float], List[float], List[PointStats]]],
+		benchmarks : List[JsonObj], output_file : Optional[str], bands : bool = False,
+		fits : Optional[Dict[str, List["scaling.Fit"]]] = None, extrapolate_to : Optional[float] = None, block : bool = True ) :
+	"""Draw the given points, and show the figure or save it to `output_file`.
 	
-	impls_with_plots = [(name, *plot_data( name, b, args.verbose ) ) for name, b in benchmark_map.items()]
-	impls_with_plots.sort( key = lambda t : t[2][-1], reverse = True ) # Sort by last value
+	With `bands`, the spread is drawn as a shaded band rather than error bars, and points with
+	outliers (circles) or drift (triangles) are marked. The best of the given `fits` of each
+	implementation is drawn as a dashed line, extended up to `extrapolate_to`. Without `block`, a
+	shown figure is only drawn, so the caller can keep updating it."""
+	x_profile, y_profile, title_profile, *_ = PROFILES[profile]
+	plt = _pyplot()
 	
 	linewidth = 1.5
-	if args.output_file :
+	if output_file :
 		if OUTPUT_FOR_PAPER :
 			plt.figure( figsize = (4.5, 4) )
 			linewidth = 1
 		else :
 			plt.figure( figsize = (11.69, 8.27) )  # A4
 	
+	ticks = getattr( x_profile, "ticks", None )
 	max_y = 0
-	for impl, xs, ys, stdevs in impls_with_plots :
+	for impl, xs, ys, stdevs, points in impls_with_plots :
+		if ticks is not None :
+			xs = [list( ticks ).index( x ) for x in xs]
 		max_y = max( max_y, max( ys ) )
 		print( impl, ys )
-		if None not in stdevs :
+		if bands :
+			color = ALGORITHM_COLORS.get( impl )
+			plt.plot( xs, ys, label = impl, color = color, linewidth = linewidth )
+			if None not in stdevs :
+				plt.fill_between( xs, [y - s for y, s in zip( ys, stdevs )], [y + s for y, s in zip( ys, stdevs )],
+						color = color, alpha = 0.2, linewidth = 0 )
+			for marker, flagged in ( ( "o", lambda r : r.outliers > 0 ), ( "^", lambda r : r.drifting ) ) :
+				marked = [( x, y ) for x, y, p in zip( xs, ys, points ) if p.robust is not None and flagged( p.robust )]
+				if marked :
+					plt.scatter( *zip( *marked ), marker = marker, facecolors = "none", edgecolors = color, zorder = 3 )
+		elif None not in stdevs :
 			plt.errorbar( xs, ys, yerr = [stdevs, stdevs], capsize = 2, label = impl, color = ALGORITHM_COLORS[impl], linewidth = linewidth )
 		else :
 			plt.plot( xs, ys, label = impl, linewidth = linewidth )
+		
+		if fits and fits.get( impl ) :
+			best = fits[impl][0]
+			lo, hi = min( xs ), max( max( xs ), extrapolate_to or 0 )
+			grid = [lo * ( hi / lo ) ** ( i / 100 ) for i in range( 101 )] # Evenly spaced on a log scale
+			plt.plot( grid, [best.predict( n ) for n in grid], linestyle = "--", color = ALGORITHM_COLORS.get( impl ),
+					linewidth = linewidth / 2 )
 
 	plt.xlabel( x_profile.label )
 	if isinstance( title_profile, str ) :
@@ -264,23 +716,341 @@ def main() :
 	
 	if x_profile.log_scale :
 		plt.xscale( "log" )
+	if ticks is not None :
+		plt.xticks( range( len( ticks ) ), list( ticks.values() ) )
 	plt.ylabel( y_profile.label )
-	if 50 <= max_y <= 100 :
+	y_log_scale = getattr( y_profile, "log_scale", False )
+	if y_log_scale :
+		plt.yscale( "log" )
+	elif 50 <= max_y <= 100 :
 		plt.yticks( range( 0, int( max_y+1 ), 5 ) )
 	# Otherwise: default
 	
 	# Create legend
-	if not OUTPUT_FOR_PAPER or args.output_file is None :
+	if not OUTPUT_FOR_PAPER or output_file is None :
 		plt.legend()
 
-	plt.axis( ymin = 0 )
+	if not y_log_scale :
+		plt.axis( ymin = 0 )
 	
-	if args.output_file is None :
+	if output_file is None and not block :
+		plt.draw()
+	elif output_file is None :
 		print( "Showing plot..." )
 		plt.show()
 	else :
-		print( f"Saving plot to {args.output_file}..." )
-		plt.savefig( args.output_file )
+		print( f"Saving plot to {output_file}..." )
+		plt.savefig( output_file )
+		plt.close()
+
+
+def report_fits( profile : str, impls_with_plots : List[Tuple[str, List[float], List[float], List[float], List[PointStats]]],
+		extrapolate_to : Optional[float] ) -> Dict[str, List["scaling.Fit"]] :
+	"""Fit and print the scaling laws of the plotted curves."""
+	x_profile, y_profile, *_ = PROFILES[profile]
+	fits = fit_scaling( {impl : points for impl, *_, points in impls_with_plots} )
+	scaling.print_fits( fits, x_profile.label, y_profile.label, extrapolate_to )
+	return fits
+
+
+### Watch mode
+
+class FileTail :
+	"""Reads the lines appended to a file since the last read."""
+	
+	def __init__( self, path : str ) :
+		self.path = path
+		self.reset()
+	
+	def reset( self ) :
+		self.offset = 0
+		self.inode = None
+		self.partial = b"" # Incomplete last line
+	
+	def read_lines( self ) -> Optional[List[str]] :
+		"""The complete lines appended since the last call, or None if the file was replaced,
+		truncated or deleted since (e.g. by a benchmark script starting over)."""
+		try :
+			st = os.stat( self.path )
+		except FileNotFoundError :
+			return None if self.inode is not None else []
+		if ( self.inode is not None and st.st_ino != self.inode ) or st.st_size < self.offset :
+			return None
+		self.inode = st.st_ino
+		if st.st_size == self.offset :
+			return []
+		with open( self.path, "rb" ) as fp :
+			fp.seek( self.offset )
+			data = fp.read()
+		self.offset += len( data )
+		*lines, self.partial = ( self.partial + data ).split( b"\n" )
+		return [line.decode() for line in lines if line.strip()]
+
+def watch( args : argparse.Namespace ) :
+	"""Redraw the figure (or print the summary) every `args.interval` seconds while the input files
+	grow. Only lines appended since the last refresh are read and folded into running statistics."""
+	x_profile, y_profile, title_profile, include_func, *validators = PROFILES[args.profile]
+	exclude = args.exclude or ()
+	include = lambda name : include_func( name ) and name not in exclude
+	live = not args.summary and args.output_file is None
+	plt = _pyplot( None if live else "Agg" ) if not args.summary else None
+	if live :
+		plt.ion()
+	
+	tails = [FileTail( f ) for f in args.input_file]
+	aggregate = StreamingAggregate( x_profile, y_profile )
+	drawn = False
+	try :
+		while True :
+			lines = []
+			replaced = None
+			for tail in tails :
+				new_lines = tail.read_lines()
+				if new_lines is None :
+					replaced = tail.path
+					break
+				lines += new_lines
+			if replaced is not None :
+				print( f"{replaced} was replaced, starting over" )
+				aggregate = StreamingAggregate( x_profile, y_profile )
+				for t in tails :
+					t.reset()
+				continue
+			
+			count = aggregate.count
+			for line in lines :
+				for benchmark in load_benchmarks( line ) :
+					if include( benchmark["name"] ) :
+						aggregate.add( benchmark )
+			
+			if aggregate.count > count :
+				print( f"{time.strftime( '%H:%M:%S' )}: {aggregate.count - count} new benchmarks, {aggregate.count} in total" )
+				benchmarks = aggregate.benchmarks()
+				for validator in validators :
+					validator( benchmarks )
+				if args.summary :
+					title = title_profile if isinstance( title_profile, str ) else title_profile.title( benchmarks )
+					print_summary( title, x_profile.label, y_profile.label, aggregate.points() )
+				else :
+					impls_with_plots = plot_points( aggregate.points(), args.verbose )
+					fits = report_fits( args.profile, impls_with_plots, args.extrapolate ) if args.fit else None
+					if live :
+						plt.clf()
+						draw_plot( args.profile, impls_with_plots, benchmarks, None, fits = fits, extrapolate_to = args.extrapolate, block = False )
+					else :
+						# Write to a temporary file first, so viewers never see a partially written figure
+						root, ext = os.path.splitext( args.output_file )
+						tmp_file = f"{root}.tmp{ext}"
+						draw_plot( args.profile, impls_with_plots, benchmarks, tmp_file, fits = fits, extrapolate_to = args.extrapolate )
+						os.replace( tmp_file, args.output_file )
+				drawn = True
+			
+			if live :
+				if drawn and not plt.get_fignums() :
+					break # Window closed
+				plt.pause( args.interval )
+			else :
+				time.sleep( args.interval )
+	except KeyboardInterrupt :
+		print( "Stopped watching" )
+
+
+### Batch mode
+
+def read_manifest( manifest_file : str ) -> List[Tuple[str, str, str]] :
+	"""Read (input file, profile, output file) triples, one whitespace-separated triple per line.
+	
+	Empty lines and lines starting with '#' are ignored."""
+	entries = []
+	with open( manifest_file, "r" ) as fp :
+		for line_no, line in enumerate( fp, 1 ) :
+			line = line.strip()
+			if not line or line.startswith( "#" ) :
+				continue
+			parts = line.split()
+			if len( parts ) != 3 :
+				raise ValueError( f"{manifest_file}:{line_no}: expected '<input file> <profile> <output file>'" )
+			if parts[1] not in PROFILES :
+				raise ValueError( f"{manifest_file}:{line_no}: unknown profile '{parts[1]}'" )
+			entries.append( tuple( parts ) )
+	return entries
+
+def input_hash( input_file : str, profile : str, exclude : Sequence[str], estimator : str,
+		fit : bool = False, extrapolate_to : Optional[float] = None ) -> str :
+	"""Hash of everything that determines a figure: the input contents and the plot options."""
+	h = hashlib.sha256()
+	with open( input_file, "rb" ) as fp :
+		for chunk in iter( lambda : fp.read( 1 << 20 ), b"" ) :
+			h.update( chunk )
+	h.update( json.dumps( [profile, sorted( exclude ), estimator, fit, extrapolate_to, OUTPUT_FOR_PAPER] ).encode() )
+	return h.hexdigest()
+
+def render_figures( input_file : str, figures : List[Tuple[str, str]], args : argparse.Namespace ) -> List[str] :
+	"""Load `input_file` once and render each (profile, output file) figure. Returns the output
+	files that were written."""
+	plt = _pyplot( "Agg" )
+	results = LoadedResults( [input_file], args.cache, args.cache_dir, args.streaming )
+	written = []
+	for profile, output_file in figures :
+		print( f"Drawing plot from {input_file} with profile {profile}..." )
+		try :
+			aggregated = results.aggregate( profile, args.exclude or (), args.verbose, args.estimator )
+			if aggregated is not None :
+				fits = report_fits( profile, aggregated[0], args.extrapolate ) if args.fit and is_fittable( profile ) else None
+				draw_plot( profile, *aggregated, output_file, args.estimator != "mean", fits, args.extrapolate )
+				written.append( output_file )
+		except Exception as e :
+			print( f"ERROR: Could not render {output_file}: {e!r}" )
+			plt.close( "all" )
+	return written
+
+def render_batch( args : argparse.Namespace ) -> bool :
+	"""Render the figures of the manifest `args.batch`. Returns whether all figures were rendered."""
+	state_file = args.batch + ".state.json"
+	try :
+		with open( state_file, "r" ) as fp :
+			state = json.load( fp )
+	except ( OSError, ValueError ) :
+		state = {}
+	
+	# Group figures by input, skipping figures that are up to date
+	hashes = {}
+	figures_by_input = collections.defaultdict( list )
+	num_unreadable = 0
+	for input_file, profile, output_file in read_manifest( args.batch ) :
+		fit = args.fit and is_fittable( profile )
+		try :
+			hashes[output_file] = input_hash( input_file, profile, args.exclude or (), args.estimator, fit, args.extrapolate if fit else None )
+		except OSError as e :
+			print( f"ERROR: Could not render {output_file}: {e!r}" )
+			num_unreadable += 1
+			continue
+		if not args.force and os.path.exists( output_file ) and state.get( output_file ) == hashes[output_file] :
+			print( f"Skipping {output_file} (up to date)" )
+			continue
+		figures_by_input[input_file].append( (profile, output_file) )
+	
+	if args.jobs > 1 and len( figures_by_input ) > 1 :
+		with concurrent.futures.ProcessPoolExecutor( max_workers = args.jobs ) as pool :
+			futures = [pool.submit( render_figures, input_file, figures, args ) for input_file, figures in figures_by_input.items()]
+			written = [f for future in futures for f in future.result()]
+	else :
+		written = [f for input_file, figures in figures_by_input.items() for f in render_figures( input_file, figures, args )]
+	
+	for output_file in written :
+		state[output_file] = hashes[output_file]
+	with open( state_file, "w" ) as fp :
+		json.dump( state, fp, indent = "\t" )
+	
+	num_failed = num_unreadable + sum( len( figures ) for figures in figures_by_input.values() ) - len( written )
+	if num_failed > 0 :
+		print( f"WARNING: {num_failed} figure(s) were not rendered" )
+	return num_failed == 0
+
+
+def main() :
+	parser = argparse.ArgumentParser( description = "Parse stt benchmark results." )
+	parser.add_argument( "--input-file", nargs = "+", help = "Results file(s). Results of multiple files are combined" )
+	parser.add_argument( "--profile", choices = sorted( PROFILES.keys() ) )
+	parser.add_argument( "--output-file", help = "Where to write the resulting image. If omitted, shows the image instead", default = None )
+	parser.add_argument( "--exclude", nargs="*", choices = sorted( ALGORITHM_COLORS.keys() ), help ="Exclude the specified algorithm(s)" )
+	parser.add_argument( "-v", "--verbose", help = "Print results to stdout" )
+	parser.add_argument( "--summary", action = "store_true",
+			help = "Print mean, standard deviation and minimum per implementation and x value as a table instead of drawing a plot. Does not need matplotlib" )
+	parser.add_argument( "--estimator", choices = ESTIMATORS, default = "mean",
+			help = "How to summarize the repetitions of each point: mean ± standard deviation (default), median ± scaled MAD "
+				f"or mean ± standard deviation of the values without the lowest and highest {TRIM_FRACTION * 100:.0f}%%. "
+				"Estimators other than the mean are drawn as shaded bands, with points having outliers or drift marked" )
+	parser.add_argument( "--fit", action = "store_true",
+			help = "Fit the scaling laws c, c·log n, c·log² n and c·n to each curve, print the best fit with its residuals and draw it. "
+				f"Only for the profiles {', '.join( FIT_PROFILES )} (in batch mode, other profiles are drawn without fit)" )
+	parser.add_argument( "--extrapolate", type = float, metavar = "N", default = None,
+			help = "Predict the y value at n = N from the best fit and extend the fitted curves up to N. Implies --fit" )
+	parser.add_argument( "--streaming", action = "store_true",
+			help = "Aggregate results while reading the input file. Uses memory proportional to the number of plotted points rather than the file size" )
+	parser.add_argument( "--cache", action = "store_true",
+			help = "Read results through a columnar cache and aggregate them with numpy (requires numpy). The cache of an input file is rebuilt when the file changes" )
+	parser.add_argument( "--cache-dir", default = None, help = "Where to store the cache. Defaults to a .cache directory next to each input file" )
+	parser.add_argument( "--watch", action = "store_true",
+			help = "Keep reading the input files while they grow and redraw the figure (or print the summary) when there are new results. "
+				"Only new lines are read. Stop with Ctrl+C" )
+	parser.add_argument( "--interval", type = float, default = 10, help = "In watch mode, seconds between checks for new results (default: 10)" )
+	parser.add_argument( "--batch", metavar = "MANIFEST", default = None,
+			help = "Render all figures listed in MANIFEST, one '<input file> <profile> <output file>' triple per line, in a single process. "
+				"Each input is loaded once (read again per figure with --streaming). Figures whose input and options did not change since the last batch run are skipped" )
+	parser.add_argument( "-j", "--jobs", type = int, default = 1, help = "In batch mode, render figures of different input files in this many processes" )
+	parser.add_argument( "--force", action = "store_true", help = "In batch mode, render all figures even if they are up to date" )
+	parser.add_argument( "--store", metavar = "DB", default = None,
+			help = "Query the results of the profile's benchmark from this result store (see result_store.py) instead of reading input files" )
+	parser.add_argument( "--filter", metavar = "KEY=VALUE", action = "append", default = [],
+			help = "With --store, only use results with this value of a field, e.g. std_dev=0. Can be given multiple times" )
+	parser.add_argument( "--commit", default = None, help = "With --store, only use runs of commits starting with this prefix" )
+	parser.add_argument( "--host", default = None, help = "With --store, only use runs on this host" )
+	parser.add_argument( "--since", default = None, help = "With --store, only use runs at or after this ISO date or time, e.g. 2024-05-01" )
+	parser.add_argument( "--sweep", default = None,
+			help = "With --store, use the runs of this sweep, e.g. queries_uniform_large. Defaults to the profile's usual sweep" )
+	parser.add_argument( "--all-runs", action = "store_true",
+			help = "With --store, use the runs of all commits and hosts. By default, only the commit and host of the latest run "
+				"of the sweep are used, unless --commit or --since is given" )
+	args = parser.parse_args()
+	
+	if args.extrapolate is not None :
+		args.fit = True
+	
+	if ( args.streaming or args.watch ) and args.estimator != "mean" :
+		parser.error( "--estimator needs all values and cannot be combined with --streaming or --watch" )
+	
+	if args.batch is not None :
+		success = render_batch( args )
+		print( "Done." )
+		sys.exit( 0 if success else 1 )
+	
+	store = None
+	if args.store is not None :
+		if args.input_file is not None or args.cache or args.streaming or args.watch :
+			parser.error( "--store cannot be combined with --input-file, --cache, --streaming or --watch" )
+		import result_store
+		try :
+			filters = dict( result_store.parse_filter( f ) for f in args.filter )
+		except argparse.ArgumentTypeError as e :
+			parser.error( str( e ) )
+		store = result_store.StoreQuery( args.store, filters, args.commit, args.host, args.since, args.sweep, args.all_runs )
+	elif args.filter or args.commit or args.host or args.since or args.sweep or args.all_runs :
+		parser.error( "--filter, --commit, --host, --since, --sweep and --all-runs need --store" )
+	elif args.input_file is None :
+		parser.error( "--input-file or --store is required unless --batch is given" )
+	if args.profile is None :
+		parser.error( "--profile is required unless --batch is given" )
+	
+	if not args.summary :
+		print( f"Drawing plot from {args.store or ', '.join( args.input_file )} with profile {args.profile}..." )
+	
+	if args.profile not in PROFILES :
+		print( f"ERROR: Unknown profile '{args.profile}'" )
+		sys.exit( -1 )
+	
+	if args.fit and not is_fittable( args.profile ) :
+		parser.error( f"--fit and --extrapolate need one of the profiles {', '.join( FIT_PROFILES )}, not {args.profile}" )
+	
+	try :
+		if args.watch :
+			watch( args )
+			return
+		
+		results = LoadedResults( args.input_file or [], args.cache, args.cache_dir, args.streaming, store )
+		if args.summary :
+			results.summarize( args.profile, args.exclude or (), args.estimator, args.fit, args.extrapolate )
+			return
+		
+		aggregated = results.aggregate( args.profile, args.exclude or (), args.verbose, args.estimator )
+	except MissingCountersError as e :
+		print( f"ERROR: {e}" )
+		sys.exit( 1 )
+	if aggregated is None :
+		return
+	
+	fits = report_fits( args.profile, aggregated[0], args.extrapolate ) if args.fit else None
+	draw_plot( args.profile, *aggregated, args.output_file, args.estimator != "mean", fits, args.extrapolate )
 	print( "Done." )
 
 if __name__ == "__main__" :
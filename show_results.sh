@@ -1,9 +1,16 @@
 #!/bin/bash
 
-python3 show_benchmarks/visualize.py --input-file results/queries_uniform.jsonl --profile queries-uniform
-python3 show_benchmarks/visualize.py --input-file results/queries_uniform_large.jsonl --profile queries-uniform
+python3 show_benchmarks/visualize.py --input-file results/queries_uniform.jsonl --profile queries-uniform --cache
+python3 show_benchmarks/visualize.py --input-file results/queries_uniform_large.jsonl --profile queries-uniform --cache
 
-python3 show_benchmarks/visualize.py --input-file results/degenerate.jsonl --profile degenerate
-python3 show_benchmarks/visualize.py --input-file results/degenerate_noisy.jsonl --profile degenerate-noisy
+python3 show_benchmarks/visualize.py --input-file results/degenerate.jsonl --profile degenerate --cache
+python3 show_benchmarks/visualize.py --input-file results/degenerate_noisy.jsonl --profile degenerate-noisy --cache
 
-python3 show_benchmarks/visualize.py --input-file results/mst.jsonl --profile mst-vertices
+python3 show_benchmarks/visualize.py --input-file results/mst.jsonl --profile mst-vertices --cache
+
+python3 show_benchmarks/visualize.py --input-file results/cache.jsonl --profile cache --cache
+
+python3 show_benchmarks/visualize.py --input-file results/latency.jsonl --profile latency-percentiles --cache
+python3 show_benchmarks/visualize.py --input-file results/memory_empty.jsonl --profile memory --cache
+python3 show_benchmarks/visualize.py --input-file results/memory_group.jsonl --profile memory --cache
+python3 show_benchmarks/visualize.py --input-file results/memory_monoid.jsonl --profile memory --cache
@@ -1,5 +1,8 @@
 ///! Utilities for benchmarking
 
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::fmt::{Display, Formatter};
+use std::sync::atomic::{AtomicUsize, Ordering};
 use std::time::{Duration, Instant};
 
 use rand::Rng;
@@ -20,20 +23,14 @@ use Query::*;
 
 use self::ImplDesc::*;
 
-/// A query to a dynamic forest
-pub enum Query<TWeight : MonoidWeight> {
-	InsertEdge( NodeIdx, NodeIdx, TWeight ),
-	DeleteEdge( NodeIdx, NodeIdx ),
-	PathWeight( NodeIdx, NodeIdx )
-}
+pub use stt::Query;
 
-impl<TWeight : MonoidWeight> Query<TWeight> {
-	pub fn execute(&self, f : &mut impl DynamicForest<TWeight=TWeight> )
-	{
-		match *self {
-			InsertEdge( u, v, weight ) => f.link( u, v, weight ),
-			DeleteEdge( u, v ) => f.cut( u, v ),
-			PathWeight( u, v ) => assert!( f.compute_path_weight( u, v ).is_some() )
+/// Check the results of [DynamicForest::execute_batch()] on generated queries, whose path weight
+/// queries are between connected nodes.
+fn check_path_weights<TWeight : MonoidWeight>( queries : &[Query<TWeight>], path_weights : &[Option<TWeight>] ) {
+	for (q, w) in queries.iter().zip( path_weights ) {
+		if let PathWeight( u, v ) = q {
+			assert!( w.is_some(), "No path between {u} and {v}" );
 		}
 	}
 }
@@ -106,29 +103,470 @@ pub fn generate_queries_with_node_dist<TWeight : MonoidWeight, TRng : Rng>(
 }
 
 
-/// Execute the given queries on the given dynamic forest and measure the elapsed time.
-pub fn benchmark_queries_on<TDynForest>( f : &mut TDynForest, queries : &Vec<Query<TDynForest::TWeight>> ) -> Duration
+/// Execute the given queries on the given dynamic forest and measure the elapsed time and, if
+/// given, the hardware performance counters.
+pub fn benchmark_queries_on<TDynForest>( f : &mut TDynForest, queries : &Vec<Query<TDynForest::TWeight>>,
+	counters : Option<&PerfCounters> ) -> (Duration, Option<CounterValues>)
 	where TDynForest : DynamicForest
 {
-	let start = Instant::now();
-	for q in queries {
-		q.execute( f );
+	let mut path_weights = vec![None; queries.len()];
+	if let Some( c ) = counters {
+		c.start();
 	}
-	start.elapsed()
+	let start = Instant::now();
+	f.execute_batch( queries, &mut path_weights );
+	let duration = start.elapsed();
+	let counter_values = counters.map( |c| c.stop() );
+	check_path_weights( queries, &path_weights );
+	(duration, counter_values)
 }
 
 
 /// Create a new dynamic forest of the given type, then execute the given queries on the given
-/// dynamic forest and measure the total elapsed time (including creation of the dynamic forest).
-pub fn benchmark_queries<TDynForest>( num_vertices : usize, queries : &Vec<Query<TDynForest::TWeight>> ) -> Duration
+/// dynamic forest and measure the total elapsed time (including creation of the dynamic forest)
+/// and, if given, the hardware performance counters.
+pub fn benchmark_queries<TDynForest>( num_vertices : usize, queries : &Vec<Query<TDynForest::TWeight>>,
+	counters : Option<&PerfCounters> ) -> (Duration, Option<CounterValues>)
 	where TDynForest : DynamicForest
 {
+	let mut path_weights = vec![None; queries.len()];
+	if let Some( c ) = counters {
+		c.start();
+	}
+	let start = Instant::now();
+	let mut f = TDynForest::new( num_vertices );
+	f.execute_batch( queries, &mut path_weights );
+	let duration = start.elapsed();
+	let counter_values = counters.map( |c| c.stop() );
+	check_path_weights( queries, &path_weights );
+	(duration, counter_values)
+}
+
+
+/// A low-overhead clock for timing single queries. Reads the time stamp counter on x86_64 (which
+/// takes a few nanoseconds, but does not wait for preceding instructions to finish), and falls back
+/// to [Instant] elsewhere. Ticks are converted to nanoseconds using a ratio calibrated against
+/// [Instant].
+#[derive(Clone, Copy)]
+pub struct CycleClock {
+	#[cfg_attr(target_arch = "x86_64", allow(dead_code))]
+	origin : Instant,
+	ns_per_tick : f64
+}
+
+impl CycleClock {
+	/// Create a clock, measuring its frequency for the given duration.
+	pub fn calibrate( duration : Duration ) -> CycleClock {
+		let mut clock = CycleClock{ origin : Instant::now(), ns_per_tick : 1. };
+		let start = Instant::now();
+		let start_ticks = clock.now();
+		while start.elapsed() < duration {}
+		let ticks = clock.now().wrapping_sub( start_ticks );
+		if ticks > 0 {
+			clock.ns_per_tick = start.elapsed().as_nanos() as f64 / ticks as f64;
+		}
+		clock
+	}
+	
+	#[inline(always)]
+	pub fn now( &self ) -> u64 {
+		#[cfg(target_arch = "x86_64")]
+		unsafe { std::arch::x86_64::_rdtsc() }
+		#[cfg(not(target_arch = "x86_64"))]
+		{ self.origin.elapsed().as_nanos() as u64 }
+	}
+	
+	pub fn ns_per_tick( &self ) -> f64 {
+		self.ns_per_tick
+	}
+	
+	pub fn to_nanos( &self, ticks : u64 ) -> f64 {
+		ticks as f64 * self.ns_per_tick
+	}
+}
+
+
+const SUB_BUCKET_BITS : u32 = 5;
+const SUB_BUCKETS : u64 = 1 << SUB_BUCKET_BITS;
+const NUM_BUCKETS : usize = ( ( 64 - SUB_BUCKET_BITS + 1 ) as usize ) << SUB_BUCKET_BITS;
+
+/// A histogram of durations (in arbitrary ticks) with logarithmically growing buckets, like HDR
+/// histograms: values below 64 have their own bucket, and each larger power of two is split into
+/// 32 buckets, so a bucket's values differ by at most about 3%.
+#[derive(Clone)]
+pub struct LatencyHistogram {
+	counts : Vec<u64>,
+	count : u64,
+	max : u64
+}
+
+impl LatencyHistogram {
+	pub fn new() -> LatencyHistogram {
+		LatencyHistogram{ counts : vec![0; NUM_BUCKETS], count : 0, max : 0 }
+	}
+	
+	fn bucket( value : u64 ) -> usize {
+		if value < SUB_BUCKETS {
+			value as usize
+		}
+		else {
+			let shift = 63 - value.leading_zeros() - SUB_BUCKET_BITS;
+			( ( ( shift + 1 ) as usize ) << SUB_BUCKET_BITS ) + ( ( value >> shift ) - SUB_BUCKETS ) as usize
+		}
+	}
+	
+	/// The smallest value in the given bucket
+	fn bucket_low( bucket : usize ) -> u64 {
+		let group = ( bucket >> SUB_BUCKET_BITS ) as u32;
+		let sub = bucket as u64 & ( SUB_BUCKETS - 1 );
+		if group == 0 { sub } else { ( SUB_BUCKETS + sub ) << ( group - 1 ) }
+	}
+	
+	/// The largest value in the given bucket
+	fn bucket_high( bucket : usize ) -> u64 {
+		if bucket + 1 == NUM_BUCKETS { u64::MAX } else { Self::bucket_low( bucket + 1 ) - 1 }
+	}
+	
+	#[inline]
+	pub fn record( &mut self, value : u64 ) {
+		self.counts[Self::bucket( value )] += 1;
+		self.count += 1;
+		self.max = self.max.max( value );
+	}
+	
+	pub fn merge( &mut self, other : &LatencyHistogram ) {
+		for (c, o) in self.counts.iter_mut().zip( &other.counts ) {
+			*c += o;
+		}
+		self.count += other.count;
+		self.max = self.max.max( other.max );
+	}
+	
+	pub fn count( &self ) -> u64 {
+		self.count
+	}
+	
+	pub fn max( &self ) -> u64 {
+		self.max
+	}
+	
+	/// The largest value of the bucket containing the given percentile (at most the maximum), or 0
+	/// if the histogram is empty.
+	pub fn value_at_percentile( &self, percentile : f64 ) -> u64 {
+		let rank = ( ( percentile / 100. * self.count as f64 ).ceil() as u64 ).clamp( 1, self.count.max( 1 ) );
+		let mut seen = 0;
+		for (bucket, &c) in self.counts.iter().enumerate() {
+			seen += c;
+			if seen >= rank {
+				return Self::bucket_high( bucket ).min( self.max );
+			}
+		}
+		0
+	}
+	
+	/// The smallest value and the count of each non-empty bucket
+	pub fn buckets( &self ) -> impl Iterator<Item=(u64, u64)> + '_ {
+		self.counts.iter().enumerate()
+			.filter( |(_, &c)| c > 0 )
+			.map( |(bucket, &c)| ( Self::bucket_low( bucket ), c ) )
+	}
+}
+
+/// Latency histograms of each query type
+#[derive(Clone)]
+pub struct QueryLatencies {
+	pub link : LatencyHistogram,
+	pub cut : LatencyHistogram,
+	pub path_weight : LatencyHistogram
+}
+
+impl QueryLatencies {
+	pub fn new() -> QueryLatencies {
+		QueryLatencies{ link : LatencyHistogram::new(), cut : LatencyHistogram::new(), path_weight : LatencyHistogram::new() }
+	}
+	
+	#[inline]
+	pub fn record<TWeight : MonoidWeight>( &mut self, query : &Query<TWeight>, ticks : u64 ) {
+		match query {
+			InsertEdge( _, _, _ ) => self.link.record( ticks ),
+			DeleteEdge( _, _ ) => self.cut.record( ticks ),
+			PathWeight( _, _ ) => self.path_weight.record( ticks )
+		}
+	}
+	
+	/// The histogram of all queries
+	pub fn all( &self ) -> LatencyHistogram {
+		let mut result = self.link.clone();
+		result.merge( &self.cut );
+		result.merge( &self.path_weight );
+		result
+	}
+	
+	/// The histograms of each query type, with the name used in the benchmark output
+	pub fn by_type( &self ) -> [(&'static str, &LatencyHistogram); 3] {
+		[( "link", &self.link ), ( "cut", &self.cut ), ( "path_weight", &self.path_weight )]
+	}
+}
+
+
+/// Like [benchmark_queries], but also measure the latency of each query with the given clock.
+/// Timing each query adds some overhead to the total time.
+pub fn benchmark_queries_latency<TDynForest>( num_vertices : usize, queries : &Vec<Query<TDynForest::TWeight>>,
+	clock : &CycleClock ) -> (Duration, QueryLatencies)
+	where TDynForest : DynamicForest
+{
+	let mut latencies = QueryLatencies::new();
 	let start = Instant::now();
 	let mut f = TDynForest::new( num_vertices );
 	for q in queries {
+		let query_start = clock.now();
 		q.execute( &mut f );
+		latencies.record( q, clock.now().wrapping_sub( query_start ) );
 	}
-	start.elapsed()
+	(start.elapsed(), latencies)
+}
+
+
+/// A global allocator that keeps track of the number of allocated bytes. Use it in a benchmark
+/// binary with
+/// ```ignore
+/// #[global_allocator]
+/// static ALLOCATOR : CountingAllocator = CountingAllocator;
+/// ```
+pub struct CountingAllocator;
+
+static ALLOCATED_BYTES : AtomicUsize = AtomicUsize::new( 0 );
+static PEAK_ALLOCATED_BYTES : AtomicUsize = AtomicUsize::new( 0 );
+
+impl CountingAllocator {
+	fn added( size : usize ) {
+		let allocated = ALLOCATED_BYTES.fetch_add( size, Ordering::Relaxed ) + size;
+		PEAK_ALLOCATED_BYTES.fetch_max( allocated, Ordering::Relaxed );
+	}
+	
+	/// The number of bytes currently allocated
+	pub fn allocated_bytes() -> usize {
+		ALLOCATED_BYTES.load( Ordering::Relaxed )
+	}
+	
+	/// The maximum number of bytes allocated at once since the last [reset_peak](Self::reset_peak())
+	pub fn peak_allocated_bytes() -> usize {
+		PEAK_ALLOCATED_BYTES.load( Ordering::Relaxed )
+	}
+	
+	pub fn reset_peak() {
+		PEAK_ALLOCATED_BYTES.store( Self::allocated_bytes(), Ordering::Relaxed );
+	}
+}
+
+unsafe impl GlobalAlloc for CountingAllocator {
+	unsafe fn alloc( &self, layout : Layout ) -> *mut u8 {
+		let ptr = System.alloc( layout );
+		if !ptr.is_null() {
+			Self::added( layout.size() );
+		}
+		ptr
+	}
+	
+	unsafe fn alloc_zeroed( &self, layout : Layout ) -> *mut u8 {
+		let ptr = System.alloc_zeroed( layout );
+		if !ptr.is_null() {
+			Self::added( layout.size() );
+		}
+		ptr
+	}
+	
+	unsafe fn dealloc( &self, ptr : *mut u8, layout : Layout ) {
+		System.dealloc( ptr, layout );
+		ALLOCATED_BYTES.fetch_sub( layout.size(), Ordering::Relaxed );
+	}
+	
+	unsafe fn realloc( &self, ptr : *mut u8, layout : Layout, new_size : usize ) -> *mut u8 {
+		let new_ptr = System.realloc( ptr, layout, new_size );
+		if !new_ptr.is_null() {
+			ALLOCATED_BYTES.fetch_sub( layout.size(), Ordering::Relaxed );
+			Self::added( new_size );
+		}
+		new_ptr
+	}
+}
+
+
+/// The peak resident set size of this process in bytes, if available (only on Linux).
+pub fn peak_rss_bytes() -> Option<usize> {
+	let status = std::fs::read_to_string( "/proc/self/status" ).ok()?;
+	let line = status.lines().find( |l| l.starts_with( "VmHWM:" ) )?;
+	let kib : usize = line.trim_start_matches( "VmHWM:" ).trim().trim_end_matches( "kB" ).trim().parse().ok()?;
+	Some( kib * 1024 )
+}
+
+/// Reset the peak resident set size to the current resident set size. Returns false if this is not
+/// possible (only supported on Linux).
+pub fn reset_peak_rss() -> bool {
+	std::fs::write( "/proc/self/clear_refs", "5" ).is_ok()
+}
+
+
+/// The hardware events counted by [PerfCounters]: name in the JSON output, perf event type and
+/// config (see `man perf_event_open`)
+const PERF_EVENTS : [(&str, u32, u64); 5] = [
+	( "cycles", 0, 0 ), // PERF_TYPE_HARDWARE, PERF_COUNT_HW_CPU_CYCLES
+	( "instructions", 0, 1 ), // PERF_TYPE_HARDWARE, PERF_COUNT_HW_INSTRUCTIONS
+	( "l1d_misses", 3, 0x10000 ), // PERF_TYPE_HW_CACHE, L1D | READ << 8 | MISS << 16
+	( "llc_misses", 3, 0x10002 ), // PERF_TYPE_HW_CACHE, LL | READ << 8 | MISS << 16
+	( "branch_misses", 0, 5 ) // PERF_TYPE_HARDWARE, PERF_COUNT_HW_BRANCH_MISSES
+];
+
+/// Values of hardware performance counters by name, see [PerfCounters]
+pub type CounterValues = Vec<(&'static str, u64)>;
+
+/// `struct perf_event_attr` up to `config1` (`PERF_ATTR_SIZE_VER0`)
+#[cfg(target_os = "linux")]
+#[repr(C)]
+#[derive(Default)]
+struct PerfEventAttr {
+	type_ : u32,
+	size : u32,
+	config : u64,
+	sample_period : u64,
+	sample_type : u64,
+	read_format : u64,
+	flags : u64,
+	wakeup_events : u32,
+	bp_type : u32,
+	config1 : u64
+}
+
+#[cfg(target_os = "linux")]
+mod perf_consts {
+	pub const FORMAT_TOTAL_TIME_ENABLED : u64 = 1 << 0;
+	pub const FORMAT_TOTAL_TIME_RUNNING : u64 = 1 << 1;
+	pub const FLAG_DISABLED : u64 = 1 << 0;
+	pub const FLAG_EXCLUDE_KERNEL : u64 = 1 << 5;
+	pub const FLAG_EXCLUDE_HV : u64 = 1 << 6;
+	pub const IOC_ENABLE : u64 = 0x2400;
+	pub const IOC_DISABLE : u64 = 0x2401;
+	pub const IOC_RESET : u64 = 0x2403;
+}
+
+/// Hardware performance counters of the current thread (cycles, instructions, L1 data cache and
+/// last level cache read misses, branch misses), counting user space only. Uses
+/// `perf_event_open`, so it is only available on Linux, and only if `perf_event_paranoid` allows
+/// it. If the CPU cannot count all events at once, the counts are extrapolated from the time
+/// each counter was running.
+pub struct PerfCounters {
+	counters : Vec<(&'static str, std::fs::File)>
+}
+
+impl PerfCounters {
+	/// Open the counters. Events that the CPU does not support are skipped. Fails if none of the
+	/// counters can be opened.
+	#[cfg(target_os = "linux")]
+	pub fn open() -> std::io::Result<PerfCounters> {
+		use std::os::unix::io::FromRawFd;
+		use perf_consts::*;
+		
+		let mut counters = Vec::new();
+		let mut error = None;
+		for (name, type_, config) in PERF_EVENTS {
+			let attr = PerfEventAttr{
+				type_, config,
+				size : std::mem::size_of::<PerfEventAttr>() as u32,
+				read_format : FORMAT_TOTAL_TIME_ENABLED | FORMAT_TOTAL_TIME_RUNNING,
+				flags : FLAG_DISABLED | FLAG_EXCLUDE_KERNEL | FLAG_EXCLUDE_HV,
+				..Default::default()
+			};
+			// This thread, on any CPU, no group, no flags
+			let fd = unsafe { libc::syscall( libc::SYS_perf_event_open, &attr as *const PerfEventAttr, 0, -1, -1, 0 ) };
+			if fd < 0 {
+				error = Some( std::io::Error::last_os_error() );
+			}
+			else {
+				counters.push( ( name, unsafe { std::fs::File::from_raw_fd( fd as libc::c_int ) } ) );
+			}
+		}
+		match error {
+			Some( e ) if counters.is_empty() => Err( e ),
+			_ => Ok( PerfCounters{ counters } )
+		}
+	}
+	
+	#[cfg(not(target_os = "linux"))]
+	pub fn open() -> std::io::Result<PerfCounters> {
+		Err( std::io::Error::new( std::io::ErrorKind::Unsupported, "Performance counters are only supported on Linux" ) )
+	}
+	
+	/// The names of the counters that could be opened
+	pub fn names( &self ) -> impl Iterator<Item=&'static str> + '_ {
+		self.counters.iter().map( |(name, _)| *name )
+	}
+	
+	#[cfg(target_os = "linux")]
+	fn ioctl_all( &self, request : u64 ) {
+		use std::os::unix::io::AsRawFd;
+		for (name, file) in &self.counters {
+			let res = unsafe { libc::ioctl( file.as_raw_fd(), request as _, 0 ) };
+			assert!( res >= 0, "Controlling the {name} counter failed: {}", std::io::Error::last_os_error() );
+		}
+	}
+	
+	/// Reset the counters to zero and start counting
+	pub fn start( &self ) {
+		#[cfg(target_os = "linux")]
+		{
+			self.ioctl_all( perf_consts::IOC_RESET );
+			self.ioctl_all( perf_consts::IOC_ENABLE );
+		}
+	}
+	
+	/// Stop counting and return the counts since [start](Self::start())
+	pub fn stop( &self ) -> CounterValues {
+		#[cfg(target_os = "linux")]
+		self.ioctl_all( perf_consts::IOC_DISABLE );
+		self.counters.iter().map( |(name, file)| {
+			use std::io::Read;
+			// Value, time enabled, time running
+			let mut buf = [0u8; 24];
+			(&*file).read_exact( &mut buf ).expect( format!( "Reading the {name} counter failed" ).as_str() );
+			let field = |i : usize| u64::from_ne_bytes( buf[8*i..8*(i+1)].try_into().unwrap() );
+			let (value, enabled, running) = (field( 0 ), field( 1 ), field( 2 ));
+			let scaled = if running == 0 || running == enabled { value }
+				else { ( value as f64 * enabled as f64 / running as f64 ).round() as u64 };
+			(*name, scaled)
+		} ).collect()
+	}
+}
+
+/// Open the performance counters if `enabled`, panicking with the reason if that is not possible.
+pub fn open_perf_counters( enabled : bool ) -> Option<PerfCounters> {
+	if !enabled {
+		return None;
+	}
+	let counters = PerfCounters::open()
+		.unwrap_or_else( |e| panic!( "Cannot open performance counters ({e}). Counting needs a CPU with a performance \
+			monitoring unit (often not available in virtual machines) and /proc/sys/kernel/perf_event_paranoid at most 2." ) );
+	let missing : Vec<_> = PERF_EVENTS.iter().map( |(name, _, _)| *name )
+		.filter( |n| !counters.names().any( |m| m == *n ) ).collect();
+	if !missing.is_empty() {
+		eprintln!( "WARNING: Counters not supported: {}", missing.join( ", " ) );
+	}
+	Some( counters )
+}
+
+/// Add the counter values to a JSON result, as one field per counter.
+pub fn add_counters_to_json( result : &mut json::JsonValue, counters : &Option<CounterValues> ) {
+	for (name, value) in counters.iter().flatten() {
+		result[*name] = (*value).into();
+	}
+}
+
+/// Human-readable counter values, divided by `per` (e.g. the number of queries), with the given
+/// unit, e.g. "per query".
+pub fn format_counters( counters : &CounterValues, per : usize, unit : &str ) -> String {
+	let values : Vec<_> = counters.iter()
+		.map( |(name, value)| format!( "{name}: {:.1}", *value as f64 / per as f64 ) )
+		.collect();
+	format!( "{} {unit}", values.join( ", " ) )
 }
 
 
@@ -201,6 +639,30 @@ impl PrintType {
 }
 
 
+/// Enum listing possible weight types.
+#[derive( Copy, Clone, PartialEq, Eq, PartialOrd, Ord, ValueEnum )]
+pub enum WeightType {
+	/// No weights and thus no additional data stored per node
+	Empty,
+	
+	/// Signed-add group weights, some strage and update overhead
+	Group,
+	
+	/// Unsigned-max monoid weights, more strage and update overhead
+	Monoid
+}
+
+impl Display for WeightType {
+	fn fmt( &self, f : &mut Formatter<'_> ) -> std::fmt::Result {
+		write!( f, "{}", match self {
+			Self::Empty => "empty",
+			Self::Group => "group",
+			Self::Monoid => "monoid"
+		} )
+	}
+}
+
+
 /// Enum listing possible dynamic tree implementations, usable by CLAP.
 #[derive( Copy, Clone, PartialEq, Eq, PartialOrd, Ord, ValueEnum )]
 pub enum ImplDesc {
@@ -0,0 +1,170 @@
+use std::io::{stdout, Write};
+
+use clap::Parser;
+use rand::SeedableRng;
+use rand::rngs::StdRng;
+use rand::seq::SliceRandom;
+use stt::{DynamicForest, NodeIdx};
+use stt::common::EmptyGroupWeight;
+use stt::generate::{GeneratableMonoidWeight, generate_edge};
+use stt::link_cut::*;
+use stt::onecut::*;
+use stt::pg::*;
+use stt::twocut::mtrtt::*;
+use stt::twocut::splaytt::*;
+
+use stt_benchmarks::{bench_util, do_for_impl_empty};
+use stt_benchmarks::bench_util::{ImplDesc, ImplName, PerfCounters, PrintType, Query};
+use stt_benchmarks::bench_util::PrintType::*;
+
+
+struct Helper {
+	num_groups : usize,
+	group_size : usize,
+	queries_per_group : usize,
+	queries : Vec<Query<EmptyGroupWeight>>,
+	seed : u64,
+	print : PrintType,
+	counters : Option<PerfCounters>
+}
+
+impl Helper {
+	/// Partition the nodes into `num_groups` groups of `group_size` consecutive nodes and generate
+	/// `num_rounds` rounds of queries. In each round, every group receives a burst of
+	/// `queries_per_group` queries between its own nodes, with the groups in random order.
+	fn new( num_groups : usize, group_size : usize, queries_per_group : usize, num_rounds : usize,
+			seed : u64, print : PrintType, counters : Option<PerfCounters> ) -> Helper
+	{
+		if print == Print {
+			print!( "Generating queries..." );
+			stdout().flush().expect( "Flushing failed!" );
+		}
+
+		let mut rng = StdRng::seed_from_u64( seed );
+		let mut groups : Vec<usize> = (0..num_groups).collect();
+		let mut node_pairs = Vec::with_capacity( num_rounds * num_groups * queries_per_group );
+		for _ in 0..num_rounds {
+			groups.shuffle( &mut rng );
+			for &g in &groups {
+				let offset = g * group_size;
+				for _ in 0..queries_per_group {
+					let (u, v) = generate_edge( group_size, &mut rng );
+					node_pairs.push( ( NodeIdx::new( offset + u ), NodeIdx::new( offset + v ) ) );
+				}
+			}
+		}
+
+		// Groups are disjoint, so the trees generated here never span multiple groups
+		let queries = bench_util::transform_into_queries( num_groups * group_size, node_pairs.into_iter(),
+			&mut rng, EmptyGroupWeight::generate );
+
+		if print == Print {
+			println!( " Done." );
+		}
+
+		Helper{ num_groups, group_size, queries_per_group, queries, seed, print, counters }
+	}
+
+	fn benchmark<TDynForest>( &self, impl_name : &str )
+		where TDynForest : DynamicForest<TWeight=EmptyGroupWeight>
+	{
+		let (duration, counters) = bench_util::benchmark_queries::<TDynForest>( self.num_groups * self.group_size, &self.queries,
+			self.counters.as_ref() );
+		if self.print == Print {
+			let per_query_str = format!( "({:.3}µs/query)", duration.as_micros() as f64 / ( self.queries.len() as f64 ) );
+			println!( "{impl_name:<20} {:8.3}ms {per_query_str:>17}", duration.as_micros() as f64 / 1000. );
+			if let Some( counters ) = &counters {
+				println!( "    {}", bench_util::format_counters( counters, self.queries.len(), "per query" ) );
+			}
+		}
+		else if self.print == Json {
+			let mut result = json::object!{
+				name : impl_name,
+				num_groups : self.num_groups,
+				group_size : self.group_size,
+				queries_per_group : self.queries_per_group,
+				num_queries : self.queries.len(),
+				seed : self.seed,
+				time_ns : usize::try_from( duration.as_nanos() )
+					.expect( format!( "Duration too long: {}", duration.as_nanos() ).as_str() )
+			};
+			bench_util::add_counters_to_json( &mut result, &counters );
+			println!( "{}", json::stringify( result ) )
+		}
+	}
+}
+
+
+macro_rules! do_benchmark {
+	( $obj : ident, $impl_tpl : ident ) => {
+		$obj.benchmark::<$impl_tpl>( <$impl_tpl as ImplName>::name() )
+	}
+}
+
+
+#[derive(Parser)]
+#[command(name = "Locality benchmark")]
+struct CLI {
+	/// Number of node groups
+	#[arg(short='g', long, default_value_t = 10)]
+	num_groups : usize,
+
+	/// Number of nodes in each group (at least 2)
+	#[arg(short='n', long, default_value_t = 100)]
+	group_size : usize,
+
+	/// Number of consecutive queries within one group
+	#[arg(short='q', long, default_value_t = 100)]
+	queries_per_group : usize,
+
+	/// Number of rounds. In each round, every group receives one burst of queries
+	#[arg(short, long, default_value_t = 10)]
+	rounds : usize,
+
+	/// Print the results in human-readable form
+	#[arg(short, long, default_value_t = false)]
+	print : bool,
+
+	/// Output the results as json
+	#[arg(short, long, default_value_t = false)]
+	json : bool,
+
+	/// Seed for the random query generator
+	#[arg(short, long, default_value_t = 0)]
+	seed : u64,
+
+	/// Measure hardware performance counters (cycles, instructions, cache and branch misses) of
+	/// the queries. Only available on Linux
+	#[arg(long, default_value_t = false)]
+	counters : bool,
+
+	/// Implementations to benchmark. Include all if omitted.
+	impls : Vec<ImplDesc>
+}
+
+
+fn main() {
+	let cli = CLI::parse();
+	assert!( cli.group_size >= 2, "Groups must have at least 2 nodes" );
+
+	let print = PrintType::from_args( cli.print, cli.json );
+
+	let impls : Vec<ImplDesc>;
+	if !cli.impls.is_empty() {
+		impls = cli.impls;
+	}
+	else {
+		impls = ImplDesc::all()
+	}
+
+	let helper = Helper::new( cli.num_groups, cli.group_size, cli.queries_per_group, cli.rounds, cli.seed, print,
+		bench_util::open_perf_counters( cli.counters ) );
+	if print == Print {
+		println!( "Benchmarking {} queries in bursts of {} on {} groups of {} vertices",
+			helper.queries.len(), cli.queries_per_group, cli.num_groups, cli.group_size );
+	}
+
+	for imp in impls {
+		do_for_impl_empty!( imp, do_benchmark, helper );
+	}
+}
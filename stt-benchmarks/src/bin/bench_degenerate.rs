@@ -13,21 +13,22 @@ use stt::pg::*;
 use stt::twocut::mtrtt::*;
 use stt::twocut::splaytt::*;
 
-use stt_benchmarks::bench_util::{ImplDesc, ImplName, PrintType};
+use stt_benchmarks::{bench_util, do_for_impl_empty};
+use stt_benchmarks::bench_util::{ImplDesc, ImplName, PerfCounters, PrintType};
 use stt_benchmarks::bench_util::PrintType::{Json, Print};
-use stt_benchmarks::do_for_impl_empty;
 
 
-struct Helper {
+struct Helper<'a> {
 	num_nodes : usize,
 	print : PrintType,
 	std_dev : f64,
-	rng : StdRng
+	rng : StdRng,
+	counters : Option<&'a PerfCounters>
 }
 
-impl Helper {
-	fn new( num_nodes : usize, print : PrintType, std_dev : f64, seed : u64 ) -> Self {
-		Helper { num_nodes, print, std_dev, rng : StdRng::seed_from_u64( seed ) }
+impl<'a> Helper<'a> {
+	fn new( num_nodes : usize, print : PrintType, std_dev : f64, seed : u64, counters : Option<&'a PerfCounters> ) -> Self {
+		Helper { num_nodes, print, std_dev, rng : StdRng::seed_from_u64( seed ), counters }
 	}
 	
 	fn generate_index( &mut self, i : usize ) -> NodeIdx {
@@ -44,6 +45,9 @@ impl Helper {
 	fn benchmark_degenerate<TDynTree>( &mut self, impl_name : &str )
 		where TDynTree : DynamicForest<TWeight=EmptyGroupWeight>
 	{
+		if let Some( c ) = self.counters {
+			c.start();
+		}
 		let start = Instant::now();
 		let mut f = TDynTree::new( self.num_nodes + 1 );
 		for i in 0..(self.num_nodes-1) {
@@ -55,19 +59,25 @@ impl Helper {
 			f.compute_path_weight( self.generate_index( i ), last_node );
 		}
 		let dur = start.elapsed();
+		let counters = self.counters.map( |c| c.stop() );
 		
 		if self.print == Print {
 			let millis = dur.as_micros() as f64 / 1000.;
-			println!( "{:<20} {millis:10.3}ms", impl_name.to_owned() + ":" )
+			println!( "{:<20} {millis:10.3}ms", impl_name.to_owned() + ":" );
+			if let Some( counters ) = &counters {
+				println!( "    {}", bench_util::format_counters( counters, self.num_nodes, "per vertex" ) );
+			}
 		}
 		else if self.print == Json {
-			println!( "{}", json::stringify( json::object!{
+			let mut result = json::object!{
 				"type" : "degenerate",
 				num_vertices : self.num_nodes,
 				name : impl_name,
 				std_dev : self.std_dev,
 				time_ns : dur.as_nanos() as usize
-			} ) )
+			};
+			bench_util::add_counters_to_json( &mut result, &counters );
+			println!( "{}", json::stringify( result ) )
 		}
 	}
 }
@@ -107,6 +117,11 @@ struct CLI {
 	#[arg(long, default_value_t = false)]
 	json : bool,
 	
+	/// Measure hardware performance counters (cycles, instructions, cache and branch misses) of
+	/// each benchmark. Only available on Linux
+	#[arg(long, default_value_t = false)]
+	counters : bool,
+	
 	/// Implementations to benchmark. Include all if omitted.
 	impls : Vec<ImplDesc>
 }
@@ -122,12 +137,14 @@ fn main() {
 		impls = ImplDesc::all()
 	}
 	
+	let counters = bench_util::open_perf_counters( cli.counters );
 	for imp in impls {
 		benchmark( imp, &mut Helper::new(
 			cli.num_nodes,
 			PrintType::from_args( cli.print, cli.json ),
 			cli.std_dev,
-			cli.seed
+			cli.seed,
+			counters.as_ref()
 		) );
 	}
 }
\ No newline at end of file
@@ -0,0 +1,190 @@
+use std::io::{stdout, Write};
+use std::time::Instant;
+
+use clap::Parser;
+use rand::SeedableRng;
+use rand::rngs::StdRng;
+use stt::{DynamicForest, MemoryUsage};
+use stt::common::{EmptyGroupWeight, IsizeAddGroupWeight, UsizeMaxMonoidWeight};
+use stt::generate::GeneratableMonoidWeight;
+use stt::link_cut::*;
+use stt::onecut::*;
+use stt::pg::*;
+use stt::twocut::mtrtt::*;
+use stt::twocut::splaytt::*;
+
+use stt_benchmarks::{bench_util, do_for_impl_empty, do_for_impl_group, do_for_impl_monoid};
+use stt_benchmarks::bench_util::{CountingAllocator, ImplDesc, ImplName, PrintType, Query, WeightType};
+use stt_benchmarks::bench_util::PrintType::*;
+
+
+#[global_allocator]
+static ALLOCATOR : CountingAllocator = CountingAllocator;
+
+
+struct Helper<TWeight>
+	where TWeight : GeneratableMonoidWeight
+{
+	num_vertices : usize,
+	weight : WeightType,
+	queries : Vec<Query<TWeight>>,
+	seed : u64,
+	print : PrintType
+}
+
+impl<TWeight> Helper<TWeight>
+	where TWeight : GeneratableMonoidWeight
+{
+	fn new( num_vertices : usize, num_queries : usize, weight : WeightType, seed : u64, print : PrintType ) -> Helper<TWeight> {
+		if print == Print {
+			print!( "Generating queries..." );
+			stdout().flush().expect( "Flushing failed!" );
+		}
+
+		let mut rng = StdRng::seed_from_u64( seed );
+		let queries = bench_util::generate_queries_default( num_vertices, num_queries, &mut rng );
+
+		if print == Print {
+			println!( " Done." );
+			println!( "Measuring memory of {} vertices with {weight} weights after {} queries{}{}", num_vertices, queries.len(),
+				if cfg!( feature = "space_efficient_nodes" ) { " (space efficient nodes)" } else { "" },
+				if cfg!( feature = "compact_node_idx" ) { " (compact node indices)" } else { "" } );
+		}
+
+		Helper{ num_vertices, weight, queries, seed, print }
+	}
+
+	/// Create the dynamic forest and execute the queries, then report the memory it uses, the
+	/// bytes allocated (in total and at the peak) while doing so, and the peak RSS of the process.
+	fn benchmark<TDynForest>( &self, impl_name : &str )
+		where TDynForest : DynamicForest<TWeight=TWeight> + MemoryUsage
+	{
+		let rss_reset = bench_util::reset_peak_rss();
+		let baseline = CountingAllocator::allocated_bytes();
+		CountingAllocator::reset_peak();
+
+		let start = Instant::now();
+		let mut f = TDynForest::new( self.num_vertices );
+		for q in &self.queries {
+			q.execute( &mut f );
+		}
+		let duration = start.elapsed();
+
+		let heap_bytes = f.heap_bytes();
+		let allocated_bytes = CountingAllocator::allocated_bytes().saturating_sub( baseline );
+		let peak_allocated_bytes = CountingAllocator::peak_allocated_bytes().saturating_sub( baseline );
+		let peak_rss_bytes = if rss_reset { bench_util::peak_rss_bytes() } else { None };
+		drop( f );
+
+		if self.print == Print {
+			let per_vertex = heap_bytes as f64 / self.num_vertices as f64;
+			let rss_str = peak_rss_bytes.map_or( "?".to_string(), |b| format!( "{:.1}MiB", b as f64 / ( 1 << 20 ) as f64 ) );
+			println!( "{impl_name:<20} {heap_bytes:>12} bytes ({per_vertex:6.1}/vertex), {allocated_bytes:>12} allocated, \
+				{peak_allocated_bytes:>12} at peak, peak RSS {rss_str}" )
+		}
+		else if self.print == Json {
+			let mut result = json::object!{
+				name : impl_name,
+				weight : self.weight.to_string(),
+				space_efficient_nodes : cfg!( feature = "space_efficient_nodes" ),
+				compact_node_idx : cfg!( feature = "compact_node_idx" ),
+				num_vertices : self.num_vertices,
+				num_queries : self.queries.len(),
+				seed : self.seed,
+				heap_bytes : heap_bytes,
+				allocated_bytes : allocated_bytes,
+				peak_allocated_bytes : peak_allocated_bytes,
+				time_ns : usize::try_from( duration.as_nanos() )
+					.expect( format!( "Duration too long: {}", duration.as_nanos() ).as_str() )
+			};
+			if let Some( peak_rss_bytes ) = peak_rss_bytes {
+				result["peak_rss_bytes"] = peak_rss_bytes.into();
+			}
+			println!( "{}", json::stringify( result ) )
+		}
+	}
+}
+
+
+#[derive(Parser)]
+#[command(name = "Memory benchmark")]
+struct CLI {
+	/// Number of vertices in the underlying graph
+	#[arg(short, long, default_value_t = 1000)]
+	num_vertices : usize,
+
+	/// Number of random queries executed before measuring, so the forest contains edges
+	/// [default: 20*NUM_VERTICES]
+	#[arg(short='q', long)]
+	num_queries : Option<usize>,
+
+	/// What weights to use in the benchmark
+	#[arg(short, long, default_value_t = WeightType::Empty)]
+	weight : WeightType,
+
+	/// Print the results in human-readable form
+	#[arg(short, long, default_value_t = false)]
+	print : bool,
+
+	/// Output the results as json
+	#[arg(short, long, default_value_t = false)]
+	json : bool,
+
+	/// Seed for the random query generator
+	#[arg(short, long, default_value_t = 0)]
+	seed : u64,
+
+	/// Implementations to benchmark. Include all if omitted.
+	impls : Vec<ImplDesc>
+}
+
+
+fn main() {
+	let cli = CLI::parse();
+	let num_queries = cli.num_queries.unwrap_or( 20 * cli.num_vertices );
+	let print = PrintType::from_args( cli.print, cli.json );
+
+	let impls : Vec<ImplDesc>;
+	if !cli.impls.is_empty() {
+		impls = cli.impls;
+	}
+	else {
+		impls = ImplDesc::all()
+	}
+
+	match cli.weight {
+		WeightType::Empty => {
+			let helper = Helper::<EmptyGroupWeight>::new( cli.num_vertices, num_queries, cli.weight, cli.seed, print );
+			macro_rules! do_benchmark_empty {
+				( $obj : ident, $impl_tpl : ident ) => {
+					$obj.benchmark::<$impl_tpl>( <$impl_tpl as ImplName>::name() )
+				}
+			}
+			for imp in impls {
+				do_for_impl_empty!( imp, do_benchmark_empty, helper );
+			}
+		}
+		WeightType::Group => {
+			let helper = Helper::<IsizeAddGroupWeight>::new( cli.num_vertices, num_queries, cli.weight, cli.seed, print );
+			macro_rules! do_benchmark_group {
+				( $obj : ident, $impl_tpl : ident ) => {
+					$obj.benchmark::<$impl_tpl<IsizeAddGroupWeight>>( <$impl_tpl<IsizeAddGroupWeight> as ImplName>::name() )
+				}
+			}
+			for imp in impls {
+				do_for_impl_group!( imp, do_benchmark_group, helper );
+			}
+		}
+		WeightType::Monoid => {
+			let helper = Helper::<UsizeMaxMonoidWeight>::new( cli.num_vertices, num_queries, cli.weight, cli.seed, print );
+			macro_rules! do_benchmark_monoid {
+				( $obj : ident, $impl_tpl : ident ) => {
+					$obj.benchmark::<$impl_tpl<UsizeMaxMonoidWeight>>( <$impl_tpl<UsizeMaxMonoidWeight> as ImplName>::name() )
+				}
+			}
+			for imp in impls {
+				do_for_impl_monoid!( imp, do_benchmark_monoid, helper );
+			}
+		}
+	}
+}
@@ -22,8 +22,8 @@ use stt::pg::PetgraphDynamicForest;
 use stt::twocut::mtrtt::*;
 use stt::twocut::splaytt::*;
 
-use stt_benchmarks::do_for_impl_monoid;
-use stt_benchmarks::bench_util::{ImplDesc, ImplName, PrintType};
+use stt_benchmarks::{bench_util, do_for_impl_monoid};
+use stt_benchmarks::bench_util::{CounterValues, ImplDesc, ImplName, PerfCounters, PrintType};
 use stt_benchmarks::bench_util::PrintType::{Json, Print};
 
 type MSTWeight = UsizeMaxMonoidWeightWithMaxEdge;
@@ -77,20 +77,22 @@ fn generate_sparse_edges_with_weights( num_vertices : usize, num_edges : usize,
 
 
 /// Helper struct to store configuration, aggregate results, etc.
-struct Helper {
+struct Helper<'a> {
 	num_vertices : usize,
 	input_edges : Vec<EdgeWithWeight>,
 	input_edge_weights : HashMap<Edge, usize>,
 	verify : bool,
 	print : PrintType,
 	verification_total_weight : Option<usize>,
-	verification_edges: Option<Vec<(usize, usize)>>
+	verification_edges: Option<Vec<(usize, usize)>>,
+	counters : Option<&'a PerfCounters>
 }
 
-impl Helper {
-	fn new( num_vertices : usize, input_edges : Vec<EdgeWithWeight>, verify : bool, print : PrintType ) -> Helper {
+impl<'a> Helper<'a> {
+	fn new( num_vertices : usize, input_edges : Vec<EdgeWithWeight>, verify : bool, print : PrintType,
+			counters : Option<&'a PerfCounters> ) -> Helper<'a> {
 		let mut h = Helper{ num_vertices, input_edges, input_edge_weights : HashMap::new(), verify,
-				print, verification_total_weight : None, verification_edges : None };
+				print, verification_total_weight : None, verification_edges : None, counters };
 		for (u, v, weight) in &h.input_edges {
 			h.input_edge_weights.insert( (*u,*v),*weight );
 			h.input_edge_weights.insert( (*v,*u),*weight );
@@ -107,24 +109,40 @@ impl Helper {
 		edges.iter().map( |(u,v)| self.get_input_edge_weight( *u, *v ) ).sum()
 	}
 	
-	fn report_test_result( &mut self, impl_name : &str, dur : Duration ) {
+	fn start_counters( &self ) {
+		if let Some( c ) = self.counters {
+			c.start();
+		}
+	}
+	
+	fn stop_counters( &self ) -> Option<CounterValues> {
+		self.counters.map( |c| c.stop() )
+	}
+	
+	fn report_test_result( &mut self, impl_name : &str, dur : Duration, counters : Option<CounterValues> ) {
 		if self.print == Print {
 			let millis = dur.as_micros() as f64 / 1000.;
 			let micros_per_edge = dur.as_micros() as f64 / self.input_edges.len() as f64;
-			println!( "{:<20} {millis:10.3}ms ({micros_per_edge:7.3}µs/edge)", impl_name.to_owned() + ":" )
+			println!( "{:<20} {millis:10.3}ms ({micros_per_edge:7.3}µs/edge)", impl_name.to_owned() + ":" );
+			if let Some( counters ) = &counters {
+				println!( "    {}", bench_util::format_counters( counters, self.input_edges.len(), "per edge" ) );
+			}
 		}
 		else if self.print == Json {
-			println!( "{}", json::stringify( json::object!{
+			let mut result = json::object!{
 				num_vertices : self.num_vertices,
 				num_edges : self.input_edges.len(),
 				name : impl_name,
 				time_ns : dur.as_nanos() as usize
-			} ) )
+			};
+			bench_util::add_counters_to_json( &mut result, &counters );
+			println!( "{}", json::stringify( result ) )
 		}
 	}
 	
 	fn mst_petgraph( &mut self, benchmark: bool ) {
 		// Petgraph MST
+		self.start_counters();
 		let start = Instant::now();
 		let mut g : graph::UnGraph<(), usize> = graph::UnGraph::new_undirected();
 		let g_nodes : Vec<graph::NodeIndex> = (0..self.num_vertices).map( |_| g.add_node( () ) ).collect();
@@ -133,8 +151,9 @@ impl Helper {
 		};
 		let mst : UnGraph<(), usize> = graph::UnGraph::from_elements( petgraph::algo::min_spanning_tree( &g ) );
 		let dur = start.elapsed();
+		let counters = self.stop_counters();
 		if benchmark {
-			self.report_test_result(  "Kruskal (petgraph)", dur );
+			self.report_test_result(  "Kruskal (petgraph)", dur, counters );
 		}
 		
 		let pg_edges = mst.edge_indices()
@@ -148,11 +167,13 @@ impl Helper {
 	fn benchmark_mst<TDynForest>( &mut self, impl_name : &str )
 		where TDynForest: DynamicForest<TWeight = MSTWeight>
 	{
+		self.start_counters();
 		let start = Instant::now();
 		let mut f = TDynForest::new( self.num_vertices );
 		let mst = compute_mst( &mut f, self.input_edges.iter().copied() );
 		let dur = start.elapsed();
-		self.report_test_result( impl_name, dur );
+		let counters = self.stop_counters();
+		self.report_test_result( impl_name, dur, counters );
 	
 		if self.verify {
 			let out_edges = mst.iter().map( |(u,v)| (u.index(), v.index()) ).collect();
@@ -213,6 +234,11 @@ struct CLI {
 	#[arg(long, default_value_t = 0)]
 	seed : u64,
 	
+	/// Measure hardware performance counters (cycles, instructions, cache and branch misses) of
+	/// each MST computation. Only available on Linux
+	#[arg(long, default_value_t = false)]
+	counters : bool,
+	
 	/// Implementations to benchmark. Include all if omitted.
 	impls : Vec<ImplDesc>
 }
@@ -239,6 +265,7 @@ fn main() {
 	}
 
 	let mut rng = StdRng::seed_from_u64( seed );
+	let counters = bench_util::open_perf_counters( cli.counters );
 
 	if cli.print {
 		if all_edges {
@@ -266,7 +293,7 @@ fn main() {
 			println!( " Done." );
 		}
 		
-		let mut helper = Helper::new( num_vertices, input_edges, cli.verify, print );
+		let mut helper = Helper::new( num_vertices, input_edges, cli.verify, print, counters.as_ref() );
 		
 		helper.mst_petgraph( true );
 		for imp in &impls {
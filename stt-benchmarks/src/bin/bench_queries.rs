@@ -1,5 +1,6 @@
 use std::fmt::{Display, Formatter};
 use std::io::{stdout, Write};
+use std::time::Duration;
 
 use clap::{Parser, ValueEnum};
 use num_traits::pow::Pow;
@@ -15,11 +16,14 @@ use stt::twocut::mtrtt::*;
 use stt::twocut::splaytt::*;
 
 use stt_benchmarks::{bench_util, do_for_impl_empty, do_for_impl_group, do_for_impl_monoid};
-use stt_benchmarks::bench_util::{ImplDesc, ImplName, PrintType, Query};
+use stt_benchmarks::bench_util::{CycleClock, ImplDesc, ImplName, LatencyHistogram, PerfCounters, PrintType, Query, QueryLatencies, WeightType};
 use stt_benchmarks::bench_util::PrintType::*;
 
 const GEOM_P : f64 = 0.01;
 
+/// Latency percentiles reported with --latency, 100 being the maximum
+const LATENCY_PERCENTILES : [f64; 4] = [50., 99., 99.9, 100.];
+
 /// A distribution to choose nodes in a dynamic tree
 #[derive( Copy, Clone, PartialEq, Eq, PartialOrd, Ord, ValueEnum )]
 enum NodeDistribution {
@@ -45,14 +49,16 @@ struct Helper<TWeight>
 	num_vertices : usize,
 	queries : Vec<Query<TWeight>>,
 	seed : u64,
-	print : PrintType
+	print : PrintType,
+	latency_clock : Option<CycleClock>,
+	counters : Option<PerfCounters>
 }
 
 impl<TWeight> Helper<TWeight>
 	where TWeight : GeneratableMonoidWeight
 {
 	fn new( num_nodes: usize, num_queries : usize, seed : u64, print : PrintType,
-		   node_dist : NodeDistribution ) -> Helper<TWeight>
+		   node_dist : NodeDistribution, latency : bool, counters : bool ) -> Helper<TWeight>
 	{
 		if print == Print {
 			print!( "Generating queries with {node_dist} distribution..." );
@@ -75,25 +81,89 @@ impl<TWeight> Helper<TWeight>
 			println!( " Done." );
 		}
 		
-		Helper{ num_vertices: num_nodes, queries, seed, print }
+		let latency_clock = if latency { Some( CycleClock::calibrate( Duration::from_millis( 20 ) ) ) } else { None };
+		
+		let counters = bench_util::open_perf_counters( counters );
+		
+		Helper{ num_vertices: num_nodes, queries, seed, print, latency_clock, counters }
 	}
 	
 	fn benchmark<TDynForest>( &self, impl_name : &str )
 		where TDynForest : DynamicForest<TWeight=TWeight>
 	{
-		let duration = bench_util::benchmark_queries::<TDynForest>( self.num_vertices, &self.queries );
+		if let Some( clock ) = &self.latency_clock {
+			let (duration, latencies) = bench_util::benchmark_queries_latency::<TDynForest>( self.num_vertices, &self.queries, clock );
+			self.report_latencies( impl_name, duration, &latencies, clock );
+			return;
+		}
+		
+		let (duration, counters) = bench_util::benchmark_queries::<TDynForest>( self.num_vertices, &self.queries, self.counters.as_ref() );
 		if self.print == Print {
 			let per_query_str = format!( "({:.3}µs/query)", duration.as_micros() as f64 / ( self.queries.len() as f64 ) );
-			println!( "{impl_name:<20} {:8.3}ms {per_query_str:>17}", duration.as_micros() as f64 / 1000. )
+			println!( "{impl_name:<20} {:8.3}ms {per_query_str:>17}", duration.as_micros() as f64 / 1000. );
+			if let Some( counters ) = &counters {
+				println!( "    {}", bench_util::format_counters( counters, self.queries.len(), "per query" ) );
+			}
 		}
 		else if self.print == Json {
-			println!( "{}", json::stringify( json::object!{
+			let mut result = json::object!{
 				name : impl_name,
 				num_vertices : self.num_vertices,
 				num_queries : self.queries.len(),
 				seed : self.seed,
 				time_ns : usize::try_from( duration.as_nanos() )
 					.expect( format!( "Duration too long: {}", duration.as_nanos() ).as_str() )
+			};
+			bench_util::add_counters_to_json( &mut result, &counters );
+			println!( "{}", json::stringify( result ) )
+		}
+	}
+	
+	fn report_latencies( &self, impl_name : &str, duration : Duration, latencies : &QueryLatencies, clock : &CycleClock ) {
+		let all = latencies.all();
+		let micros = |h : &LatencyHistogram, p : f64| clock.to_nanos( h.value_at_percentile( p ) ) / 1000.;
+		if self.print == Print {
+			println!( "{impl_name:<20} {:8.3}ms", duration.as_micros() as f64 / 1000. );
+			for (type_name, h) in [( "all", &all )].into_iter().chain( latencies.by_type() ) {
+				let percentiles : Vec<_> = LATENCY_PERCENTILES.iter()
+					.map( |&p| format!( "{}: {:.3}µs", if p == 100. { "max".to_string() } else { format!( "p{p}" ) }, micros( h, p ) ) )
+					.collect();
+				println!( "    {type_name:<12} {:>8} queries, {}", h.count(), percentiles.join( ", " ) );
+			}
+		}
+		else if self.print == Json {
+			// One result per percentile, with the latency of all queries and of each query type
+			let nanos = |h : &LatencyHistogram, p : f64| ( clock.to_nanos( h.value_at_percentile( p ) ) * 10. ).round() / 10.;
+			let results : Vec<json::JsonValue> = LATENCY_PERCENTILES.iter().map( |&p| {
+				let mut result = json::object!{
+					percentile : p,
+					latency_ns : nanos( &all, p )
+				};
+				for (type_name, h) in latencies.by_type() {
+					if h.count() > 0 {
+						result[format!( "{type_name}_ns" )] = nanos( h, p ).into();
+					}
+				}
+				result
+			} ).collect();
+			let histogram_json = |h : &LatencyHistogram| {
+				let (bucket_ticks, counts) : (Vec<u64>, Vec<u64>) = h.buckets().unzip();
+				json::object!{ bucket_ticks : bucket_ticks, counts : counts }
+			};
+			println!( "{}", json::stringify( json::object!{
+				name : impl_name,
+				num_vertices : self.num_vertices,
+				num_queries : self.queries.len(),
+				seed : self.seed,
+				time_ns : usize::try_from( duration.as_nanos() )
+					.expect( format!( "Duration too long: {}", duration.as_nanos() ).as_str() ),
+				ns_per_tick : clock.ns_per_tick(),
+				histograms : json::object!{
+					link : histogram_json( &latencies.link ),
+					cut : histogram_json( &latencies.cut ),
+					path_weight : histogram_json( &latencies.path_weight )
+				},
+				results : results
 			} ) )
 		}
 	}
@@ -176,30 +246,6 @@ fn benchmark_monoid( helper : &Helper<UsizeMaxMonoidWeight>, impls: &Vec<ImplDes
 }
 
 
-/// Enum listing possible weight types.
-#[derive( Copy, Clone, PartialEq, Eq, PartialOrd, Ord, ValueEnum )]
-enum WeightType {
-	/// No weights and thus no additional data stored per node
-	Empty,
-	
-	/// Signed-add group weights, some strage and update overhead
-	Group,
-	
-	/// Unsigned-max monoid weights, more strage and update overhead
-	Monoid
-}
-
-impl Display for WeightType {
-	fn fmt( &self, f : &mut Formatter<'_> ) -> std::fmt::Result {
-		write!( f, "{}", match self {
-			Self::Empty => "empty",
-			Self::Group => "group",
-			Self::Monoid => "monoid"
-		} )
-	}
-}
-
-
 #[derive(Parser)]
 #[command(name = "Random query Benchmark")]
 struct CLI {
@@ -234,6 +280,16 @@ struct CLI {
 	#[arg(short, long, default_value_t = WeightType::Empty)]
 	weight : WeightType,
 	
+	/// Measure the latency of each query and report percentiles instead of only the total time.
+	/// Adds some timing overhead to each query
+	#[arg(short, long, default_value_t = false)]
+	latency : bool,
+	
+	/// Measure hardware performance counters (cycles, instructions, cache and branch misses) of
+	/// the queries. Only available on Linux
+	#[arg(long, default_value_t = false, conflicts_with = "latency")]
+	counters : bool,
+	
 	/// Implementations to benchmark. Include all if omitted.
 	impls : Vec<ImplDesc>
 }
@@ -259,8 +315,8 @@ fn main() {
 	}
 	
 	match cli.weight {
-		WeightType::Empty => benchmark_empty( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist ), &impls ),
-		WeightType::Group => benchmark_group( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist ), &impls ),
-		WeightType::Monoid => benchmark_monoid( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist ), &impls )
+		WeightType::Empty => benchmark_empty( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist, cli.latency, cli.counters ), &impls ),
+		WeightType::Group => benchmark_group( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist, cli.latency, cli.counters ), &impls ),
+		WeightType::Monoid => benchmark_monoid( &Helper::new( cli.num_vertices, num_queries, cli.seed, print, cli.dist, cli.latency, cli.counters ), &impls )
 	}
 }
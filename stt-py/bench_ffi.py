@@ -0,0 +1,134 @@
+"""Measure the overhead of calling the dynamic forests from Python.
+
+Executes the same random queries (generated like those of bench_queries) twice on each
+implementation: once calling `link`, `cut` and `compute_path_weight` from Python, and once natively
+in a single call. The difference of the times per query is the overhead of each call from Python,
+i.e., of crossing the language boundary and converting the arguments and results."""
+
+from typing import *
+
+import argparse
+import json
+import random
+import time
+
+import stt_py
+
+
+# Implementations by their names in the benchmarks' command line, with their names in the results
+IMPLEMENTATIONS = {
+	"link-cut" : ( stt_py.LinkCutForest, "Link-cut" ),
+	"greedy-splay" : ( stt_py.GreedySplayForest, "Greedy Splay" ),
+	"stable-greedy-splay" : ( stt_py.StableGreedySplayForest, "Stable Greedy Splay" ),
+	"two-pass-splay" : ( stt_py.TwoPassSplayForest, "2P Splay" ),
+	"stable-two-pass-splay" : ( stt_py.StableTwoPassSplayForest, "Stable 2P Splay" ),
+	"local-two-pass-splay" : ( stt_py.LocalTwoPassSplayForest, "L2P Splay" ),
+	"local-stable-two-pass-splay" : ( stt_py.StableLocalTwoPassSplayForest, "Stable L2P Splay" ),
+	"move-to-root" : ( stt_py.MoveToRootForest, "MTR" ),
+	"stable-move-to-root" : ( stt_py.StableMoveToRootForest, "Stable MTR" ),
+	"one-cut" : ( stt_py.OneCutForest, "1-cut" )
+}
+
+WEIGHT_GENERATORS : Dict[str, Callable[[random.Random], Tuple]] = {
+	"empty" : lambda rng : (),
+	"group" : lambda rng : ( rng.randint( -1000, 1000 ), ),
+	"monoid" : lambda rng : ( rng.randint( 0, 1000 ), )
+}
+
+Query = Tuple # ("link", u, v[, weight]), ("cut", u, v) or ("path_weight", u, v)
+
+
+class ParentForest :
+	"""A naive forest of parent pointers, used to generate valid queries."""
+	def __init__( self, num_vertices : int ) :
+		self.parent : List[Optional[int]] = [None] * num_vertices
+
+	def evert( self, u : int ) :
+		"""Make u the root of its tree."""
+		prev, x = None, u
+		while x is not None :
+			self.parent[x], prev, x = prev, x, self.parent[x]
+
+	def path( self, u : int, v : int ) -> Optional[List[int]] :
+		"""The vertices on the path from v to u, which is made the root, or None if not connected."""
+		self.evert( u )
+		path = [v]
+		while self.parent[path[-1]] is not None :
+			path.append( self.parent[path[-1]] )
+		return path if path[-1] == u else None
+
+
+def generate_queries( num_vertices : int, num_queries : int, weight : str, rng : random.Random ) -> List[Query] :
+	"""Random queries between uniformly chosen vertices: if the vertices are connected, either
+	query the path weight or cut a random edge on the path, otherwise link them."""
+	f = ParentForest( num_vertices )
+	weight_gen = WEIGHT_GENERATORS[weight]
+	queries = []
+	for _ in range( num_queries ) :
+		u, v = rng.sample( range( num_vertices ), 2 )
+		path = f.path( u, v )
+		if path is None :
+			f.parent[u] = v
+			queries.append( ( "link", u, v, *weight_gen( rng ) ) )
+		elif rng.random() < 0.5 :
+			queries.append( ( "path_weight", u, v ) )
+		else :
+			i = rng.randrange( len( path ) - 1 )
+			f.parent[path[i]] = None
+			queries.append( ( "cut", path[i], path[i+1] ) )
+	return queries
+
+
+def time_python( forest, queries : List[Query] ) -> int :
+	"""Execute the queries by calling the forest's methods from Python. Returns nanoseconds."""
+	methods = {"link" : forest.link, "cut" : forest.cut, "path_weight" : forest.compute_path_weight}
+	calls = [( methods[q[0]], q[1:] ) for q in queries]
+	start = time.perf_counter_ns()
+	for method, args in calls :
+		method( *args )
+	return time.perf_counter_ns() - start
+
+
+def main() :
+	parser = argparse.ArgumentParser( description = "Measure the overhead of calling the stt_py bindings from Python "
+			"by comparing random queries executed from Python with the same queries executed natively." )
+	parser.add_argument( "-n", "--num-vertices", type = int, default = 1000 )
+	parser.add_argument( "-q", "--num-queries", type = int, default = None, help = "Default: 20*NUM_VERTICES" )
+	parser.add_argument( "-w", "--weight", choices = sorted( WEIGHT_GENERATORS ), default = "empty" )
+	parser.add_argument( "-s", "--seed", type = int, default = 0 )
+	parser.add_argument( "-j", "--json", action = "store_true", help = "Output the results as JSON lines" )
+	parser.add_argument( "impls", nargs = "*", metavar = "IMPL",
+			help = f"Implementations to benchmark ({', '.join( IMPLEMENTATIONS )}). Include all if omitted" )
+	args = parser.parse_args()
+	for impl in args.impls :
+		if impl not in IMPLEMENTATIONS :
+			parser.error( f"Unknown implementation '{impl}'" )
+
+	num_queries = args.num_queries if args.num_queries is not None else 20 * args.num_vertices
+	queries = generate_queries( args.num_vertices, num_queries, args.weight, random.Random( args.seed ) )
+
+	if not args.json :
+		print( f"{len( queries )} queries on {args.num_vertices} vertices with {args.weight} weights" )
+		print( f"{'implementation':<20} {'python':>12} {'native':>12} {'overhead':>12} {'ratio':>7}" )
+	for impl in args.impls or IMPLEMENTATIONS :
+		cls, name = IMPLEMENTATIONS[impl]
+		python_ns = time_python( cls( args.num_vertices, args.weight ), queries )
+		native_ns = cls( args.num_vertices, args.weight )._time_native( queries )
+		if args.json :
+			print( json.dumps( {
+				"name" : name,
+				"weight" : args.weight,
+				"num_vertices" : args.num_vertices,
+				"num_queries" : len( queries ),
+				"seed" : args.seed,
+				"time_ns" : python_ns,
+				"native_time_ns" : native_ns
+			} ) )
+		else :
+			python_us = python_ns / 1000 / len( queries )
+			native_us = native_ns / 1000 / len( queries )
+			overhead_ns = ( python_ns - native_ns ) / len( queries )
+			print( f"{name:<20} {python_us:>10.3f}µs {native_us:>10.3f}µs {overhead_ns:>10.1f}ns {python_ns / native_ns:>6.2f}x" )
+
+if __name__ == "__main__" :
+	main()
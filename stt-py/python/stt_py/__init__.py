@@ -0,0 +1,7 @@
+"""Python bindings of the stt dynamic forest library.
+
+The forests, `compute_mst` and `BatchError` are implemented natively in `stt_py._stt_py`; see
+README.md. `stt_py.aio` provides an asyncio front-end that batches concurrent requests, and
+`stt_py.graphs` creates forests from SciPy sparse matrices and networkx graphs."""
+
+from ._stt_py import *
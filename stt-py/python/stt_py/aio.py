@@ -0,0 +1,177 @@
+"""asyncio front-end for the dynamic forests.
+
+`AsyncForest` wraps a forest and provides awaitable `link`, `cut` and `path_weight`. Requests made
+concurrently by many tasks are queued and executed as native batches (see `link_batch` etc.) on a
+worker thread, so the event loop keeps running and the overhead of each call is paid once per
+batch. Requests are executed in the order they were made, with the same results and exceptions as
+calling the forest's methods in that order."""
+
+from typing import *
+
+import asyncio
+import concurrent.futures
+import itertools
+import operator
+
+import numpy as np
+
+from . import _stt_py
+
+
+class _Request( NamedTuple ) :
+	kind : str # "link", "cut" or "path_weight"
+	u : int
+	v : int
+	weight : Any
+	future : asyncio.Future
+
+# Whether a request succeeded, and its result or exception
+Outcome = Tuple[bool, Any]
+
+
+def _int64_array( values : Iterable[Any], count : int ) -> np.ndarray :
+	"""The values as an int64 array. Raises TypeError for values that are not integers, like the
+	forests' methods, where np.fromiter alone would truncate floats."""
+	return np.fromiter( ( operator.index( x ) for x in values ), np.int64, count )
+
+
+class AsyncForest :
+	"""Awaitable operations on `forest`, which must not be used directly while wrapped.
+
+	Pending requests are flushed as one batch `max_delay` seconds after the first of them, or as
+	soon as `max_batch` requests are pending. Note that the event loop's timers might not be as
+	precise as `max_delay`. A request is executed even if the task awaiting it is cancelled."""
+	def __init__( self, forest, max_batch : int = 1024, max_delay : float = 200e-6 ) :
+		self.forest = forest
+		self.max_batch = max_batch
+		self.max_delay = max_delay
+		self._pending : List[_Request] = []
+		self._timer : Optional[asyncio.TimerHandle] = None
+		self._in_flight : Set[asyncio.Future] = set()
+		self._closed = False
+		# A single worker, so batches are executed in the order they were flushed
+		self._executor = concurrent.futures.ThreadPoolExecutor( max_workers = 1, thread_name_prefix = "stt_py.aio" )
+
+	async def link( self, u : int, v : int, weight : Optional[int] = None ) -> None :
+		"""Add an edge between u and v with the given weight (omitted for empty weights)."""
+		await self._submit( "link", u, v, weight )
+
+	async def cut( self, u : int, v : int ) -> None :
+		"""Remove the edge between u and v."""
+		await self._submit( "cut", u, v )
+
+	async def path_weight( self, u : int, v : int ) -> Optional[int] :
+		"""The weight of the path between u and v, or None if they are not connected."""
+		return await self._submit( "path_weight", u, v )
+
+	async def aclose( self ) :
+		"""Execute the pending requests, wait for them and stop the worker thread."""
+		self._flush()
+		self._closed = True
+		if self._in_flight :
+			await asyncio.wait( set( self._in_flight ) )
+		self._executor.shutdown()
+
+	async def __aenter__( self ) -> "AsyncForest" :
+		return self
+
+	async def __aexit__( self, *exc_info ) :
+		await self.aclose()
+
+	### Queueing, in the event loop's thread
+
+	def _submit( self, kind : str, u : int, v : int, weight : Any = None ) -> asyncio.Future :
+		if self._closed :
+			raise RuntimeError( "AsyncForest is closed" )
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self._pending.append( _Request( kind, u, v, weight, future ) )
+		if len( self._pending ) >= self.max_batch :
+			self._flush()
+		elif self._timer is None :
+			self._timer = loop.call_later( self.max_delay, self._flush )
+		return future
+
+	def _flush( self ) :
+		if self._timer is not None :
+			self._timer.cancel()
+			self._timer = None
+		if not self._pending :
+			return
+		requests, self._pending = self._pending, []
+		job = asyncio.get_running_loop().run_in_executor( self._executor, self._execute, requests )
+		self._in_flight.add( job )
+		job.add_done_callback( lambda j : self._resolve( requests, j ) )
+
+	def _resolve( self, requests : List[_Request], job : asyncio.Future ) :
+		self._in_flight.discard( job )
+		if job.exception() is not None :
+			outcomes : List[Outcome] = [( False, job.exception() )] * len( requests )
+		else :
+			outcomes = job.result()
+		for request, ( ok, value ) in zip( requests, outcomes ) :
+			if request.future.cancelled() :
+				continue
+			if ok :
+				request.future.set_result( value )
+			else :
+				request.future.set_exception( value )
+
+	### Execution, in the worker thread
+
+	def _execute( self, requests : List[_Request] ) -> List[Outcome] :
+		"""Execute the requests in order, as one batch per run of requests of the same kind."""
+		outcomes : List[Outcome] = []
+		for kind, run in itertools.groupby( requests, key = lambda r : r.kind ) :
+			outcomes += self._execute_run( kind, list( run ) )
+		return outcomes
+
+	def _execute_run( self, kind : str, requests : List[_Request] ) -> List[Outcome] :
+		outcomes : List[Outcome] = []
+		while requests :
+			try :
+				outcomes += [( True, result ) for result in self._execute_batch( kind, requests )]
+				break
+			except _stt_py.BatchError as e :
+				# The queries before the failed one were executed, but results of path weights are lost
+				if kind == "path_weight" :
+					outcomes += [( True, result ) for result in self._execute_batch( kind, requests[:e.index] )]
+				else :
+					outcomes += [( True, None )] * e.index
+				outcomes.append( ( False, ValueError( e.reason ) ) )
+				requests = requests[e.index + 1:]
+			except ( IndexError, OverflowError, TypeError, ValueError ) :
+				# Invalid arguments are detected before executing any query of the batch. Execute the
+				# requests one by one, so that only the invalid ones fail.
+				outcomes += [self._execute_single( r ) for r in requests]
+				break
+		return outcomes
+
+	def _execute_batch( self, kind : str, requests : List[_Request] ) -> List[Any] :
+		us = _int64_array( ( r.u for r in requests ), len( requests ) )
+		vs = _int64_array( ( r.v for r in requests ), len( requests ) )
+		if kind == "link" :
+			if self.forest.weight == "empty" :
+				if any( r.weight is not None for r in requests ) :
+					raise TypeError( "Forests with empty weights take no edge weights" )
+				self.forest.link_batch( us, vs )
+			else :
+				self.forest.link_batch( us, vs, _int64_array( ( r.weight for r in requests ), len( requests ) ) )
+			return [None] * len( requests )
+		elif kind == "cut" :
+			self.forest.cut_batch( us, vs )
+			return [None] * len( requests )
+		else :
+			weights, valid = self.forest.compute_path_weight_batch( us, vs )
+			return [w if ok else None for w, ok in zip( weights.tolist(), valid.tolist() )]
+
+	def _execute_single( self, request : _Request ) -> Outcome :
+		try :
+			if request.kind == "link" :
+				return True, self.forest.link( request.u, request.v, request.weight )
+			elif request.kind == "cut" :
+				return True, self.forest.cut( request.u, request.v )
+			else :
+				return True, self.forest.compute_path_weight( request.u, request.v )
+		except Exception as e :
+			return False, e
@@ -0,0 +1,56 @@
+"""Creating forests from SciPy sparse matrices and networkx graphs in one native call, see
+`from_edges` of the forest classes.
+
+The graphs are accessed through their methods only, so neither SciPy nor networkx is a dependency.
+Graphs with a cycle or loop are rejected with a ValueError."""
+
+from typing import *
+
+import operator
+
+import numpy as np
+
+
+def from_scipy_sparse( forest_cls, matrix, weight : str = "empty" ) :
+	"""A forest of type `forest_cls` (e.g. `stt_py.LinkCutForest`) with the edges of the adjacency
+	matrix, in any SciPy sparse format (e.g. CSR or COO). Vertex i is row and column i, and every
+	stored entry is an edge, even an explicit zero. An edge may be stored in one or both directions;
+	the weight is taken from the first stored entry, and must be an integer for group or monoid
+	weights."""
+	coo = matrix.tocoo()
+	num_vertices, num_cols = coo.shape
+	if num_vertices != num_cols :
+		raise ValueError( f"The adjacency matrix must be square, got shape {coo.shape}" )
+	rows, cols = coo.row.astype( np.int64 ), coo.col.astype( np.int64 )
+	us, vs = np.minimum( rows, cols ), np.maximum( rows, cols )
+	_, first = np.unique( us * num_vertices + vs, return_index = True )
+	first.sort()
+	weights = None
+	if weight != "empty" :
+		data = np.asarray( coo.data )[first]
+		weights = data.astype( np.int64 )
+		if not np.array_equal( weights, data ) :
+			raise ValueError( f"The matrix entries must be integers for {weight} weights" )
+	return forest_cls.from_edges( num_vertices, us[first], vs[first], weights, weight )
+
+
+def from_networkx( forest_cls, graph, weight : str = "empty", weight_attr : str = "weight" ) -> Tuple[Any, List[Hashable]] :
+	"""A forest of type `forest_cls` with the edges of the networkx graph, and the list of the
+	graph's nodes, where vertex i of the forest is nodes[i]. For group or monoid weights, each edge
+	needs an integer `weight_attr` attribute. Directed graphs are taken as undirected, so edges in
+	both directions form a cycle."""
+	nodes = list( graph )
+	index = {node : i for i, node in enumerate( nodes )}
+	edges = list( graph.edges( data = weight_attr ) )
+	us = np.fromiter( ( index[u] for u, _, _ in edges ), np.int64, len( edges ) )
+	vs = np.fromiter( ( index[v] for _, v, _ in edges ), np.int64, len( edges ) )
+	weights = None
+	if weight != "empty" :
+		if any( w is None for _, _, w in edges ) :
+			raise ValueError( f"All edges need a '{weight_attr}' attribute for {weight} weights" )
+		try :
+			# np.fromiter alone would truncate float weights
+			weights = np.fromiter( ( operator.index( w ) for _, _, w in edges ), np.int64, len( edges ) )
+		except TypeError :
+			raise ValueError( f"The '{weight_attr}' attributes must be integers for {weight} weights" ) from None
+	return forest_cls.from_edges( len( nodes ), us, vs, weights, weight ), nodes
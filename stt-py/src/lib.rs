@@ -0,0 +1,736 @@
+//! Python bindings of the dynamic forest implementations.
+//!
+//! Each implementation is a Python class, e.g. `stt_py.TwoPassSplayForest( 100, weight = "group" )`,
+//! with the operations of [DynamicForest]. The weight type is chosen when creating the forest:
+//! * `"empty"`: No weights, i.e., connectivity only. Path weights are always 0.
+//! * `"group"`: Signed integer weights, summed along paths ([IsizeAddGroupWeight]).
+//! * `"monoid"`: Unsigned integer weights, the maximum along paths ([UsizeMaxMonoidWeight]).
+//!
+//! The `*_batch` methods execute many queries of one kind in one call, given as NumPy arrays, with
+//! the GIL released.
+//!
+//! `parents` and `separator_children` return the internal rooted forest of an implementation (see
+//! [RootedForest] and [STTStructureRead]) as read-only NumPy arrays.
+//!
+//! `compute_mst` computes minimum spanning forests of graphs given as NumPy arrays, see
+//! [stt::mst].
+//!
+//! This is the native module `stt_py._stt_py`. The `stt_py` package in `python/` re-exports it and
+//! adds the asyncio front-end `stt_py.aio`.
+
+use std::panic::{self, AssertUnwindSafe};
+use std::time::Instant;
+
+use numpy::{Element, PyArray1, PyReadonlyArray1};
+use pyo3::create_exception;
+use pyo3::exceptions::{PyIndexError, PyTypeError, PyValueError};
+use pyo3::prelude::*;
+use pyo3::types::{IntoPyDict, PyTuple};
+use stt::{DynamicForest, MonoidWeight, NodeIdx, PathWeightNodeData, Query, RootedForest};
+use stt::common::{EmptyGroupWeight, IsizeAddGroupWeight, UsizeMaxMonoidWeight, UsizeMaxMonoidWeightWithMaxEdge};
+use stt::link_cut::*;
+use stt::mst;
+use stt::onecut::*;
+use stt::twocut::{CPWImplementation, NTRImplementation, StandardDynamicForest, UpdatingNodeData};
+use stt::twocut::basic::STTStructureRead;
+use stt::twocut::mtrtt::*;
+use stt::twocut::splaytt::*;
+
+
+/// The weight types supported by the bindings
+#[derive(Clone, Copy, PartialEq, Eq)]
+enum WeightType {
+	Empty,
+	Group,
+	Monoid
+}
+
+impl WeightType {
+	fn parse( name : &str ) -> PyResult<WeightType> {
+		match name {
+			"empty" => Ok( WeightType::Empty ),
+			"group" => Ok( WeightType::Group ),
+			"monoid" => Ok( WeightType::Monoid ),
+			_ => Err( PyValueError::new_err( format!( "Unknown weight type '{name}', expected 'empty', 'group' or 'monoid'" ) ) )
+		}
+	}
+
+	fn name( &self ) -> &'static str {
+		match self {
+			WeightType::Empty => "empty",
+			WeightType::Group => "group",
+			WeightType::Monoid => "monoid"
+		}
+	}
+}
+
+
+/// A weight that can be converted from and to Python
+trait PyWeight : MonoidWeight + Send + Sync {
+	/// Element type of NumPy arrays of path weights
+	type Elem : Element + Default + Send;
+
+	fn from_py( weight : Option<&PyAny> ) -> PyResult<Self>;
+
+	fn to_py( &self, py : Python ) -> PyObject;
+
+	/// Convert an int64 array of `len` weights, which must be None for empty weights
+	fn from_array( weights : Option<&PyReadonlyArray1<i64>>, len : usize ) -> PyResult<Vec<Self>>;
+
+	fn to_elem( &self ) -> Self::Elem;
+}
+
+impl PyWeight for EmptyGroupWeight {
+	type Elem = i64;
+
+	fn from_py( weight : Option<&PyAny> ) -> PyResult<Self> {
+		match weight {
+			Some( w ) if !w.is_none() => Err( PyTypeError::new_err( "Forests with empty weights take no edge weights" ) ),
+			_ => Ok( EmptyGroupWeight{} )
+		}
+	}
+
+	fn to_py( &self, py : Python ) -> PyObject {
+		0.into_py( py )
+	}
+
+	fn from_array( weights : Option<&PyReadonlyArray1<i64>>, len : usize ) -> PyResult<Vec<Self>> {
+		match weights {
+			Some( _ ) => Err( PyTypeError::new_err( "Forests with empty weights take no edge weights" ) ),
+			None => Ok( vec![EmptyGroupWeight{}; len] )
+		}
+	}
+
+	fn to_elem( &self ) -> i64 {
+		0
+	}
+}
+
+impl PyWeight for IsizeAddGroupWeight {
+	type Elem = i64;
+
+	fn from_py( weight : Option<&PyAny> ) -> PyResult<Self> {
+		Ok( IsizeAddGroupWeight::new( required_weight( weight )?.extract::<isize>()? ) )
+	}
+
+	fn to_py( &self, py : Python ) -> PyObject {
+		self.value().into_py( py )
+	}
+
+	fn from_array( weights : Option<&PyReadonlyArray1<i64>>, len : usize ) -> PyResult<Vec<Self>> {
+		required_weights( weights, len )?.iter()
+			.map( |&w| Ok( IsizeAddGroupWeight::new( w as isize ) ) )
+			.collect()
+	}
+
+	fn to_elem( &self ) -> i64 {
+		self.value() as i64
+	}
+}
+
+impl PyWeight for UsizeMaxMonoidWeight {
+	type Elem = u64;
+
+	fn from_py( weight : Option<&PyAny> ) -> PyResult<Self> {
+		Ok( UsizeMaxMonoidWeight::new( required_weight( weight )?.extract::<usize>()? ) )
+	}
+
+	fn to_py( &self, py : Python ) -> PyObject {
+		self.value().into_py( py )
+	}
+
+	fn from_array( weights : Option<&PyReadonlyArray1<i64>>, len : usize ) -> PyResult<Vec<Self>> {
+		required_weights( weights, len )?.iter()
+			.map( |&w| usize::try_from( w ).map( UsizeMaxMonoidWeight::new )
+				.map_err( |_| PyValueError::new_err( format!( "Monoid weights must not be negative: {w}" ) ) ) )
+			.collect()
+	}
+
+	fn to_elem( &self ) -> u64 {
+		self.value() as u64
+	}
+}
+
+fn required_weights( weights : Option<&PyReadonlyArray1<i64>>, len : usize ) -> PyResult<Vec<i64>> {
+	let weights = weights.ok_or_else( || PyTypeError::new_err( "Forests with group or monoid weights need edge weights" ) )?;
+	if weights.len() != len {
+		return Err( PyValueError::new_err( format!( "Got {} weights for {len} edges", weights.len() ) ) );
+	}
+	Ok( weights.as_array().to_vec() )
+}
+
+fn required_weight( weight : Option<&PyAny> ) -> PyResult<&PyAny> {
+	match weight {
+		Some( w ) if !w.is_none() => Ok( w ),
+		_ => Err( PyTypeError::new_err( "Forests with group or monoid weights need an edge weight" ) )
+	}
+}
+
+
+/// Run `body`, returning the message if it panics (e.g. an assertion of the implementation failing
+/// because an edge to cut does not exist).
+fn catch_panic_message<R>( body : impl FnOnce() -> R ) -> Result<R, String> {
+	panic::catch_unwind( AssertUnwindSafe( body ) ).map_err( |e| {
+		e.downcast_ref::<String>().cloned()
+			.or_else( || e.downcast_ref::<&str>().map( |s| s.to_string() ) )
+			.unwrap_or_else( || "Invalid operation".to_string() )
+	} )
+}
+
+/// Run `body`, turning a panic into a Python `ValueError`.
+fn catch_panic<R>( body : impl FnOnce() -> R ) -> PyResult<R> {
+	catch_panic_message( body ).map_err( PyValueError::new_err )
+}
+
+create_exception!( stt_py, BatchError, PyValueError,
+	"A query of a batch failed. The previous queries of the batch were executed. Attributes: `index` of the failed query, and `reason`, the message the query would have raised on its own." );
+
+/// The index and message of the failed query of a batch
+struct BatchFailure( usize, String );
+
+impl BatchFailure {
+	fn into_py_err( self, py : Python ) -> PyErr {
+		let BatchFailure( index, reason ) = self;
+		let err = BatchError::new_err( format!( "Query {index} of the batch failed, the previous queries were executed: {reason}" ) );
+		let value = err.value( py );
+		match value.setattr( "index", index ).and_then( |_| value.setattr( "reason", reason ) ) {
+			Ok( () ) => err,
+			Err( e ) => e
+		}
+	}
+}
+
+/// Execute `query` for each index of a batch, stopping at the first panic or error.
+fn run_batch( len : usize, mut query : impl FnMut( usize ) -> Result<(), String> ) -> Result<(), BatchFailure> {
+	for i in 0..len {
+		if let Err( msg ) = catch_panic_message( || query( i ) ).and_then( |r| r ) {
+			return Err( BatchFailure( i, msg ) );
+		}
+	}
+	Ok( () )
+}
+
+
+
+fn link<F>( f : &mut F, u : NodeIdx, v : NodeIdx, weight : Option<&PyAny>, check_connected : bool ) -> PyResult<()>
+	where F : DynamicForest, F::TWeight : PyWeight
+{
+	let weight = F::TWeight::from_py( weight )?;
+	if check_connected && f.compute_path_weight( u, v ).is_some() {
+		return Err( PyValueError::new_err( format!( "Cannot link {u} and {v}, they are already connected" ) ) );
+	}
+	catch_panic( || f.link( u, v, weight ) )
+}
+
+fn compute_path_weight<F>( py : Python, f : &mut F, u : NodeIdx, v : NodeIdx ) -> PyResult<Option<PyObject>>
+	where F : DynamicForest, F::TWeight : PyWeight
+{
+	Ok( catch_panic( || f.compute_path_weight( u, v ) )?.map( |w| w.to_py( py ) ) )
+}
+
+fn link_batch<F>( py : Python, f : &mut F, edges : Vec<(NodeIdx, NodeIdx)>, weights : Option<&PyReadonlyArray1<i64>>,
+	check_connected : bool ) -> PyResult<()>
+	where F : DynamicForest + Send, F::TWeight : PyWeight
+{
+	let weights = <F::TWeight as PyWeight>::from_array( weights, edges.len() )?;
+	py.allow_threads( || run_batch( edges.len(), |i| {
+		let (u, v) = edges[i];
+		if check_connected && f.compute_path_weight( u, v ).is_some() {
+			return Err( format!( "Cannot link {u} and {v}, they are already connected" ) );
+		}
+		f.link( u, v, weights[i] );
+		Ok( () )
+	} ) ).map_err( |e| e.into_py_err( py ) )
+}
+
+fn cut_batch<F>( py : Python, f : &mut F, edges : Vec<(NodeIdx, NodeIdx)> ) -> PyResult<()>
+	where F : DynamicForest + Send
+{
+	py.allow_threads( || run_batch( edges.len(), |i| {
+		let (u, v) = edges[i];
+		f.cut( u, v );
+		Ok( () )
+	} ) ).map_err( |e| e.into_py_err( py ) )
+}
+
+fn compute_path_weight_batch<F>( py : Python, f : &mut F, pairs : Vec<(NodeIdx, NodeIdx)> ) -> PyResult<(PyObject, PyObject)>
+	where F : DynamicForest + Send, F::TWeight : PyWeight
+{
+	let mut weights = vec![<F::TWeight as PyWeight>::Elem::default(); pairs.len()];
+	let mut valid = vec![false; pairs.len()];
+	py.allow_threads( || run_batch( pairs.len(), |i| {
+		let (u, v) = pairs[i];
+		if let Some( w ) = f.compute_path_weight( u, v ) {
+			weights[i] = w.to_elem();
+			valid[i] = true;
+		}
+		Ok( () )
+	} ) ).map_err( |e| e.into_py_err( py ) )?;
+	let weights : &PyAny = PyArray1::from_vec( py, weights );
+	let valid : &PyAny = PyArray1::from_vec( py, valid );
+	Ok( ( weights.into_py( py ), valid.into_py( py ) ) )
+}
+
+/// Check that the edges form a forest, using a union-find structure with path halving.
+fn check_acyclic( num_vertices : usize, edges : &[(NodeIdx, NodeIdx)] ) -> PyResult<()> {
+	fn find( parent : &mut [usize], mut x : usize ) -> usize {
+		while parent[x] != x {
+			parent[x] = parent[parent[x]];
+			x = parent[x];
+		}
+		x
+	}
+
+	let mut parent : Vec<usize> = ( 0..num_vertices ).collect();
+	for (i, &(u, v)) in edges.iter().enumerate() {
+		let (root_u, root_v) = ( find( &mut parent, u.index() ), find( &mut parent, v.index() ) );
+		if root_u == root_v {
+			return Err( PyValueError::new_err( format!( "Edge {i} ({u}, {v}) closes a cycle, the edges must form a forest" ) ) );
+		}
+		parent[root_u] = root_v;
+	}
+	Ok( () )
+}
+
+/// A read-only int64 array of an optional node for each vertex, with -1 for None. Built in a single
+/// pass over the vertices, since the implementations store nodes as structs rather than arrays.
+fn node_array( py : Python, num_vertices : usize, node : impl Fn( NodeIdx ) -> Option<NodeIdx> ) -> PyResult<PyObject> {
+	let values : Vec<i64> = ( 0..num_vertices )
+		.map( |i| node( NodeIdx::new( i ) ).map_or( -1, |v| v.index() as i64 ) )
+		.collect();
+	let array : &PyAny = PyArray1::from_vec( py, values );
+	array.call_method( "setflags", (), Some( [("write", false)].into_py_dict( py ) ) )?;
+	Ok( array.into_py( py ) )
+}
+
+fn parse_queries<TWeight : PyWeight>( queries : &PyAny, node : impl Fn( usize ) -> PyResult<NodeIdx> )
+	-> PyResult<Vec<Query<TWeight>>>
+{
+	let mut result = Vec::new();
+	for item in queries.iter()? {
+		let query : &PyTuple = item?.downcast()?;
+		let op : &str = query.get_item( 0 )?.extract()?;
+		let u = node( query.get_item( 1 )?.extract()? )?;
+		let v = node( query.get_item( 2 )?.extract()? )?;
+		result.push( match op {
+			"link" => Query::InsertEdge( u, v, TWeight::from_py( query.get_item( 3 ).ok() )? ),
+			"cut" => Query::DeleteEdge( u, v ),
+			"path_weight" => Query::PathWeight( u, v ),
+			_ => return Err( PyValueError::new_err( format!( "Unknown query '{op}', expected 'link', 'cut' or 'path_weight'" ) ) )
+		} );
+	}
+	Ok( result )
+}
+
+fn time_native<F>( f : &mut F, queries : &PyAny, node : impl Fn( usize ) -> PyResult<NodeIdx> ) -> PyResult<u64>
+	where F : DynamicForest, F::TWeight : PyWeight
+{
+	let queries = parse_queries::<F::TWeight>( queries, node )?;
+	let mut path_weights = vec![None; queries.len()];
+	catch_panic( || {
+		let start = Instant::now();
+		f.execute_batch( &queries, &mut path_weights );
+		start.elapsed().as_nanos() as u64
+	} )
+}
+
+
+/// The 2-cut STT structure of an implementation, if it has one
+trait MaybeSTT {
+	fn stt_structure( &self ) -> Option<&dyn STTStructureRead>;
+}
+
+impl<TNodeData, TNTRImpl, TCPWImpl> MaybeSTT for StandardDynamicForest<TNodeData, TNTRImpl, TCPWImpl>
+	where TNodeData : PathWeightNodeData + UpdatingNodeData,
+		TNTRImpl : NTRImplementation, TCPWImpl : CPWImplementation<TNodeData>
+{
+	fn stt_structure( &self ) -> Option<&dyn STTStructureRead> {
+		Some( self )
+	}
+}
+
+impl<TNodeData : LCTNodeData> MaybeSTT for LinkCutForest<TNodeData> {
+	fn stt_structure( &self ) -> Option<&dyn STTStructureRead> {
+		None
+	}
+}
+
+impl<TWeight : MonoidWeight> MaybeSTT for SimpleDynamicTree<TWeight> {
+	fn stt_structure( &self ) -> Option<&dyn STTStructureRead> {
+		None
+	}
+}
+
+
+/// A dynamic forest with any of the supported weight types
+enum AnyWeightForest<TEmpty, TGroup, TMonoid> {
+	Empty( TEmpty ),
+	Group( TGroup ),
+	Monoid( TMonoid )
+}
+
+/// Evaluate `$body` with `$f` bound to the forest, whatever its weight type.
+macro_rules! with_forest {
+	( $forest : expr, $f : ident => $body : expr ) => {
+		match $forest {
+			AnyWeightForest::Empty( $f ) => $body,
+			AnyWeightForest::Group( $f ) => $body,
+			AnyWeightForest::Monoid( $f ) => $body
+		}
+	}
+}
+
+impl<TEmpty, TGroup, TMonoid> AnyWeightForest<TEmpty, TGroup, TMonoid>
+	where TEmpty : DynamicForest<TWeight=EmptyGroupWeight> + RootedForest + MaybeSTT + Send,
+		TGroup : DynamicForest<TWeight=IsizeAddGroupWeight> + RootedForest + MaybeSTT + Send,
+		TMonoid : DynamicForest<TWeight=UsizeMaxMonoidWeight> + RootedForest + MaybeSTT + Send
+{
+	fn new( num_vertices : usize, weight : WeightType ) -> Self {
+		match weight {
+			WeightType::Empty => AnyWeightForest::Empty( TEmpty::new( num_vertices ) ),
+			WeightType::Group => AnyWeightForest::Group( TGroup::new( num_vertices ) ),
+			WeightType::Monoid => AnyWeightForest::Monoid( TMonoid::new( num_vertices ) )
+		}
+	}
+
+	fn weight_type( &self ) -> WeightType {
+		match self {
+			AnyWeightForest::Empty( _ ) => WeightType::Empty,
+			AnyWeightForest::Group( _ ) => WeightType::Group,
+			AnyWeightForest::Monoid( _ ) => WeightType::Monoid
+		}
+	}
+
+	fn link( &mut self, u : NodeIdx, v : NodeIdx, weight : Option<&PyAny>, check_connected : bool ) -> PyResult<()> {
+		with_forest!( self, f => link( f, u, v, weight, check_connected ) )
+	}
+
+	fn cut( &mut self, u : NodeIdx, v : NodeIdx ) -> PyResult<()> {
+		with_forest!( self, f => catch_panic( || f.cut( u, v ) ) )
+	}
+
+	fn compute_path_weight( &mut self, py : Python, u : NodeIdx, v : NodeIdx ) -> PyResult<Option<PyObject>> {
+		with_forest!( self, f => compute_path_weight( py, f, u, v ) )
+	}
+
+	fn edges( &self ) -> Vec<(usize, usize)> {
+		with_forest!( self, f => f.edges() ).into_iter().map( |(u, v)| ( u.index(), v.index() ) ).collect()
+	}
+
+	fn link_batch( &mut self, py : Python, edges : Vec<(NodeIdx, NodeIdx)>, weights : Option<&PyReadonlyArray1<i64>>,
+		check_connected : bool ) -> PyResult<()>
+	{
+		with_forest!( self, f => link_batch( py, f, edges, weights, check_connected ) )
+	}
+
+	fn cut_batch( &mut self, py : Python, edges : Vec<(NodeIdx, NodeIdx)> ) -> PyResult<()> {
+		with_forest!( self, f => cut_batch( py, f, edges ) )
+	}
+
+	fn compute_path_weight_batch( &mut self, py : Python, pairs : Vec<(NodeIdx, NodeIdx)> ) -> PyResult<(PyObject, PyObject)> {
+		with_forest!( self, f => compute_path_weight_batch( py, f, pairs ) )
+	}
+
+	fn parents( &self, py : Python, num_vertices : usize ) -> PyResult<PyObject> {
+		with_forest!( self, f => node_array( py, num_vertices, |v| f.get_parent( v ) ) )
+	}
+
+	/// The direct and indirect separator children, or None if this is not a 2-cut STT
+	fn separator_children( &self, py : Python, num_vertices : usize ) -> PyResult<Option<(PyObject, PyObject)>> {
+		match with_forest!( self, f => f.stt_structure() ) {
+			Some( t ) => Ok( Some( (
+				node_array( py, num_vertices, |v| t.get_direct_separator_child( v ) )?,
+				node_array( py, num_vertices, |v| t.get_indirect_separator_child( v ) )?
+			) ) ),
+			None => Ok( None )
+		}
+	}
+
+	fn time_native( &mut self, queries : &PyAny, node : impl Fn( usize ) -> PyResult<NodeIdx> ) -> PyResult<u64> {
+		with_forest!( self, f => time_native( f, queries, node ) )
+	}
+}
+
+
+/// Define a Python class wrapping the given empty, group and monoid weight implementations.
+/// If `$check_link`, `link` first checks that the vertices are not connected, since the
+/// implementation does not detect this itself.
+macro_rules! py_forest {
+	( $py_name : ident, $doc : literal, $empty : ty, $group : ty, $monoid : ty, $check_link : expr ) => {
+		#[doc = $doc]
+		#[doc = ""]
+		#[doc = "Create it with `num_vertices` vertices and no edges. `weight` is \"empty\" (default), \"group\" or \"monoid\"."]
+		#[pyclass]
+		pub struct $py_name {
+			forest : AnyWeightForest<$empty, $group, $monoid>,
+			num_vertices : usize
+		}
+
+		impl $py_name {
+			fn node( num_vertices : usize, idx : usize ) -> PyResult<NodeIdx> {
+				if idx < num_vertices {
+					Ok( NodeIdx::new( idx ) )
+				}
+				else {
+					Err( PyIndexError::new_err( format!( "Vertex {idx} out of range for forest with {num_vertices} vertices" ) ) )
+				}
+			}
+
+			fn edge( &self, u : usize, v : usize ) -> PyResult<(NodeIdx, NodeIdx)> {
+				if u == v {
+					return Err( PyValueError::new_err( format!( "Loops are not allowed: ({u}, {v})" ) ) );
+				}
+				Ok( ( Self::node( self.num_vertices, u )?, Self::node( self.num_vertices, v )? ) )
+			}
+
+			/// Convert arrays of endpoints, checking all of them before any query is executed.
+			fn pairs( &self, us : &PyReadonlyArray1<i64>, vs : &PyReadonlyArray1<i64>, allow_loops : bool )
+				-> PyResult<Vec<(NodeIdx, NodeIdx)>>
+			{
+				if us.len() != vs.len() {
+					return Err( PyValueError::new_err( format!( "Endpoint arrays of different lengths: {} and {}", us.len(), vs.len() ) ) );
+				}
+				let node = |idx : i64| usize::try_from( idx )
+					.map_err( |_| PyIndexError::new_err( format!( "Negative vertex {idx}" ) ) )
+					.and_then( |idx| Self::node( self.num_vertices, idx ) );
+				us.as_array().iter().zip( vs.as_array().iter() ).map( |(&u, &v)| {
+					if !allow_loops && u == v {
+						return Err( PyValueError::new_err( format!( "Loops are not allowed: ({u}, {v})" ) ) );
+					}
+					Ok( ( node( u )?, node( v )? ) )
+				} ).collect()
+			}
+		}
+
+		#[pymethods]
+		impl $py_name {
+			#[new]
+			#[pyo3(signature = (num_vertices, weight = "empty"))]
+			fn new( num_vertices : usize, weight : &str ) -> PyResult<Self> {
+				Ok( $py_name{ forest : AnyWeightForest::new( num_vertices, WeightType::parse( weight )? ), num_vertices } )
+			}
+
+			/// Create a forest with `num_vertices` vertices and the edges (us[i], vs[i]) with
+			/// weights[i] (omitted for empty weights), given as int64 arrays. Raises ValueError if the
+			/// edges contain a loop or cycle, which is checked before linking any edge. See also
+			/// stt_py.graphs for creating forests from SciPy and networkx graphs.
+			#[staticmethod]
+			#[pyo3(signature = (num_vertices, us, vs, weights = None, weight = "empty"))]
+			fn from_edges( py : Python, num_vertices : usize, us : PyReadonlyArray1<i64>, vs : PyReadonlyArray1<i64>,
+				weights : Option<PyReadonlyArray1<i64>>, weight : &str ) -> PyResult<Self>
+			{
+				let mut f = Self::new( num_vertices, weight )?;
+				let edges = f.pairs( &us, &vs, false )?;
+				py.allow_threads( || check_acyclic( num_vertices, &edges ) )?;
+				f.forest.link_batch( py, edges, weights.as_ref(), false )?;
+				Ok( f )
+			}
+
+			/// The number of vertices
+			#[getter]
+			fn num_vertices( &self ) -> usize {
+				self.num_vertices
+			}
+
+			/// The weight type: "empty", "group" or "monoid"
+			#[getter]
+			fn weight( &self ) -> &'static str {
+				self.forest.weight_type().name()
+			}
+
+			/// Add an edge between u and v with the given weight (omitted for empty weights). u and v
+			/// must not be connected yet.
+			#[pyo3(signature = (u, v, weight = None))]
+			fn link( &mut self, u : usize, v : usize, weight : Option<&PyAny> ) -> PyResult<()> {
+				let (u, v) = self.edge( u, v )?;
+				self.forest.link( u, v, weight, $check_link )
+			}
+
+			/// Remove the edge between u and v, which must exist.
+			fn cut( &mut self, u : usize, v : usize ) -> PyResult<()> {
+				let (u, v) = self.edge( u, v )?;
+				self.forest.cut( u, v )
+			}
+
+			/// The weight of the path between u and v, or None if they are not connected.
+			fn compute_path_weight( &mut self, py : Python, u : usize, v : usize ) -> PyResult<Option<PyObject>> {
+				let u = Self::node( self.num_vertices, u )?;
+				let v = Self::node( self.num_vertices, v )?;
+				self.forest.compute_path_weight( py, u, v )
+			}
+
+			/// Add the edges (us[i], vs[i]) with weights[i] (omitted for empty weights), given as int64
+			/// arrays, in order. Equivalent to calling `link` for each edge, but executed in a single
+			/// call with the GIL released. If an edge is invalid, the previous edges remain linked.
+			#[pyo3(signature = (us, vs, weights = None))]
+			fn link_batch( &mut self, py : Python, us : PyReadonlyArray1<i64>, vs : PyReadonlyArray1<i64>,
+				weights : Option<PyReadonlyArray1<i64>> ) -> PyResult<()>
+			{
+				let edges = self.pairs( &us, &vs, false )?;
+				self.forest.link_batch( py, edges, weights.as_ref(), $check_link )
+			}
+
+			/// Remove the edges (us[i], vs[i]), given as int64 arrays, in order, with the GIL released.
+			fn cut_batch( &mut self, py : Python, us : PyReadonlyArray1<i64>, vs : PyReadonlyArray1<i64> ) -> PyResult<()> {
+				let edges = self.pairs( &us, &vs, false )?;
+				self.forest.cut_batch( py, edges )
+			}
+
+			/// The weights of the paths between us[i] and vs[i], given as int64 arrays, computed with
+			/// the GIL released. Returns a tuple (weights, valid) of arrays, where valid[i] is False if
+			/// us[i] and vs[i] are not connected. The weights are int64, or uint64 for monoid weights.
+			fn compute_path_weight_batch( &mut self, py : Python, us : PyReadonlyArray1<i64>, vs : PyReadonlyArray1<i64> )
+				-> PyResult<(PyObject, PyObject)>
+			{
+				let pairs = self.pairs( &us, &vs, true )?;
+				self.forest.compute_path_weight_batch( py, pairs )
+			}
+
+			/// All edges as a list of (u, v) tuples. Might be costly for some implementations.
+			fn edges( &self ) -> Vec<(usize, usize)> {
+				self.forest.edges()
+			}
+
+			/// The parent of each vertex in the rooted forest the implementation maintains internally,
+			/// as a read-only int64 array with -1 for roots. This rooted forest does not necessarily
+			/// have the same edges as the represented forest. The array is a snapshot, later
+			/// operations do not change it.
+			fn parents( &self, py : Python ) -> PyResult<PyObject> {
+				self.forest.parents( py, self.num_vertices )
+			}
+
+			/// The direct and indirect separator children of each vertex in the internal 2-cut STT, as a
+			/// tuple of read-only int64 arrays with -1 for none. Raises TypeError if the implementation
+			/// is not based on 2-cut STTs.
+			fn separator_children( &self, py : Python ) -> PyResult<(PyObject, PyObject)> {
+				self.forest.separator_children( py, self.num_vertices )?.ok_or_else( || PyTypeError::new_err(
+					format!( "{} is not based on 2-cut STTs", stringify!( $py_name ) ) ) )
+			}
+
+			/// Execute the queries, given as tuples ("link", u, v[, weight]), ("cut", u, v) or
+			/// ("path_weight", u, v), without crossing the language boundary for each query. Returns
+			/// the elapsed time in nanoseconds, not counting the conversion of the queries. For
+			/// measuring the overhead of calls from Python, see bench_ffi.py.
+			fn _time_native( &mut self, queries : &PyAny ) -> PyResult<u64> {
+				let num_vertices = self.num_vertices;
+				self.forest.time_native( queries, |idx| Self::node( num_vertices, idx ) )
+			}
+
+			fn __len__( &self ) -> usize {
+				self.num_vertices
+			}
+
+			fn __repr__( &self ) -> String {
+				format!( "{}({}, weight=\"{}\")", stringify!( $py_name ), self.num_vertices, self.weight() )
+			}
+		}
+	}
+}
+
+py_forest!( LinkCutForest, "Link-cut tree.", EmptyLinkCutTree, GroupLinkCutTree<IsizeAddGroupWeight>,
+	MonoidLinkCutTree<UsizeMaxMonoidWeight>, false );
+py_forest!( GreedySplayForest, "Search tree on trees with greedy splay.", EmptyGreedySplayTT,
+	GroupGreedySplayTT<IsizeAddGroupWeight>, MonoidGreedySplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( StableGreedySplayForest, "Search tree on trees with stable greedy splay.", EmptyStableGreedySplayTT,
+	GroupStableGreedySplayTT<IsizeAddGroupWeight>, MonoidStableGreedySplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( TwoPassSplayForest, "Search tree on trees with two-pass splay.", EmptyTwoPassSplayTT,
+	GroupTwoPassSplayTT<IsizeAddGroupWeight>, MonoidTwoPassSplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( StableTwoPassSplayForest, "Search tree on trees with stable two-pass splay.", EmptyStableTwoPassSplayTT,
+	GroupStableTwoPassSplayTT<IsizeAddGroupWeight>, MonoidStableTwoPassSplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( LocalTwoPassSplayForest, "Search tree on trees with local two-pass splay.", EmptyLocalTwoPassSplayTT,
+	GroupLocalTwoPassSplayTT<IsizeAddGroupWeight>, MonoidLocalTwoPassSplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( StableLocalTwoPassSplayForest, "Search tree on trees with stable local two-pass splay.",
+	EmptyStableLocalTwoPassSplayTT, GroupStableLocalTwoPassSplayTT<IsizeAddGroupWeight>,
+	MonoidStableLocalTwoPassSplayTT<UsizeMaxMonoidWeight>, false );
+py_forest!( MoveToRootForest, "Search tree on trees with move-to-root.", EmptyMoveToRootTT,
+	GroupMoveToRootTT<IsizeAddGroupWeight>, MonoidMoveToRootTT<UsizeMaxMonoidWeight>, false );
+py_forest!( StableMoveToRootForest, "Search tree on trees with stable move-to-root.", EmptyStableMoveToRootTT,
+	GroupStableMoveToRootTT<IsizeAddGroupWeight>, MonoidStableMoveToRootTT<UsizeMaxMonoidWeight>, false );
+py_forest!( OneCutForest, "Simple dynamic tree using a 1-cut search tree on trees, i.e., a rooted forest with parent pointers.",
+	EmptySimpleDynamicTree, SimpleDynamicTree<IsizeAddGroupWeight>, SimpleDynamicTree<UsizeMaxMonoidWeight>, true );
+
+
+type MSTWeight = UsizeMaxMonoidWeightWithMaxEdge;
+
+/// Computes the MST of the edges (us[i], vs[i]) with weights[i]
+type MSTFunction = fn( usize, &[i64], &[i64], &[i64] ) -> Vec<(NodeIdx, NodeIdx)>;
+
+fn run_mst<F>( num_vertices : usize, us : &[i64], vs : &[i64], weights : &[i64] ) -> Vec<(NodeIdx, NodeIdx)>
+	where F : DynamicForest<TWeight = MSTWeight>
+{
+	let mut f = F::new( num_vertices );
+	let edges = us.iter().zip( vs ).zip( weights )
+		.map( |((&u, &v), &w)| ( u as usize, v as usize, w as usize ) )
+		.filter( |&(u, v, _)| u != v ); // Loops are never part of an MST
+	mst::compute_mst( &mut f, edges )
+}
+
+/// The MST function using the implementation of the given name, as in the benchmarks
+fn mst_function( implementation : &str ) -> PyResult<MSTFunction> {
+	let f : MSTFunction = match implementation {
+		"link-cut" => run_mst::<MonoidLinkCutTree<MSTWeight>>,
+		"greedy-splay" => run_mst::<MonoidGreedySplayTT<MSTWeight>>,
+		"stable-greedy-splay" => run_mst::<MonoidStableGreedySplayTT<MSTWeight>>,
+		"two-pass-splay" => run_mst::<MonoidTwoPassSplayTT<MSTWeight>>,
+		"stable-two-pass-splay" => run_mst::<MonoidStableTwoPassSplayTT<MSTWeight>>,
+		"local-two-pass-splay" => run_mst::<MonoidLocalTwoPassSplayTT<MSTWeight>>,
+		"local-stable-two-pass-splay" => run_mst::<MonoidStableLocalTwoPassSplayTT<MSTWeight>>,
+		"move-to-root" => run_mst::<MonoidMoveToRootTT<MSTWeight>>,
+		"stable-move-to-root" => run_mst::<MonoidStableMoveToRootTT<MSTWeight>>,
+		"one-cut" => run_mst::<SimpleDynamicTree<MSTWeight>>,
+		_ => return Err( PyValueError::new_err( format!( "Unknown implementation '{implementation}'" ) ) )
+	};
+	Ok( f )
+}
+
+/// Compute a minimum spanning forest of the graph on `num_vertices` vertices with the edges
+/// (us[i], vs[i]) and non-negative weights[i], given as contiguous int64 arrays. The edges are
+/// processed online in order, using the dynamic forest `implementation` (named as in the
+/// benchmarks, e.g. "link-cut" or "two-pass-splay"). Returns the edges of the spanning forest as a
+/// (k, 2) int64 array.
+///
+/// The arrays are checked, then read in place with the GIL released, so they must not be modified
+/// by other threads during the call.
+#[pyfunction]
+#[pyo3(signature = (num_vertices, us, vs, weights, implementation = "two-pass-splay"))]
+fn compute_mst( py : Python, num_vertices : usize, us : PyReadonlyArray1<i64>, vs : PyReadonlyArray1<i64>,
+	weights : PyReadonlyArray1<i64>, implementation : &str ) -> PyResult<PyObject>
+{
+	let run = mst_function( implementation )?;
+	let (us, vs, weights) = ( us.as_slice()?, vs.as_slice()?, weights.as_slice()? );
+	if us.len() != vs.len() || us.len() != weights.len() {
+		return Err( PyValueError::new_err( format!( "Arrays of different lengths: {}, {} and {}", us.len(), vs.len(), weights.len() ) ) );
+	}
+	if let Some( &idx ) = us.iter().chain( vs ).find( |&&idx| idx < 0 || idx as u64 >= num_vertices as u64 ) {
+		return Err( PyIndexError::new_err( format!( "Vertex {idx} out of range for graph with {num_vertices} vertices" ) ) );
+	}
+	if let Some( &w ) = weights.iter().find( |&&w| w < 0 ) {
+		return Err( PyValueError::new_err( format!( "MST weights must not be negative: {w}" ) ) );
+	}
+
+	let edges = py.allow_threads( || catch_panic_message( || run( num_vertices, us, vs, weights ) ) )
+		.map_err( PyValueError::new_err )?;
+	let flat : Vec<i64> = edges.iter().flat_map( |(u, v)| [u.index() as i64, v.index() as i64] ).collect();
+	let array : &PyAny = PyArray1::from_vec( py, flat ).reshape( [edges.len(), 2] )?;
+	Ok( array.into_py( py ) )
+}
+
+
+/// The native module, re-exported by the `stt_py` package
+#[pymodule]
+#[pyo3(name = "_stt_py")]
+fn stt_py( py : Python, m : &PyModule ) -> PyResult<()> {
+	m.add_class::<LinkCutForest>()?;
+	m.add_class::<GreedySplayForest>()?;
+	m.add_class::<StableGreedySplayForest>()?;
+	m.add_class::<TwoPassSplayForest>()?;
+	m.add_class::<StableTwoPassSplayForest>()?;
+	m.add_class::<LocalTwoPassSplayForest>()?;
+	m.add_class::<StableLocalTwoPassSplayForest>()?;
+	m.add_class::<MoveToRootForest>()?;
+	m.add_class::<StableMoveToRootForest>()?;
+	m.add_class::<OneCutForest>()?;
+	m.add_function( wrap_pyfunction!( compute_mst, m )? )?;
+	m.add( "BatchError", py.get_type::<BatchError>() )?;
+	Ok( () )
+}
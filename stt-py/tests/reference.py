@@ -0,0 +1,103 @@
+"""A naive reference forest, which the tests compare the native forests with."""
+
+from typing import *
+
+import random
+
+import stt_py
+
+
+FOREST_CLASSES = [
+	stt_py.LinkCutForest,
+	stt_py.GreedySplayForest,
+	stt_py.StableGreedySplayForest,
+	stt_py.TwoPassSplayForest,
+	stt_py.StableTwoPassSplayForest,
+	stt_py.LocalTwoPassSplayForest,
+	stt_py.StableLocalTwoPassSplayForest,
+	stt_py.MoveToRootForest,
+	stt_py.StableMoveToRootForest,
+	stt_py.OneCutForest
+]
+
+WEIGHTS = ( "empty", "group", "monoid" )
+
+
+def random_weight( rng : random.Random, weight : str ) -> Optional[int] :
+	"""A random edge weight of the given weight type, None for empty weights."""
+	if weight == "group" :
+		return rng.randint( -100, 100 )
+	elif weight == "monoid" :
+		return rng.randint( 0, 100 )
+	return None
+
+
+class NaiveForest :
+	"""A forest stored as adjacency dictionaries, answering path weight queries by searching the
+	tree. Only valid operations may be applied to it."""
+
+	def __init__( self, num_vertices : int, weight : str = "empty" ) :
+		self.weight = weight
+		self.adjacent : List[Dict[int, int]] = [{} for _ in range( num_vertices )]
+
+	def __len__( self ) -> int :
+		return len( self.adjacent )
+
+	def link( self, u : int, v : int, weight : Optional[int] = None ) :
+		assert u != v and not self.connected( u, v )
+		self.adjacent[u][v] = self.adjacent[v][u] = weight if weight is not None else 0
+
+	def cut( self, u : int, v : int ) :
+		del self.adjacent[u][v]
+		del self.adjacent[v][u]
+
+	def has_edge( self, u : int, v : int ) -> bool :
+		return v in self.adjacent[u]
+
+	def compute_path_weight( self, u : int, v : int ) -> Optional[int] :
+		"""The sum (group weights), maximum (monoid weights) or 0 (empty weights) of the weights on
+		the path between u and v, or None if they are not connected."""
+		combine = max if self.weight == "monoid" else lambda a, b : a + b
+		weights = {u : 0}
+		stack = [u]
+		while stack :
+			x = stack.pop()
+			for y, w in self.adjacent[x].items() :
+				if y not in weights :
+					weights[y] = combine( weights[x], w )
+					stack.append( y )
+		return weights.get( v )
+
+	def connected( self, u : int, v : int ) -> bool :
+		return self.compute_path_weight( u, v ) is not None
+
+	def edges( self ) -> Set[FrozenSet[int]] :
+		return {frozenset( ( u, v ) ) for u, adjacent in enumerate( self.adjacent ) for v in adjacent}
+
+
+def random_forest( forest_cls, num_vertices : int, weight : str, rng : random.Random, num_trees : int = 1 ) \
+		-> Tuple[Any, NaiveForest] :
+	"""A forest of type `forest_cls` with `num_trees` random trees, and a naive forest with the same
+	edges. Some path weight queries shuffle the internal structure of the native forest."""
+	f, naive = forest_cls( num_vertices, weight ), NaiveForest( num_vertices, weight )
+	for v in range( num_vertices ) :
+		tree = v * num_trees // num_vertices
+		first = -( -tree * num_vertices // num_trees ) # Smallest vertex of the same tree
+		if v > first :
+			u = rng.randrange( first, v )
+			w = random_weight( rng, weight )
+			f.link( v, u, w )
+			naive.link( v, u, w )
+	for _ in range( num_vertices ) :
+		u, v = rng.sample( range( num_vertices ), 2 )
+		f.compute_path_weight( u, v )
+	return f, naive
+
+
+def assert_same_forest( f, naive : NaiveForest ) :
+	"""Check the path weights of all pairs of distinct vertices, and the edges."""
+	for u in range( len( naive ) ) :
+		for v in range( len( naive ) ) :
+			if u != v :
+				assert f.compute_path_weight( u, v ) == naive.compute_path_weight( u, v ), ( u, v )
+	assert {frozenset( e ) for e in f.edges()} == naive.edges()
@@ -0,0 +1,219 @@
+"""Tests of `stt_py.aio.AsyncForest`: requests of concurrent tasks must have the same results and
+exceptions as calling the forest's methods in the order of the requests."""
+
+from typing import *
+
+import asyncio
+import random
+
+import pytest
+
+import stt_py
+from stt_py.aio import AsyncForest
+
+from reference import FOREST_CLASSES, WEIGHTS, random_weight
+
+
+NUM_VERTICES = 16
+
+# A request, as the name of the AsyncForest method and its arguments
+Request = Tuple[str, tuple]
+
+FOREST_METHODS = {"link" : "link", "cut" : "cut", "path_weight" : "compute_path_weight"}
+
+
+class RecordingForest :
+	"""Delegates to `forest`, recording the kind and size of each batch. If `fail_path_weight_at` is
+	set, the next path weight batch fails at that query with a BatchError after executing the
+	queries before it, like a panic in the native code would."""
+
+	def __init__( self, forest ) :
+		self.forest = forest
+		self.batches : List[Tuple[str, int]] = []
+		self.fail_path_weight_at : Optional[int] = None
+
+	def __getattr__( self, name : str ) :
+		return getattr( self.forest, name )
+
+	def link_batch( self, us, vs, weights = None ) :
+		self.batches.append( ( "link", len( us ) ) )
+		return self.forest.link_batch( us, vs, weights )
+
+	def cut_batch( self, us, vs ) :
+		self.batches.append( ( "cut", len( us ) ) )
+		return self.forest.cut_batch( us, vs )
+
+	def compute_path_weight_batch( self, us, vs ) :
+		self.batches.append( ( "path_weight", len( us ) ) )
+		index, self.fail_path_weight_at = self.fail_path_weight_at, None
+		if index is not None and index < len( us ) :
+			self.forest.compute_path_weight_batch( us[:index], vs[:index] )
+			e = stt_py.BatchError( f"Query {index} of the batch failed" )
+			e.index, e.reason = index, "Injected failure"
+			raise e
+		return self.forest.compute_path_weight_batch( us, vs )
+
+
+def random_request( rng : random.Random, weight : str, linked : List[Tuple[int, int]] ) -> Request :
+	"""A random link, cut or path weight request. Some are invalid: linking connected vertices,
+	cutting non-edges, loops, vertices out of range and weights of the wrong type."""
+	kind = rng.choice( ( "link", "cut", "path_weight" ) )
+	u, v = rng.sample( range( NUM_VERTICES ), 2 )
+	if kind == "cut" and linked and rng.random() < 0.7 :
+		u, v = rng.choice( linked )
+	r = rng.random()
+	if r < 0.05 :
+		v = NUM_VERTICES + rng.randrange( 3 )
+	elif r < 0.08 and kind != "path_weight" :
+		# Not for path weights: some implementations answer None for a vertex and itself
+		v = u
+	if kind != "link" :
+		return kind, ( u, v )
+	linked.append( ( u, v ) )
+	w = random_weight( rng, weight )
+	if rng.random() < 0.05 :
+		w = 1 if weight == "empty" else 1.5
+	return kind, ( u, v, w )
+
+def execute_sequentially( forest, requests : Sequence[Request] ) -> List[Tuple[bool, Any]] :
+	"""Whether each request succeeded, with its result or exception, calling the forest's methods."""
+	outcomes = []
+	for kind, args in requests :
+		try :
+			outcomes.append( ( True, getattr( forest, FOREST_METHODS[kind] )( *args ) ) )
+		except Exception as e :
+			outcomes.append( ( False, e ) )
+	return outcomes
+
+def comparable( outcomes : Sequence[Tuple[bool, Any]] ) -> List[Tuple[bool, Any]] :
+	# Messages of failed assertions might mention internal nodes, which depend on how queries were batched
+	return [( ok, value if ok else type( value ) ) for ok, value in outcomes]
+
+
+@pytest.mark.parametrize( "forest_cls, weight",
+		[( forest_cls, weight ) for forest_cls in FOREST_CLASSES for weight in WEIGHTS],
+		ids = lambda p : p if isinstance( p, str ) else p.__name__ )
+def test_matches_sequential( forest_cls, weight ) :
+	num_tasks, requests_per_task = 32, 40
+	requests : List[Request] = []
+	outcomes : List[Tuple[bool, Any]] = []
+	linked : List[Tuple[int, int]] = []
+
+	async def task( f : AsyncForest, rng : random.Random ) :
+		for _ in range( requests_per_task ) :
+			kind, args = random_request( rng, weight, linked )
+			# The request is queued before the task yields, so this is the order of execution
+			index = len( requests )
+			requests.append( ( kind, args ) )
+			outcomes.append( None )
+			try :
+				outcomes[index] = ( True, await getattr( f, kind )( *args ) )
+			except Exception as e :
+				outcomes[index] = ( False, e )
+
+	async def run() :
+		async with AsyncForest( forest, max_batch = 16 ) as f :
+			await asyncio.gather( *( task( f, random.Random( i ) ) for i in range( num_tasks ) ) )
+
+	forest = RecordingForest( forest_cls( NUM_VERTICES, weight ) )
+	asyncio.run( run() )
+
+	expected_forest = forest_cls( NUM_VERTICES, weight )
+	expected = execute_sequentially( expected_forest, requests )
+	assert comparable( outcomes ) == comparable( expected )
+	assert sorted( map( sorted, forest.edges() ) ) == sorted( map( sorted, expected_forest.edges() ) )
+	# Queries were actually batched, and some failed
+	assert max( size for _, size in forest.batches ) > 1
+	assert any( not ok for ok, _ in expected )
+
+
+def test_batch_error_link_cut() :
+	async def run() :
+		async with AsyncForest( forest, max_delay = 0.01 ) as f :
+			links = await asyncio.gather( f.link( 0, 1 ), f.link( 1, 2 ), f.link( 0, 2 ), f.link( 2, 3 ), return_exceptions = True )
+			cuts = await asyncio.gather( f.cut( 0, 1 ), f.cut( 0, 3 ), f.cut( 1, 2 ), return_exceptions = True )
+			return links, cuts
+
+	forest = RecordingForest( stt_py.LinkCutForest( NUM_VERTICES ) )
+	links, cuts = asyncio.run( run() )
+	assert links[:2] == [None, None] and links[3] is None
+	assert cuts[0] is None and cuts[2] is None
+	for e in ( links[2], cuts[1] ) :
+		# Each request fails on its own, not with the BatchError of the whole batch
+		assert type( e ) is ValueError
+	# After the failed query, the rest of the batch is executed as a new batch
+	assert forest.batches == [( "link", 4 ), ( "link", 1 ), ( "cut", 3 ), ( "cut", 1 )]
+	assert sorted( map( sorted, forest.edges() ) ) == [[2, 3]]
+
+
+def test_batch_error_path_weight() :
+	async def run() :
+		async with AsyncForest( forest, max_delay = 0.01 ) as f :
+			await asyncio.gather( f.link( 0, 1, 3 ), f.link( 1, 2, 4 ) )
+			forest.fail_path_weight_at = 2
+			return await asyncio.gather( f.path_weight( 0, 1 ), f.path_weight( 0, 2 ), f.path_weight( 1, 2 ),
+					f.path_weight( 0, 3 ), f.path_weight( 2, 0 ), return_exceptions = True )
+
+	forest = RecordingForest( stt_py.TwoPassSplayForest( NUM_VERTICES, "group" ) )
+	results = asyncio.run( run() )
+	assert results[:2] == [3, 7] and results[3:] == [None, 7]
+	assert type( results[2] ) is ValueError and str( results[2] ) == "Injected failure"
+	# The results of the queries before the failed one are lost, so they are executed again
+	assert forest.batches[1:] == [( "path_weight", 5 ), ( "path_weight", 2 ), ( "path_weight", 2 )]
+
+
+def test_invalid_arguments() :
+	async def run() :
+		async with AsyncForest( forest, max_delay = 0.01 ) as f :
+			links = await asyncio.gather( f.link( 0, 1, 1 ), f.link( 0, NUM_VERTICES, 1 ), f.link( 2, 3, 1.5 ),
+					f.link( 4, 4, 1 ), f.link( 4, 5, 2 ), return_exceptions = True )
+			path_weights = await asyncio.gather( f.path_weight( 0, NUM_VERTICES ), f.path_weight( 0, 1 ),
+					f.path_weight( 4, 5 ), return_exceptions = True )
+			return links, path_weights
+
+	# The requests of an invalid batch are executed one by one, so only the invalid ones fail
+	forest = RecordingForest( stt_py.OneCutForest( NUM_VERTICES, "group" ) )
+	links, path_weights = asyncio.run( run() )
+	assert links[0] is None and links[4] is None
+	assert [type( e ) for e in links[1:4]] == [IndexError, TypeError, ValueError]
+	assert type( path_weights[0] ) is IndexError and path_weights[1:] == [1, 2]
+	assert sorted( map( sorted, forest.edges() ) ) == [[0, 1], [4, 5]]
+
+
+def test_cancelled() :
+	errors = []
+
+	async def run() :
+		asyncio.get_running_loop().set_exception_handler( lambda loop, context : errors.append( context ) )
+		async with AsyncForest( forest, max_delay = 0.01 ) as f :
+			link = asyncio.create_task( f.link( 0, 1 ) )
+			cut = asyncio.create_task( f.cut( 2, 3 ) ) # Fails
+			await asyncio.sleep( 0 ) # Both are queued
+			link.cancel()
+			cut.cancel()
+			# Cancelled requests are executed anyway
+			assert await f.path_weight( 0, 1 ) == 0
+			assert await f.path_weight( 2, 3 ) is None
+			assert link.cancelled() and cut.cancelled()
+
+	forest = stt_py.StableTwoPassSplayForest( NUM_VERTICES )
+	asyncio.run( run() )
+	# Results and exceptions of cancelled requests are dropped without errors
+	assert errors == []
+
+
+def test_aclose() :
+	async def run() :
+		f = AsyncForest( forest, max_batch = 8, max_delay = 10 )
+		tasks = [asyncio.create_task( f.link( i, i + 1 ) ) for i in range( 12 )]
+		await asyncio.sleep( 0 ) # One batch is flushed, 4 requests are pending
+		await f.aclose()
+		# All requests were executed before aclose returned
+		assert forest.forest.compute_path_weight( 0, 12 ) == 0
+		assert await asyncio.gather( *tasks ) == [None] * 12
+		with pytest.raises( RuntimeError ) :
+			await f.link( 13, 14 )
+
+	forest = RecordingForest( stt_py.MoveToRootForest( NUM_VERTICES ) )
+	asyncio.run( run() )
+	assert forest.batches == [( "link", 8 ), ( "link", 4 )]
@@ -0,0 +1,161 @@
+"""Tests of `link_batch`, `cut_batch` and `compute_path_weight_batch`, compared with a naive forest."""
+
+from typing import *
+
+import random
+
+import numpy as np
+import pytest
+
+import stt_py
+
+from reference import FOREST_CLASSES, WEIGHTS, NaiveForest, assert_same_forest, random_forest, random_weight
+
+
+NUM_VERTICES = 16
+
+all_forests = pytest.mark.parametrize( "forest_cls, weight",
+		[( forest_cls, weight ) for forest_cls in FOREST_CLASSES for weight in WEIGHTS],
+		ids = lambda p : p if isinstance( p, str ) else p.__name__ )
+
+
+def int64( values : Sequence[int] ) -> np.ndarray :
+	return np.array( values, dtype = np.int64 )
+
+def link_batch( f, edges : Sequence[Tuple[int, int, Optional[int]]] ) :
+	us, vs, weights = zip( *edges )
+	if weights[0] is None :
+		f.link_batch( int64( us ), int64( vs ) )
+	else :
+		f.link_batch( int64( us ), int64( vs ), int64( weights ) )
+
+def cut_batch( f, edges : Sequence[Tuple[int, int]] ) :
+	us, vs = zip( *edges )
+	f.cut_batch( int64( us ), int64( vs ) )
+
+def assert_path_weights( f, naive : NaiveForest, pairs : Sequence[Tuple[int, int]] ) :
+	us, vs = zip( *pairs )
+	weights, valid = f.compute_path_weight_batch( int64( us ), int64( vs ) )
+	expected = [naive.compute_path_weight( u, v ) for u, v in pairs]
+	assert weights.dtype == ( np.uint64 if naive.weight == "monoid" else np.int64 )
+	assert valid.dtype == np.bool_
+	assert valid.tolist() == [w is not None for w in expected]
+	assert weights[valid].tolist() == [w for w in expected if w is not None]
+
+
+@all_forests
+def test_random_batches( forest_cls, weight ) :
+	rng = random.Random( 0 )
+	f, naive = forest_cls( NUM_VERTICES, weight ), NaiveForest( NUM_VERTICES, weight )
+	for _ in range( 30 ) :
+		links = []
+		for _ in range( rng.randint( 1, 8 ) ) :
+			u, v = rng.sample( range( NUM_VERTICES ), 2 )
+			if not naive.connected( u, v ) :
+				links.append( ( u, v, random_weight( rng, weight ) ) )
+				naive.link( *links[-1] )
+		if links :
+			link_batch( f, links )
+
+		assert_path_weights( f, naive, [tuple( rng.sample( range( NUM_VERTICES ), 2 ) ) for _ in range( 20 )] )
+
+		edges = sorted( tuple( e ) for e in naive.edges() )
+		cuts = rng.sample( edges, min( len( edges ), rng.randint( 1, 5 ) ) )
+		if cuts :
+			# Either direction
+			cuts = [( u, v ) if rng.random() < 0.5 else ( v, u ) for u, v in cuts]
+			cut_batch( f, cuts )
+			for u, v in cuts :
+				naive.cut( u, v )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_path_weight_valid_mask( forest_cls, weight ) :
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, random.Random( 1 ), num_trees = 4 )
+	pairs = [( u, v ) for u in range( NUM_VERTICES ) for v in range( NUM_VERTICES ) if u != v]
+	assert_path_weights( f, naive, pairs )
+	assert any( not naive.connected( u, v ) for u, v in pairs )
+
+	weights, valid = f.compute_path_weight_batch( int64( [] ), int64( [] ) )
+	assert weights.tolist() == [] and valid.tolist() == []
+
+
+@all_forests
+def test_link_batch_partial( forest_cls, weight ) :
+	rng = random.Random( 2 )
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, rng, num_trees = 4 )
+	# Join the first and second tree, then the third and fourth, then link two connected vertices
+	a, b, c, d = ( i * NUM_VERTICES // 4 for i in range( 4 ) )
+	links = [( a, b, random_weight( rng, weight ) ), ( c, d, random_weight( rng, weight ) ),
+		( a + 1, b + 1, random_weight( rng, weight ) ), ( a, c, random_weight( rng, weight ) )]
+	with pytest.raises( stt_py.BatchError ) as e :
+		link_batch( f, links )
+	assert isinstance( e.value, ValueError )
+	assert e.value.index == 2
+	assert isinstance( e.value.reason, str ) and e.value.reason in str( e.value )
+
+	# The links before the failed one were executed, the ones after it were not
+	naive.link( *links[0] )
+	naive.link( *links[1] )
+	assert_same_forest( f, naive )
+
+	# The reason is what the query would have raised on its own
+	with pytest.raises( ValueError ) as single :
+		f.link( *links[2] )
+	assert str( single.value ) == e.value.reason
+
+
+@all_forests
+def test_cut_batch_partial( forest_cls, weight ) :
+	rng = random.Random( 3 )
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, rng, num_trees = 2 )
+	edges = sorted( tuple( e ) for e in naive.edges() )
+	non_edge = next( ( u, v ) for u in range( NUM_VERTICES ) for v in range( u + 1, NUM_VERTICES )
+			if not naive.has_edge( u, v ) and naive.connected( u, v ) )
+	cuts = [edges[0], edges[1], non_edge, edges[2]]
+	with pytest.raises( stt_py.BatchError ) as e :
+		cut_batch( f, cuts )
+	assert isinstance( e.value, ValueError )
+	assert e.value.index == 2
+	assert isinstance( e.value.reason, str ) and e.value.reason in str( e.value )
+
+	naive.cut( *edges[0] )
+	naive.cut( *edges[1] )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_invalid_batches( forest_cls, weight ) :
+	# Arguments are checked before any query of the batch is executed
+	rng = random.Random( 4 )
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, rng, num_trees = 4 )
+	a, b = 0, NUM_VERTICES - 1 # In different trees
+	edge = min( tuple( e ) for e in naive.edges() )
+	w = random_weight( rng, weight )
+	weights = lambda count : None if weight == "empty" else int64( [w] * count )
+
+	for us, vs, error in ( ( [a, NUM_VERTICES], [b, 0], IndexError ), ( [a, -1], [b, 0], IndexError ),
+			( [a, 3], [b, 3], ValueError ) ) :
+		with pytest.raises( error ) as e :
+			f.link_batch( int64( us ), int64( vs ), weights( 2 ) )
+		assert not isinstance( e.value, stt_py.BatchError )
+		with pytest.raises( error ) :
+			f.cut_batch( int64( [edge[0], *us] ), int64( [edge[1], *vs] ) )
+	with pytest.raises( IndexError ) :
+		f.compute_path_weight_batch( int64( [a, NUM_VERTICES] ), int64( [b, 0] ) )
+	with pytest.raises( ValueError ) :
+		f.link_batch( int64( [a] ), int64( [b, 1] ), weights( 1 ) )
+
+	if weight == "empty" :
+		with pytest.raises( TypeError ) :
+			f.link_batch( int64( [a] ), int64( [b] ), int64( [1] ) )
+	else :
+		with pytest.raises( TypeError ) :
+			f.link_batch( int64( [a] ), int64( [b] ) )
+		with pytest.raises( ValueError ) :
+			f.link_batch( int64( [a] ), int64( [b] ), int64( [w, w] ) )
+	if weight == "monoid" :
+		with pytest.raises( ValueError ) :
+			f.link_batch( int64( [a, 1] ), int64( [b, NUM_VERTICES // 2] ), int64( [1, -1] ) )
+	assert_same_forest( f, naive )
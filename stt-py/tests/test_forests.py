@@ -0,0 +1,122 @@
+"""Tests of the forests' methods, compared with a naive forest for every implementation and weight
+type."""
+
+import random
+
+import pytest
+
+import stt_py
+
+from reference import FOREST_CLASSES, WEIGHTS, NaiveForest, assert_same_forest, random_forest, random_weight
+
+
+NUM_VERTICES = 12
+
+all_forests = pytest.mark.parametrize( "forest_cls, weight",
+		[( forest_cls, weight ) for forest_cls in FOREST_CLASSES for weight in WEIGHTS],
+		ids = lambda p : p if isinstance( p, str ) else p.__name__ )
+
+
+@all_forests
+def test_random_queries( forest_cls, weight ) :
+	rng = random.Random( 0 )
+	f, naive = forest_cls( NUM_VERTICES, weight ), NaiveForest( NUM_VERTICES, weight )
+	assert ( f.weight, f.num_vertices, len( f ) ) == ( weight, NUM_VERTICES, NUM_VERTICES )
+	for _ in range( 2000 ) :
+		edges = sorted( tuple( e ) for e in naive.edges() )
+		if edges and rng.random() < 0.3 :
+			u, v = rng.choice( edges )
+			f.cut( u, v )
+			naive.cut( u, v )
+			continue
+		u, v = rng.sample( range( NUM_VERTICES ), 2 )
+		if naive.connected( u, v ) :
+			assert f.compute_path_weight( u, v ) == naive.compute_path_weight( u, v )
+		else :
+			assert f.compute_path_weight( u, v ) is None
+			w = random_weight( rng, weight )
+			f.link( u, v, w )
+			naive.link( u, v, w )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_invalid_cut( forest_cls, weight ) :
+	rng = random.Random( 1 )
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, rng, num_trees = 2 )
+	for _ in range( 20 ) :
+		# Connected or not, but not adjacent
+		u, v = rng.sample( range( NUM_VERTICES ), 2 )
+		if naive.has_edge( u, v ) :
+			continue
+		with pytest.raises( ValueError ) :
+			f.cut( u, v )
+		assert_same_forest( f, naive )
+
+	# The forest is still usable
+	u, v = sorted( next( iter( naive.edges() ) ) )
+	f.cut( u, v )
+	naive.cut( u, v )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_link_connected( forest_cls, weight ) :
+	# The 1-cut implementation does not detect this itself, the bindings check it
+	rng = random.Random( 2 )
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, rng, num_trees = 2 )
+	for _ in range( 20 ) :
+		u, v = rng.sample( range( NUM_VERTICES ), 2 )
+		if not naive.connected( u, v ) :
+			continue
+		with pytest.raises( ValueError ) :
+			f.link( u, v, random_weight( rng, weight ) )
+		assert_same_forest( f, naive )
+
+	# The forest is still usable
+	u, v = 0, NUM_VERTICES - 1 # In different trees
+	w = random_weight( rng, weight )
+	f.link( u, v, w )
+	naive.link( u, v, w )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_loops( forest_cls, weight ) :
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, random.Random( 3 ) )
+	with pytest.raises( ValueError ) :
+		f.link( 1, 1, random_weight( random.Random( 0 ), weight ) )
+	with pytest.raises( ValueError ) :
+		f.cut( 1, 1 )
+	assert_same_forest( f, naive )
+
+
+@all_forests
+def test_out_of_range( forest_cls, weight ) :
+	f, naive = random_forest( forest_cls, NUM_VERTICES, weight, random.Random( 4 ), num_trees = 2 )
+	w = random_weight( random.Random( 0 ), weight )
+	for u, v in ( ( 0, NUM_VERTICES ), ( NUM_VERTICES + 5, 1 ) ) :
+		with pytest.raises( IndexError ) :
+			f.link( u, v, w )
+		with pytest.raises( IndexError ) :
+			f.cut( u, v )
+		with pytest.raises( IndexError ) :
+			f.compute_path_weight( u, v )
+	assert_same_forest( f, naive )
+
+
+@pytest.mark.parametrize( "forest_cls", FOREST_CLASSES, ids = lambda c : c.__name__ )
+def test_weight_arguments( forest_cls ) :
+	with pytest.raises( ValueError ) :
+		forest_cls( 3, "float" )
+	with pytest.raises( TypeError ) :
+		forest_cls( 3 ).link( 0, 1, 5 )
+	for weight in ( "group", "monoid" ) :
+		f = forest_cls( 3, weight )
+		with pytest.raises( TypeError ) :
+			f.link( 0, 1 )
+		with pytest.raises( TypeError ) :
+			f.link( 0, 1, 1.5 )
+		assert f.edges() == []
+	with pytest.raises( OverflowError ) :
+		forest_cls( 3, "monoid" ).link( 0, 1, -1 )
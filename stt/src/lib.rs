@@ -65,6 +65,12 @@ The following crate feature flags are available. They are configured in your `Ca
 	* Optional, requires the `nomax` crate.
 	* Improve node space usage. Disallows the maximum node index 2^64-1 and incurs a small runtime
 		cost to check that this node index is not used.
+* `compact_node_idx`
+	* Optional.
+	* Store node indices as 32-bit integers, which halves the space of the node pointers (including
+		`Option<NodeIdx>`) in all implementations. Allows at most 2^32-1 nodes, i.e., disallows the
+		node indices 2^32-1 and above, and incurs a small runtime cost to convert node indices.
+		Supersedes `space_efficient_nodes`.
 * `petgraph`
 	* Optional, requires the `petgraph` crate.
 	* Enable a petgraph-based dynamic forest implementation. This implementation is very slow and
@@ -105,7 +111,10 @@ doi:[10.1145/3828.3835](https://doi.org/10.1145/3828.3835)
 use std::fmt::{Debug, Display, Formatter};
 use std::ops;
 
-#[cfg( feature = "space_efficient_nodes" )]
+#[cfg( feature = "compact_node_idx" )]
+use std::num::NonZeroU32;
+
+#[cfg( all( feature = "space_efficient_nodes", not( feature = "compact_node_idx" ) ) )]
 use nonmax::NonMaxUsize;
 
 pub mod common;
@@ -122,13 +131,13 @@ pub mod pg;
 
 
 /// Represents a node in a dynamic tree to the outside world.
-#[cfg( not( feature = "space_efficient_nodes" ) )]
+#[cfg( not( any( feature = "space_efficient_nodes", feature = "compact_node_idx" ) ) )]
 #[derive(Copy, Clone, Debug, Eq, Hash, Ord, PartialEq, PartialOrd)]
 pub struct NodeIdx {
 	raw_idx: usize
 }
 
-#[cfg( not( feature = "space_efficient_nodes" ) )]
+#[cfg( not( any( feature = "space_efficient_nodes", feature = "compact_node_idx" ) ) )]
 impl NodeIdx {
 	/// Convert `usize` into `NodeIdx`.
 	/// 
@@ -146,13 +155,13 @@ impl NodeIdx {
 
 
 /// Represents a node in a dynamic tree to the outside world.
-#[cfg( feature = "space_efficient_nodes" )]
+#[cfg( all( feature = "space_efficient_nodes", not( feature = "compact_node_idx" ) ) )]
 #[derive(Copy, Clone, Debug, Eq, Hash, Ord, PartialEq, PartialOrd)]
 pub struct NodeIdx {
 	raw_idx : NonMaxUsize
 }
 
-#[cfg( feature = "space_efficient_nodes" )]
+#[cfg( all( feature = "space_efficient_nodes", not( feature = "compact_node_idx" ) ) )]
 impl NodeIdx {
 	/// Convert `usize` into `NodeIdx`.
 	/// 
@@ -168,6 +177,50 @@ impl NodeIdx {
 	}
 }
 
+
+/// Represents a node in a dynamic tree to the outside world.
+// Stores the bitwise complement of the index, so that the index 2^32-1 is the niche used for None.
+#[cfg( feature = "compact_node_idx" )]
+#[derive(Copy, Clone, Debug, Eq, Hash, PartialEq)]
+pub struct NodeIdx {
+	raw_idx : NonZeroU32
+}
+
+#[cfg( feature = "compact_node_idx" )]
+impl NodeIdx {
+	/// Convert `usize` into `NodeIdx`.
+	/// 
+	/// Use with care, as this can circumvent bounds checking.
+	/// 
+	/// Panics if `idx` is 2^32-1 or larger.
+	pub fn new( idx : usize ) -> NodeIdx {
+		let raw_idx = u32::try_from( idx ).ok().and_then( |i| NonZeroU32::new( !i ) )
+			.unwrap_or_else( || panic!( "Node index {idx} does not fit into a compact node index" ) );
+		NodeIdx { raw_idx }
+	}
+	
+	/// Convert this into `usize`.
+	#[inline]
+	pub fn index( &self ) -> usize {
+		( !self.raw_idx.get() ) as usize
+	}
+}
+
+// The complement reverses the order, so compare the indices.
+#[cfg( feature = "compact_node_idx" )]
+impl Ord for NodeIdx {
+	fn cmp( &self, other : &Self ) -> std::cmp::Ordering {
+		self.index().cmp( &other.index() )
+	}
+}
+
+#[cfg( feature = "compact_node_idx" )]
+impl PartialOrd for NodeIdx {
+	fn partial_cmp( &self, other : &Self ) -> Option<std::cmp::Ordering> {
+		Some( self.cmp( other ) )
+	}
+}
+
 impl Display for NodeIdx {
 	fn fmt( &self, f: &mut Formatter<'_> ) -> std::fmt::Result {
 		write!( f, "{}", self.index() )
@@ -237,6 +290,26 @@ pub trait DynamicForest {
 	/// Computes the weight of the path between u and v, or returns None if no such path exists.
 	fn compute_path_weight( &mut self, u : NodeIdx, v : NodeIdx ) -> Option<Self::TWeight>;
 
+	/// Executes the given queries in order. The result of query `i` is written to
+	/// `path_weights[i]`: the path weight for a [Query::PathWeight] query (None if there is no
+	/// path), and None for other queries.
+	/// 
+	/// The default implementation executes the queries one by one. Implementations may override it
+	/// to execute batches more efficiently, e.g. by prefetching the nodes of the next query.
+	/// 
+	/// # Panics
+	/// If `path_weights` has a different length than `queries`.
+	fn execute_batch( &mut self, queries : &[Query<Self::TWeight>], path_weights : &mut [Option<Self::TWeight>] ) {
+		assert_eq!( queries.len(), path_weights.len(), "Need one path weight entry per query" );
+		for (query, path_weight) in queries.iter().zip( path_weights.iter_mut() ) {
+			*path_weight = match *query {
+				Query::InsertEdge( u, v, weight ) => { self.link( u, v, weight ); None },
+				Query::DeleteEdge( u, v ) => { self.cut( u, v ); None },
+				Query::PathWeight( u, v ) => self.compute_path_weight( u, v )
+			};
+		}
+	}
+
 	/// Iterate over the nodes in this dynamic forest.
 	fn nodes( &self ) -> Self::NodeIdxIterator;
 
@@ -249,6 +322,48 @@ pub trait DynamicForest {
 	fn edges( &self ) -> Vec<(NodeIdx, NodeIdx)>;
 }
 
+/// A query to a [DynamicForest], see [DynamicForest::execute_batch()].
+#[derive(Copy, Clone, Debug, Eq, PartialEq)]
+pub enum Query<TWeight : MonoidWeight> {
+	/// [Link](DynamicForest::link()) the two nodes with an edge of the given weight.
+	InsertEdge( NodeIdx, NodeIdx, TWeight ),
+	/// [Cut](DynamicForest::cut()) the edge between the two nodes.
+	DeleteEdge( NodeIdx, NodeIdx ),
+	/// [Compute the weight](DynamicForest::compute_path_weight()) of the path between the two nodes.
+	PathWeight( NodeIdx, NodeIdx )
+}
+
+impl<TWeight : MonoidWeight> Query<TWeight> {
+	/// Executes this query on the given dynamic forest. Returns the path weight for
+	/// [Query::PathWeight] queries and None otherwise.
+	pub fn execute( &self, f : &mut impl DynamicForest<TWeight=TWeight> ) -> Option<TWeight> {
+		match *self {
+			Query::InsertEdge( u, v, weight ) => { f.link( u, v, weight ); None },
+			Query::DeleteEdge( u, v ) => { f.cut( u, v ); None },
+			Query::PathWeight( u, v ) => f.compute_path_weight( u, v )
+		}
+	}
+}
+
+
+/// A data structure that can report how much memory it uses.
+/// 
+/// Implemented by all [DynamicForest] implementations in this crate. Useful to compare the space
+/// usage of implementations, weight types and crate features like `space_efficient_nodes`.
+pub trait MemoryUsage {
+	/// The number of bytes this data structure has allocated on the heap, not counting the
+	/// allocator's own overhead.
+	fn heap_bytes( &self ) -> usize;
+	
+	/// The number of bytes used by this data structure, i.e., its own size plus
+	/// [heap_bytes](Self::heap_bytes()).
+	fn total_bytes( &self ) -> usize
+		where Self : Sized
+	{
+		std::mem::size_of::<Self>() + self.heap_bytes()
+	}
+}
+
 /// A collection of rooted trees.
 /// 
 /// Most [DynamicForest] implementations use a collection of rooted trees internally. This trait
@@ -267,24 +382,40 @@ pub trait RootedForest {
 mod tests {
 	use crate::NodeIdx;
 	
-	#[cfg( not( feature = "space_efficient_nodes" ) )]
+	#[cfg( not( any( feature = "space_efficient_nodes", feature = "compact_node_idx" ) ) )]
 	#[test]
 	fn test_node_idx_valid() {
 		assert_eq!( NodeIdx::new( 0 ).index(), 0 );
 		assert_eq!( NodeIdx::new( usize::MAX ).index(), usize::MAX );
 	}
 	
-	#[cfg( feature = "space_efficient_nodes" )]
+	#[cfg( all( feature = "space_efficient_nodes", not( feature = "compact_node_idx" ) ) )]
 	#[test]
 	fn test_node_idx_valid() {
 		assert_eq!( NodeIdx::new( 0 ).index(), 0 );
 		assert_eq!( NodeIdx::new( usize::MAX - 1 ).index(), usize::MAX - 1 );
 	}
 	
-	#[cfg( feature = "space_efficient_nodes" )]
+	#[cfg( all( feature = "space_efficient_nodes", not( feature = "compact_node_idx" ) ) )]
 	#[test]
 	#[should_panic]
 	fn test_node_idx_invalid() {
 		NodeIdx::new( usize::MAX );
 	}
+	
+	#[cfg( feature = "compact_node_idx" )]
+	#[test]
+	fn test_node_idx_valid() {
+		assert_eq!( NodeIdx::new( 0 ).index(), 0 );
+		assert_eq!( NodeIdx::new( u32::MAX as usize - 1 ).index(), u32::MAX as usize - 1 );
+		assert!( NodeIdx::new( 1 ) < NodeIdx::new( 2 ) );
+		assert_eq!( std::mem::size_of::<Option<NodeIdx>>(), 4 );
+	}
+	
+	#[cfg( feature = "compact_node_idx" )]
+	#[test]
+	#[should_panic]
+	fn test_node_idx_invalid() {
+		NodeIdx::new( u32::MAX as usize );
+	}
 }
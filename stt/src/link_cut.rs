@@ -19,7 +19,7 @@ use std::fmt::{Display, Formatter};
 use std::iter::Map;
 use std::ops::Range;
 
-use crate::{RootedForest, DynamicForest, MonoidWeight, NodeData, NodeDataAccess, NodeIdx, PathWeightNodeData};
+use crate::{RootedForest, DynamicForest, MemoryUsage, MonoidWeight, NodeData, NodeDataAccess, NodeIdx, PathWeightNodeData};
 use crate::common::{EmptyNodeData, GroupWeight, WeightOrInfinity};
 use crate::common::WeightOrInfinity::{Finite, Infinite};
 
@@ -450,6 +450,12 @@ impl<TNodeData : LCTNodeData> LinkCutForest<TNodeData> {
 	}
 }
 
+impl<TNodeData : LCTNodeData> MemoryUsage for LinkCutForest<TNodeData> {
+	fn heap_bytes( &self ) -> usize {
+		self.nodes.capacity() * std::mem::size_of::<Node<TNodeData>>()
+	}
+}
+
 impl<TNodeData : LCTNodeData> RootedForest for LinkCutForest<TNodeData> {
 	fn get_parent( &self, v: NodeIdx ) -> Option<NodeIdx> {
 		self.node( v ).parent
@@ -494,8 +500,13 @@ impl<TNodeData : LCTNodeData> DynamicForest for LinkCutForest<TNodeData> {
 		self.node_to_root( u );
 		self.node_to_root( v );
 		assert!( self.node( u ).parent.is_some(), "Apparently attempting to cut nodes in different components" );
-		debug_assert!( self.node( u ).parent == Some( v ) );
-		
+		// u and v are adjacent iff u is a child of v and no node lies between them on the path, i.e.,
+		// u's solid subtree is empty on the side facing v
+		self.push_reverse_bit( v );
+		self.push_reverse_bit( u );
+		let between = if self.node( v ).left_child == Some( u ) { self.node( u ).right_child } else { self.node( u ).left_child };
+		assert!( self.node( u ).parent == Some( v ) && between.is_none(), "It seems you're trying to cut a non-existing edge ({u}, {v})." );
+
 		TNodeData::before_detached( self, u );
 		
 		self.node_mut( u ).parent = None;
@@ -12,7 +12,7 @@ use std::iter::Map;
 use std::ops::Range;
 use crate::common::{EmptyGroupWeight, WeightOrInfinity};
 use crate::common::WeightOrInfinity::{Finite, Infinite};
-use crate::{DynamicForest, MonoidWeight, NodeData, NodeIdx};
+use crate::{DynamicForest, MemoryUsage, MonoidWeight, NodeData, NodeIdx, RootedForest};
 use crate::NodeDataAccess;
 
 
@@ -93,6 +93,18 @@ impl<TWeight : MonoidWeight> SimpleDynamicTree<TWeight> {
 	}
 }
 
+impl<TWeight : MonoidWeight> MemoryUsage for SimpleDynamicTree<TWeight> {
+	fn heap_bytes( &self ) -> usize {
+		self.nodes.capacity() * std::mem::size_of::<Node<TWeight>>()
+	}
+}
+
+impl<TWeight : MonoidWeight> RootedForest for SimpleDynamicTree<TWeight> {
+	fn get_parent( &self, v : NodeIdx ) -> Option<NodeIdx> {
+		self.node( v ).parent
+	}
+}
+
 impl<TWeight: MonoidWeight> NodeDataAccess<SimpleParentWeightNodeData<TWeight>> for SimpleDynamicTree<TWeight> {
 	fn data(&self, idx: NodeIdx) -> &SimpleParentWeightNodeData<TWeight> {
 		&self.nodes[idx.index()].data
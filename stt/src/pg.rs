@@ -4,9 +4,9 @@ use std::iter::Map;
 use std::ops::Range;
 
 use petgraph::algo;
-use petgraph::graph::{NodeIndex, UnGraph};
+use petgraph::graph::{DefaultIx, Edge, Node, NodeIndex, UnGraph};
 
-use crate::{DynamicForest, MonoidWeight, NodeIdx};
+use crate::{DynamicForest, MemoryUsage, MonoidWeight, NodeIdx};
 use crate::common::EmptyGroupWeight;
 
 
@@ -24,6 +24,14 @@ pub struct PetgraphDynamicForest<TWeight : MonoidWeight> {
 	g : UnGraph<(), TWeight>
 }
 
+impl<TWeight : MonoidWeight> MemoryUsage for PetgraphDynamicForest<TWeight> {
+	fn heap_bytes( &self ) -> usize {
+		let (node_capacity, edge_capacity) = self.g.capacity();
+		node_capacity * std::mem::size_of::<Node<(), DefaultIx>>()
+			+ edge_capacity * std::mem::size_of::<Edge<TWeight, DefaultIx>>()
+	}
+}
+
 impl<TWeight : MonoidWeight> DynamicForest for PetgraphDynamicForest<TWeight> {
 	type TWeight = TWeight;
 	
@@ -8,7 +8,7 @@ use std::fmt::Debug;
 use std::iter::Map;
 use std::ops::Range;
 
-use crate::{RootedForest, NodeData, NodeIdx};
+use crate::{MemoryUsage, RootedForest, NodeData, NodeIdx};
 use crate::common::EmptyNodeData;
 use crate::NodeDataAccess;
 
@@ -106,6 +106,12 @@ pub struct STT<TData : NodeData> {
 	nodes : Vec<Node<TData>>
 }
 
+impl<TData : NodeData> MemoryUsage for STT<TData> {
+	fn heap_bytes( &self ) -> usize {
+		self.nodes.capacity() * std::mem::size_of::<Node<TData>>()
+	}
+}
+
 impl<TData : NodeData> NodeDataAccess<TData> for STT<TData> {
 	fn data( &self, idx : NodeIdx ) -> &TData {
 		&self.node( idx ).data
@@ -2,7 +2,7 @@
 
 use std::marker::PhantomData;
 
-use crate::{RootedForest, DynamicForest, MonoidWeight, NodeData, NodeDataAccess, NodeIdx, PathWeightNodeData};
+use crate::{RootedForest, DynamicForest, MemoryUsage, MonoidWeight, NodeData, NodeDataAccess, NodeIdx, PathWeightNodeData};
 use crate::common::{EmptyGroupWeight, EmptyNodeData};
 use crate::twocut::basic::{MakeOneCutSTT, STT, STTRotate, STTStructureRead};
 
@@ -82,6 +82,15 @@ impl<TNodeData, TNTRImpl, TCPWImpl> StandardDynamicForest<TNodeData, TNTRImpl, T
 	}
 }
 
+impl<TNodeData, TNTRImpl, TCPWImpl> MemoryUsage for StandardDynamicForest<TNodeData, TNTRImpl, TCPWImpl>
+	where TNodeData : PathWeightNodeData + UpdatingNodeData,
+		TNTRImpl : NTRImplementation, TCPWImpl : CPWImplementation<TNodeData>
+{
+	fn heap_bytes( &self ) -> usize {
+		self.t.heap_bytes()
+	}
+}
+
 impl<TNodeData, TNTRImpl, TCPWImpl> RootedForest for StandardDynamicForest<TNodeData, TNTRImpl, TCPWImpl>
 	where TNodeData : PathWeightNodeData + UpdatingNodeData,
 		TNTRImpl : NTRImplementation, TCPWImpl : CPWImplementation<TNodeData>
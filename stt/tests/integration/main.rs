@@ -1,3 +1,5 @@
+mod test_batch;
+mod test_memory;
 mod test_queries;
 mod test_two_cut_stt;
 
@@ -0,0 +1,83 @@
+use rand::{Rng, SeedableRng};
+use rand::rngs::StdRng;
+
+use stt::{DynamicForest, NodeIdx, Query, generate};
+use stt::common::{IsizeAddGroupWeight, UsizeMaxMonoidWeight};
+use stt::generate::GeneratableMonoidWeight;
+use stt::link_cut::{GroupPathWeightLCTNodeData, LinkCutForest, MonoidPathWeightLCTNodeData};
+use stt::onecut::SimpleDynamicTree;
+use stt::pg::PetgraphDynamicForest;
+use stt::twocut::mtrtt::MoveToRootTT;
+use stt::twocut::node_data::{GroupPathWeightNodeData, MonoidPathWeightNodeData};
+use stt::twocut::splaytt::{GreedySplayTT, TwoPassSplayTT};
+
+const NUM_NODES : usize = 50;
+const NUM_QUERIES : usize = 1000;
+
+#[test]
+fn test_execute_batch() {
+	test_execute_batch_for::<LinkCutForest<GroupPathWeightLCTNodeData<IsizeAddGroupWeight>>>();
+	test_execute_batch_for::<GreedySplayTT<GroupPathWeightNodeData<IsizeAddGroupWeight>>>();
+	test_execute_batch_for::<TwoPassSplayTT<GroupPathWeightNodeData<IsizeAddGroupWeight>>>();
+	test_execute_batch_for::<MoveToRootTT<GroupPathWeightNodeData<IsizeAddGroupWeight>>>();
+	test_execute_batch_for::<SimpleDynamicTree<IsizeAddGroupWeight>>();
+	
+	test_execute_batch_for::<LinkCutForest<MonoidPathWeightLCTNodeData<UsizeMaxMonoidWeight>>>();
+	test_execute_batch_for::<TwoPassSplayTT<MonoidPathWeightNodeData<UsizeMaxMonoidWeight>>>();
+	test_execute_batch_for::<SimpleDynamicTree<UsizeMaxMonoidWeight>>();
+}
+
+/// Generate random valid queries and their results, using petgraph.
+fn generate_queries<TDynForest : DynamicForest>() -> (Vec<Query<TDynForest::TWeight>>, Vec<Option<TDynForest::TWeight>>)
+	where TDynForest::TWeight : GeneratableMonoidWeight
+{
+	let mut rng = StdRng::seed_from_u64( 0 );
+	let mut f = PetgraphDynamicForest::<TDynForest::TWeight>::new( NUM_NODES );
+	let mut edges : Vec<(NodeIdx, NodeIdx)> = Vec::new();
+	let mut queries = Vec::new();
+	let mut path_weights = Vec::new();
+	for (u, v) in generate::generate_edges( NUM_NODES, NUM_QUERIES, &mut rng.clone() ) {
+		let (u, v) = ( NodeIdx::new( u ), NodeIdx::new( v ) );
+		let query = if f.compute_path_weight( u, v ).is_none() {
+			edges.push( (u, v) );
+			Query::InsertEdge( u, v, TDynForest::TWeight::generate( &mut rng ) )
+		}
+		else if rng.gen_bool( 0.5 ) {
+			Query::PathWeight( u, v )
+		}
+		else {
+			let (x, y) = edges.swap_remove( rng.gen_range( 0..edges.len() ) );
+			Query::DeleteEdge( x, y )
+		};
+		path_weights.push( query.execute( &mut f ) );
+		queries.push( query );
+	}
+	(queries, path_weights)
+}
+
+fn test_execute_batch_for<TDynForest : DynamicForest>()
+	where TDynForest::TWeight : GeneratableMonoidWeight
+{
+	let (queries, expected) = generate_queries::<TDynForest>();
+	assert!( expected.iter().any( |w| w.is_some() ) );
+	
+	let mut f = TDynForest::new( NUM_NODES );
+	let mut path_weights = vec![None; queries.len()];
+	f.execute_batch( &queries, &mut path_weights );
+	assert_eq!( path_weights, expected );
+	
+	// In several batches, the results are the same as one by one
+	let mut f = TDynForest::new( NUM_NODES );
+	let mut path_weights = vec![None; queries.len()];
+	for (batch, batch_weights) in queries.chunks( 64 ).zip( path_weights.chunks_mut( 64 ) ) {
+		f.execute_batch( batch, batch_weights );
+	}
+	assert_eq!( path_weights, expected );
+}
+
+#[test]
+#[should_panic]
+fn test_execute_batch_buffer_length() {
+	let mut f = SimpleDynamicTree::<UsizeMaxMonoidWeight>::new( 2 );
+	f.execute_batch( &[Query::PathWeight( NodeIdx::new( 0 ), NodeIdx::new( 1 ) )], &mut [] );
+}
@@ -0,0 +1,48 @@
+use stt::{DynamicForest, MemoryUsage};
+use stt::common::{EmptyGroupWeight, EmptyNodeData, UsizeMaxMonoidWeight};
+use stt::link_cut::{LinkCutForest, MonoidPathWeightLCTNodeData};
+use stt::onecut::SimpleDynamicTree;
+use stt::pg::PetgraphDynamicForest;
+use stt::twocut::mtrtt::MoveToRootTT;
+use stt::twocut::node_data::MonoidPathWeightNodeData;
+use stt::twocut::splaytt::GreedySplayTT;
+
+#[test]
+fn test_heap_bytes_proportional_to_nodes() {
+	test_heap_bytes_for::<PetgraphDynamicForest<EmptyGroupWeight>>();
+	test_heap_bytes_for::<LinkCutForest<EmptyNodeData>>();
+	test_heap_bytes_for::<GreedySplayTT<EmptyNodeData>>();
+	test_heap_bytes_for::<MoveToRootTT<EmptyNodeData>>();
+	test_heap_bytes_for::<SimpleDynamicTree<EmptyGroupWeight>>();
+	
+	test_heap_bytes_for::<PetgraphDynamicForest<UsizeMaxMonoidWeight>>();
+	test_heap_bytes_for::<LinkCutForest<MonoidPathWeightLCTNodeData<UsizeMaxMonoidWeight>>>();
+	test_heap_bytes_for::<GreedySplayTT<MonoidPathWeightNodeData<UsizeMaxMonoidWeight>>>();
+	test_heap_bytes_for::<SimpleDynamicTree<UsizeMaxMonoidWeight>>();
+}
+
+fn test_heap_bytes_for<TDynForest : DynamicForest + MemoryUsage>() {
+	let small = TDynForest::new( 10 );
+	let large = TDynForest::new( 1000 );
+	assert!( small.heap_bytes() > 0 );
+	// Not exactly 100 times as much, since vectors may over-allocate
+	assert!( 50 * small.heap_bytes() <= large.heap_bytes() && large.heap_bytes() <= 200 * small.heap_bytes() );
+	assert_eq!( large.total_bytes(), std::mem::size_of::<TDynForest>() + large.heap_bytes() );
+}
+
+#[test]
+fn test_weights_use_memory() {
+	assert!( GreedySplayTT::<MonoidPathWeightNodeData<UsizeMaxMonoidWeight>>::new( 10 ).heap_bytes()
+		> GreedySplayTT::<EmptyNodeData>::new( 10 ).heap_bytes() );
+}
+
+#[test]
+fn test_petgraph_heap_bytes_grow_with_edges() {
+	let mut f = PetgraphDynamicForest::<EmptyGroupWeight>::new( 100 );
+	let before = f.heap_bytes();
+	let nodes : Vec<_> = f.nodes().collect();
+	for i in 1..nodes.len() {
+		f.link( nodes[i-1], nodes[i], EmptyGroupWeight{} );
+	}
+	assert!( f.heap_bytes() > before );
+}
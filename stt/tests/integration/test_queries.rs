@@ -3,10 +3,13 @@ use petgraph::graph;
 use rand::{Rng, SeedableRng};
 use rand::rngs::StdRng;
 
-use stt::{DynamicForest, generate};
+use std::panic::{AssertUnwindSafe, catch_unwind};
+
+use stt::{DynamicForest, NodeIdx, generate};
 use stt::common::{EmptyGroupWeight, EmptyNodeData, IsizeAddGroupWeight, UsizeMaxMonoidWeight};
 use stt::generate::GeneratableMonoidWeight;
 use stt::link_cut::{GroupPathWeightLCTNodeData, LinkCutForest, MonoidPathWeightLCTNodeData};
+use stt::onecut::SimpleDynamicTree;
 use stt::pg::PetgraphDynamicForest;
 use stt::twocut::mtrtt::MoveToRootTT;
 use stt::twocut::node_data::{GroupPathWeightNodeData, MonoidPathWeightNodeData};
@@ -89,3 +92,48 @@ fn test_queries_for<TDynForest : DynamicForest>()
 		if CHECK_EDGES { dtf.check_edges(); }
 	}
 }
+
+#[test]
+fn test_cut_non_edge() {
+	test_cut_non_edge_for::<LinkCutForest<EmptyNodeData>>();
+	test_cut_non_edge_for::<LinkCutForest<GroupPathWeightLCTNodeData<IsizeAddGroupWeight>>>();
+	test_cut_non_edge_for::<GreedySplayTT<EmptyNodeData>>();
+	test_cut_non_edge_for::<TwoPassSplayTT<GroupPathWeightNodeData<IsizeAddGroupWeight>>>();
+	test_cut_non_edge_for::<LocalTwoPassSplayTT<EmptyNodeData>>();
+	test_cut_non_edge_for::<MoveToRootTT<EmptyNodeData>>();
+	test_cut_non_edge_for::<SimpleDynamicTree<IsizeAddGroupWeight>>();
+}
+
+/// Cutting two connected but non-adjacent nodes must panic, in release builds too, rather than
+/// silently corrupt the forest.
+fn test_cut_non_edge_for<TDynForest : DynamicForest>()
+	where TDynForest::TWeight : GeneratableMonoidWeight
+{
+	const NUM_NODES : usize = 20;
+	const NUM_TRIALS : usize = 50;
+	
+	let mut rng = StdRng::seed_from_u64( 0 );
+	for _ in 0..NUM_TRIALS {
+		// A random tree, with the structure shuffled by some path weight queries
+		let parents : Vec<usize> = ( 1..NUM_NODES ).map( |v| rng.gen_range( 0..v ) ).collect();
+		let mut f = TDynForest::new( NUM_NODES );
+		for (v, &p) in parents.iter().enumerate() {
+			f.link( NodeIdx::new( v + 1 ), NodeIdx::new( p ), TDynForest::TWeight::generate( &mut rng ) );
+		}
+		for _ in 0..5 {
+			let (u, v) = generate::generate_edge( NUM_NODES, &mut rng );
+			assert!( f.compute_path_weight( NodeIdx::new( u ), NodeIdx::new( v ) ).is_some() );
+		}
+		
+		// Two distinct nodes that are not adjacent, in random order
+		let (u, v) = loop {
+			let (u, v) = generate::generate_edge( NUM_NODES, &mut rng );
+			let adjacent = ( u > 0 && parents[u - 1] == v ) || ( v > 0 && parents[v - 1] == u );
+			if u != v && !adjacent {
+				break (u, v);
+			}
+		};
+		let result = catch_unwind( AssertUnwindSafe( || f.cut( NodeIdx::new( u ), NodeIdx::new( v ) ) ) );
+		assert!( result.is_err(), "Cutting the non-edge ({u}, {v}) did not panic" );
+	}
+}